@@ -53,5 +53,5 @@ Common use case would be:
 please use *only* instances of
 :class:`bcib.CallbackIteratorBridge` directly
 '''
-from .bridge import CallbackIteratorBridge
-from .exceptions import ExecutionStopRequest
+from .bridge import CallbackIteratorBridge, Cancelled
+from .exceptions import ExecutionStopRequest, PeerLost
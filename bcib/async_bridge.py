@@ -0,0 +1,359 @@
+'''Bridge callback to iterator for asyncio
+
+Same as :mod:`bcib.bridge` but for solvers and consumers running
+in the same asyncio event loop: the callback uses ``await
+bridge.submit(cmd)`` and the consumer iterates with ``async for``.
+The queues are :class:`asyncio.Queue` instances. Thus no extra
+thread is required.
+
+The commands are the same as for :class:`bcib.CallbackIteratorBridge`:
+callables returning a generator. The messages yielded by this
+generator are handed out by the asynchronous iterator. Values sent
+to the asynchronous iterator (:meth:`asend`) are sent on to the
+generator.
+
+Typical usage:
+
+::
+
+    bridge = setup_async_bridge()
+
+    async def consume():
+        async for msg in bridge:
+            # handle the message
+            pass
+
+    async def solve():
+        try:
+            for p in partials:
+                r = await bridge.submit(p)
+        finally:
+            await bridge.stopDelegation()
+
+    await asyncio.gather(consume(), solve())
+
+Differences to :class:`bcib.CallbackIteratorBridge`:
+
+    * :attr:`cmd_exec_timeout` limits the time from submission to
+      result. It does not restart with each message
+    * the result cache, the journal, the statistics, the timeout
+      policy and the tracer are not supported. These options are
+      rejected (see :data:`unsupported_options`)
+    * cancelling a future of :meth:`submit_nowait` only drops a
+      queued command
+
+Warning:
+    bluesky's :class:`RunEngine` consumes plans that are
+    (synchronous) generators. Use :class:`bcib.CallbackIteratorBridge`
+    and :func:`bcib.bridge_plan.bridge_plan_stub` for it.
+'''
+from .bridge import (_BaseClass_Bridge, _BridgeToIteratorMixin,
+                     _CommandBatch, _Command, end_of_evaluation)
+
+import asyncio
+import itertools
+import sys
+import traceback
+
+#: options of :class:`bcib.CallbackIteratorBridge` not supported
+unsupported_options = ('cache', 'journal', 'collect_stats', 'stats_hook',
+                       'timeout_policy', 'tracer')
+
+
+class _AsyncCallbackToBridgeMixin:
+    '''Delegates values received by the callback to the command queue
+    '''
+
+    async def stopDelegation(self, fail_mode=False):
+        '''Inform delegator that we are done
+        '''
+        cls_name = self.__class__.__name__
+        if self.state.is_stopped:
+            txt = 'command delegation stopped. Not stopping again'
+            self.log.info(f'{cls_name}: {txt}')
+            return
+
+        if self.state.is_stopping:
+            txt = (
+                'command delegation already asked to stop. Not trying to'
+                ' stop it again'
+                )
+            self.log.info(f'{cls_name}: {txt}')
+            return
+
+        if not self.state.is_failed:
+            self.state.set_stopping()
+
+        self.log.info(f'{cls_name}: stopping command execution')
+
+        if fail_mode:
+            self.clearQueues()
+
+        await self.submit(end_of_evaluation, wait_for_result=False)
+        if not self.state.is_failed:
+            self.state.set_stopped()
+        self.log.info(f'{cls_name}: command execution stopped')
+
+    async def _putCommand(self, cmd, timeout):
+        '''Tag the command with the next sequence number and queue it
+
+        see :meth:`bcib.CallbackIteratorBridge._putCommand`
+        '''
+        seq = next(self._sequence)
+        self._last_seq = seq
+        await asyncio.wait_for(self.command_queue.put((seq, cmd)), timeout)
+        return seq
+
+    async def _getResult(self, timeout, seq):
+        '''Receive the result from the iterator, dropping stale ones
+        '''
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            r_seq, r = await asyncio.wait_for(self.result_queue.get(),
+                                              timeout)
+            if r_seq is None or r_seq == seq:
+                return r
+            self.log.warning('Dropping stale result of submission %s while'
+                             ' waiting for %s', r_seq, seq)
+            timeout = max(deadline - loop.time(), 0)
+
+    async def submit(self, cmd, wait_for_result=True, project=None):
+        '''Submit a command and wait for its result
+
+        see :meth:`bcib.CallbackIteratorBridge.submit`
+        '''
+        self.cmd_state.set_submitting()
+        self.last_command = cmd
+        if project is not None:
+            cmd = _Command(cmd, project=project)
+        seq = await self._putCommand(cmd, self.cmd_queue_timeout)
+        self.cmd_state.set_submitted()
+        if not wait_for_result:
+            self.cmd_state.set_finished()
+            return
+
+        self.cmd_state.set_waiting()
+        try:
+            r = await self._getResult(self.cmd_exec_timeout, seq)
+        except asyncio.TimeoutError:
+            self.log.error('Did not receive response for command %s', cmd)
+            self.cmd_state.set_failed()
+            self.state.set_failed()
+            raise
+
+        if isinstance(r, Exception):
+            self.log.error('Command exeuction raised error %s', r)
+            # The response was processed: the bridge can be stopped
+            self.cmd_state.set_finished()
+            raise r
+        self.cmd_state.set_finished()
+        return r
+
+    async def submit_many(self, cmds, project=None):
+        '''Submit a batch of commands and wait for all results
+
+        see :meth:`bcib.CallbackIteratorBridge.submit_many`
+        '''
+        batch = _CommandBatch(list(cmds))
+        if len(batch) == 0:
+            return []
+        return await self.submit(batch, project=project)
+
+    async def submit_nowait(self, cmd, project=None):
+        '''Submit a command without waiting for its result
+
+        see :meth:`bcib.CallbackIteratorBridge.submit_nowait`
+
+        Returns:
+            :class:`asyncio.Future`
+        '''
+        future = asyncio.get_running_loop().create_future()
+
+        self.cmd_state.set_submitting()
+        self.last_command = cmd
+        try:
+            await self._putCommand(_Command(cmd, future, project=project),
+                                   self.cmd_exec_timeout)
+        except asyncio.TimeoutError:
+            self.log.error('Command window full: could not submit %s', cmd)
+            # Nothing was queued: the bridge can take the next command
+            self.cmd_state.set_failed()
+            self.cmd_state.set_undefined()
+            raise
+        self.cmd_state.set_submitted()
+        self.cmd_state.set_finished()
+        return future
+
+
+class _AsyncBridgeToIteratorMixin(_BridgeToIteratorMixin):
+    '''Receives objects from queue and passes it to the async iterator
+
+    Reuses the execution of single commands and batches of
+    :class:`bcib.bridge._BridgeToIteratorMixin`.
+    '''
+    def __iter__(self):
+        cls_name = self.__class__.__name__
+        raise TypeError(f'{cls_name} only supports asynchronous iteration')
+
+    def __aiter__(self):
+        '''yield the objects
+
+        Heavy lifting done by :meth:`execute`
+        '''
+        return self.execute()
+
+    async def execute(self):
+        '''execute one command after the other.
+
+        Asynchronous generator: see
+        :meth:`bcib.CallbackIteratorBridge.execute`
+        '''
+        if self.state.is_stopped:
+            txt = 'Executor in stopped state. Setting it back to running'
+            self.log.info(txt)
+            self.state.set_running()
+
+        cls_name = self.__class__.__name__
+        self.log.info('%s waiting for commands to execute', cls_name)
+
+        for cnt in itertools.count():
+            seq, cmd = await asyncio.wait_for(self.command_queue.get(),
+                                              self.next_cmd_timeout)
+
+            if self._isStale(seq):
+                self.log.info('%s: dropping stale cmd %s of submission %s',
+                              cls_name, cmd, seq)
+                self._dropCommand(cmd)
+                continue
+
+            if cmd is end_of_evaluation:
+                self.log.info('%s: evaluation finished', cls_name)
+                return
+
+            future = None
+            project = self.projector
+            if isinstance(cmd, _Command):
+                future = cmd.future
+                if cmd.project is not None:
+                    project = cmd.project
+                cmd = cmd.cmd
+                if future is not None and future.cancelled():
+                    self.log.info('%s: cmd no %d: %s was cancelled.'
+                                  ' Not executing it', cls_name, cnt, cmd)
+                    continue
+
+            t_start = self._logCommandStart(cnt, cmd)
+
+            if isinstance(cmd, _CommandBatch):
+                gen = self._executeBatch(cmd)
+            else:
+                gen = self._executeSingle(cmd)
+
+            # async generators do not support "yield from": hand the
+            # messages, the values sent back and the exceptions thrown
+            # (:meth:`athrow`) over by hand
+            try:
+                val = None
+                exc = None
+                while True:
+                    try:
+                        if exc is None:
+                            msg = gen.send(val)
+                        else:
+                            msg = gen.throw(exc)
+                    except StopIteration as si:
+                        r = si.value
+                        break
+                    exc = None
+                    try:
+                        val = yield msg
+                    except GeneratorExit:
+                        gen.close()
+                        raise
+                    except BaseException as e:
+                        exc = e
+                        val = None
+                if project is not None:
+                    r = self._projectResult(cmd, r, project)
+            except Exception as exc:
+                stream = sys.stderr
+                stream.flush()
+                txt = f'Received exception {exc} while executing cmd {cmd}'
+                traceback.print_exc(file=stream)
+                stream.write('Error: ' + txt)
+                stream.flush()
+                self.log.error(txt)
+                await self._putResult(exc, future, seq)
+                raise exc
+
+            self._logCommandDone(cnt, cmd, r, t_start)
+            await self._putResult(r, future, seq)
+
+    async def _putResult(self, r, future=None, seq=None):
+        '''Hand the result back to the submitter
+        '''
+        if future is None:
+            await self.result_queue.put((seq, r))
+        elif future.cancelled():
+            pass
+        elif isinstance(r, Exception):
+            future.set_exception(r)
+        else:
+            future.set_result(r)
+
+
+class AsyncCallbackIteratorBridge(
+        _BaseClass_Bridge,
+        _AsyncCallbackToBridgeMixin,
+        _AsyncBridgeToIteratorMixin,
+):
+    '''Delegate submitted plans to the asynchronous iterator consumer
+
+    see :class:`bcib.bridge_interface.CallbackIteratorBridgeInterface`
+    for details. All methods used by the callback are coroutines.
+
+    Raises:
+        TypeError: if one of :data:`unsupported_options` is given
+    '''
+    def __init__(self, **kwargs):
+        for name in unsupported_options:
+            if kwargs.get(name):
+                cls_name = self.__class__.__name__
+                raise TypeError(f'{name} is not supported by {cls_name}')
+        super().__init__(**kwargs)
+
+    def clearQueues(self):
+        '''make sure that queues are empty
+
+        Futures of commands removed from the command queue are
+        cancelled.
+        '''
+        while not self.command_queue.empty():
+            seq, cmd = self.command_queue.get_nowait()
+            self._dropCommand(cmd)
+        while not self.result_queue.empty():
+            self.result_queue.get_nowait()
+
+
+def setup_async_bridge(pipeline_depth=1, state_checks=True, **kwargs):
+    '''Convenience function for setting up the asyncio bridge
+
+    Args:
+        pipeline_depth: number of commands that can be queued by
+                        :meth:`AsyncCallbackIteratorBridge.submit_nowait`
+                        while the iterator is executing a command
+        state_checks:   validate the transitions of the state
+                        machines
+        kwargs:         further arguments of the bridge e.g. timeouts
+    '''
+    if pipeline_depth < 1:
+        raise ValueError(f'pipeline depth {pipeline_depth} must be >= 1')
+    q_cmd = asyncio.Queue(maxsize=pipeline_depth)
+    q_res = asyncio.Queue(maxsize=1)
+
+    bridge = AsyncCallbackIteratorBridge(
+        command_queue=q_cmd, result_queue=q_res,
+        pipeline_depth=pipeline_depth, state_checks=state_checks, **kwargs
+    )
+    return bridge
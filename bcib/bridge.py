@@ -13,27 +13,49 @@ The implementation of the bridge is split up in 4 parts.
 Motivation: the submit and __iter__ could be used in different
 processe or decoupled object.
 
+Each command is put on the command queue as tuple (sequence number,
+command). The iterator puts the result back as tuple (sequence
+number, result). The submitter only accepts the result of the
+command it waits for. :meth:`_BaseClass_Bridge.reset` bumps the
+:attr:`generation`: commands or results tagged with a smaller
+sequence number are stale and dropped when received. Control
+objects not belonging to a submission are tagged with None.
+
 Warning:
     Currently only instances of :class:`CallbackIteratorBridge`
     should be used. It has only be tested in a threading
     environment, as the queues and the state_machines are shared
     by the bridge and delegator.
 
+The consumer of the iterator can be paused, e.g. bluesky's run
+engine by a pause request or a suspender. The command executed stays
+suspended within the consumer and continues on resume. Tell the
+bridge by :meth:`_BaseClass_Bridge.pause` and
+:meth:`_BaseClass_Bridge.resume` (or
+``RE.state_hook = bridge.stateHook``): the submitter does not time
+out while the consumer is paused. If the consumer aborts or stops
+the plan instead, the waiting submitter receives an
+:class:`ExecutionStopRequest`.
+
 Todo:
     * consider to drop the extra complexity
-    * consider how to handle RunEngine.stop and thus RunEngine.resume
 '''
 
 from .exceptions import ExecutionStopRequest
 from super_state_machine.machines import StateMachine
 
+import concurrent.futures
 import itertools
 import queue
+import threading
 import traceback
 import sys
+import time
 import logging
 import enum
 from .bridge_interface import CallbackIteratorBridgeInterface
+from .compact_state import compact_state_class
+from .stats import BridgeStats
 
 logger = logging.getLogger('bcib')
 
@@ -88,10 +110,16 @@ class BridgeState(StateMachine):
             'undefined': ['running', 'stopping', 'failed'],
             'running':   ['stopping', 'failed'],
             'stopping':  ['stopped', 'failed'],
-            'stopped':   ['running', 'failed']
+            'stopped':   ['running', 'failed'],
+            # see :meth:`_BaseClass_Bridge.reset`
+            'failed':    ['undefined'],
         }
 
 
+CompactCommandProcessingState = compact_state_class(CommandProcessingState)
+CompactBridgeState = compact_state_class(BridgeState)
+
+
 class EndOfEvaluation:
     '''Evaluation ended
 
@@ -99,10 +127,158 @@ class EndOfEvaluation:
     received.
     '''
 
+    def __reduce__(self):
+        # keep it a singleton when sent to an other process
+        return 'end_of_evaluation'
+
 
 end_of_evaluation = EndOfEvaluation()
 
 
+class Cancelled:
+    '''Result of a command cancelled while it was executed
+
+    See :meth:`CommandFuture.cancel`.
+
+    Args:
+        n_msgs: number of messages the command yielded before it
+                was stopped
+    '''
+    __slots__ = ['n_msgs']
+
+    def __init__(self, n_msgs=0):
+        self.n_msgs = n_msgs
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(n_msgs={self.n_msgs})'
+
+
+class CommandFuture(concurrent.futures.Future):
+    '''Future of a command submitted by :meth:`submit_nowait`
+
+    Its :meth:`cancel` stops a running command too.
+    '''
+    def __init__(self):
+        super().__init__()
+        #: set by :meth:`cancel` once the command is executed
+        self.cancel_requested = False
+
+    def cancel(self):
+        '''Cancel the command
+
+        A queued command is dropped: it is not executed and the
+        future is cancelled. A running command is stopped before
+        it yields its next message: it is closed and the future
+        receives a :class:`Cancelled` result.
+
+        Returns:
+            False if the command already finished
+        '''
+        if super().cancel():
+            return True
+        if self.done():
+            return False
+        self.cancel_requested = True
+        return True
+
+
+class _RaiseInIterator:
+    '''Command raising the given exception within the iterator
+
+    Used to hand a failure of the submitting side over to the
+    consumer of the iterator.
+    '''
+    __slots__ = ['exc']
+
+    def __init__(self, exc):
+        self.exc = exc
+
+    def __call__(self):
+        raise self.exc
+        yield
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.exc!r})'
+
+
+class _Command:
+    '''Envelope of a submitted command
+
+    Used if the command needs more than the bare object: a future
+    for its result (:meth:`submit_nowait`), a projection of its
+    result or the time stamps for the statistics (see
+    :mod:`bcib.stats`). If a future is given, the result of the
+    command is not put on the result queue but set on the future.
+    '''
+    __slots__ = ['cmd', 'future', 'project', 't_submit', 't_dequeue',
+                 't_done', 't_result', 'n_msgs']
+
+    def __init__(self, cmd, future=None, t_submit=None, project=None):
+        self.cmd = cmd
+        self.future = future
+        self.project = project
+        self.t_submit = t_submit
+        self.t_dequeue = None
+        self.t_done = None
+        self.t_result = None
+        self.n_msgs = 0
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.cmd})'
+
+
+class _CommandBatch:
+    '''Commands submitted together by :meth:`submit_many`
+
+    The commands are executed one after the other within a
+    single delegation. The list of their results is handed back
+    as one result.
+    '''
+    __slots__ = ['cmds']
+
+    def __init__(self, cmds):
+        self.cmds = cmds
+
+    def __len__(self):
+        return len(self.cmds)
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(<{len(self.cmds)} commands>)'
+
+
+def _command_name(cmd):
+    '''Short name of the command for logging and book keeping
+    '''
+    func = getattr(cmd, 'func', None)
+    if func is not None:
+        # e.g. functools.partial
+        cmd = func
+    name = getattr(cmd, '__qualname__', None)
+    if name is None:
+        name = type(cmd).__qualname__
+    return name
+
+
+def _command_key(cmd, key):
+    '''Key of the command derived by the function `key`
+
+    A batch is keyed by the keys of its commands: batches of other
+    commands must not share a key.
+    '''
+    if isinstance(cmd, _CommandBatch):
+        return ('batch',) + tuple(key(c) for c in cmd.cmds)
+    return key(cmd)
+
+
+def _result_len(r):
+    '''Number of entries of the result or None if it has no length
+    '''
+    try:
+        return len(r)
+    except TypeError:
+        return None
+
+
 # CallbackIteratorBridgeInterface
 class _BaseClass_Bridge:
     '''Base class
@@ -115,16 +291,21 @@ class _BaseClass_Bridge:
     Todo:
         * At start up it can take a bit of time until the command
           queue can be used the first time. Any subsequent use
-          should be rather fast. Shoud one send a startup object
-          on start?
+          should be rather fast. :class:`bcib.pool.BridgePool`
+          sends a startup object through its bridges and reuses
+          them (see :meth:`recycle`)
     '''
     def __init__(self, *, command_queue, result_queue,
                  next_cmd_timeout=5, cmd_exec_timeout=5,
-                 cmd_queue_timeout=1,
-                 log=None):
+                 cmd_queue_timeout=1, pipeline_depth=1,
+                 state_checks=True, structured_log=False,
+                 collect_stats=False, stats_hook=None, cache=None,
+                 journal=None, projector=None, timeout_policy=None,
+                 check_interval=10, tracer=None, log=None):
 
-        self.state = BridgeState()
-        self.cmd_state = CommandProcessingState()
+        self.state_checks = state_checks
+        self.structured_log = structured_log
+        self._setupStates()
 
         self.command_queue = command_queue
         self.result_queue = result_queue
@@ -138,7 +319,39 @@ class _BaseClass_Bridge:
         self.next_cmd_timeout = next_cmd_timeout
         self.cmd_exec_timeout = cmd_exec_timeout
         self.cmd_queue_timeout = cmd_queue_timeout
+        self.pipeline_depth = pipeline_depth
+        self.check_interval = check_interval
         self.last_command = None
+        #: time.monotonic() of the last message yielded by the iterator
+        self._last_progress = 0.0
+        # heart beats: see :class:`bcib.watchdog.Watchdog`
+        self._submitter_thread = None
+        self._last_submit = 0.0
+        self._iterator_thread = None
+        #: None: never iterated, True: iterating, False: left iteration
+        self._iterating = None
+        self._left_iteration = 0.0
+        #: futures of :meth:`submit_nowait` not yet done
+        self._outstanding = set()
+        # see :meth:`pause`
+        self._paused_since = None
+        self._pauses = 0
+
+        # see :meth:`_putCommand`
+        self._sequence = itertools.count(1)
+        self._last_seq = 0
+        #: commands and results tagged with a smaller sequence number
+        #: are stale
+        self.generation = 1
+        self.cache = cache
+        self.journal = journal
+        self.projector = projector
+        self.timeout_policy = timeout_policy
+        self.tracer = tracer
+
+        self._stats = None
+        if collect_stats or stats_hook is not None:
+            self._stats = BridgeStats(hook=stats_hook)
 
     def __repr__(self):
         cls_name = self.__class__.__name__
@@ -149,34 +362,191 @@ class _BaseClass_Bridge:
             f' next_cmd_timeout={self.next_cmd_timeout},'
             f' cmd_exec_timeout={self.cmd_exec_timeout},'
             f' cmd_queue_timeout={self.cmd_queue_timeout},'
+            f' pipeline_depth={self.pipeline_depth},'
+            f' check_interval={self.check_interval},'
+            f' state_checks={self.state_checks},'
+            f' structured_log={self.structured_log},'
+            f' stats={self._stats},'
+            f' cache={self.cache},'
+            f' journal={self.journal},'
+            f' projector={self.projector},'
+            f' timeout_policy={self.timeout_policy},'
+            f' tracer={self.tracer},'
             ' )'
         )
         return txt
 
+    def _setupStates(self):
+        '''Create the state machines
+
+        With :attr:`state_checks` the (validating) state machines
+        are used. Otherwise compact ones without any transition
+        checks.
+        '''
+        if self.state_checks:
+            self.state = BridgeState()
+            self.cmd_state = CommandProcessingState()
+        else:
+            self.state = CompactBridgeState()
+            self.cmd_state = CompactCommandProcessingState()
+
+    def _logEvent(self, event, **fields):
+        '''Log a compact record of a bridge event
+
+        The fields are available to log handlers as attributes
+        `bcib_event` and `bcib_fields` of the log record.
+        '''
+        if self.log.isEnabledFor(logging.INFO):
+            self.log.info('%s %s', event, fields,
+                          extra={'bcib_event': event, 'bcib_fields': fields})
+
+    def stats(self):
+        '''Snapshot of the timing statistics of the commands
+
+        Returns:
+            see :meth:`bcib.stats.BridgeStats.snapshot`. None if
+            the statistics are not collected
+        '''
+        if self._stats is None:
+            return None
+        return self._stats.snapshot()
+
     # -------------------------------------------------------------------------
     def clearQueues(self):
         '''make sure that queues are empty
 
         10 times: you know German "Angst". Then guess what an
         "Angsteisen" is.
+
+        Futures of commands submitted by :meth:`submit_nowait`
+        that are removed from the command queue are cancelled.
+
+        Note:
+            Stale commands and results are dropped when received
+            anyway. :meth:`reset` does not need to clear the queues.
         '''
         for i in range(10):
             if self.command_queue.qsize() > 0:
                 try:
-                    self.command_queue.get(block=False)
+                    seq, cmd = self.command_queue.get(block=False)
                 except queue.Empty:
                     pass
+                else:
+                    self._dropCommand(cmd)
             if self.result_queue.qsize() > 0:
                 try:
                     self.result_queue.get(block=False)
                 except queue.Empty:
                     pass
 
+    def _dropCommand(self, cmd):
+        '''Cancel the future of a command which will not be executed
+        '''
+        if isinstance(cmd, _Command) and cmd.future is not None:
+            cmd.future.cancel()
+
+    def _isStale(self, seq):
+        '''Tagged by a submission made before the last :meth:`reset`?
+        '''
+        return seq is not None and seq < self.generation
+
+    def _bumpGeneration(self):
+        '''Make all commands and results submitted up to now stale
+        '''
+        self.generation = self._last_seq + 1
+
     def reset(self):
+        '''Make a failed bridge usable again
+
+        Commands and results of earlier submissions still in the
+        queues are marked stale. They are dropped when received.
+        '''
         if self.state.is_failed:
             self.log.info('Setting from failed to undefined')
             self.state.set_undefined()
-            self.clearQueues()
+            if self.cmd_state.is_failed:
+                self.cmd_state.set_undefined()
+            self._bumpGeneration()
+
+    def recycle(self):
+        '''Bring the bridge back to its initial state for reuse
+
+        Whatever state the last delegation left the bridge in:
+        the queues are emptied and fresh state machines are
+        created. Only call it when neither the submitter nor the
+        iterator uses the bridge any more.
+        '''
+        self.clearQueues()
+        self._bumpGeneration()
+        self._setupStates()
+        self.last_command = None
+        self._paused_since = None
+        self._outstanding.clear()
+        self._clearSubmitter()
+
+    def _clearSubmitter(self):
+        '''Forget the heart beat of the submitter
+
+        The delegation ended: the thread of the last submission may
+        end without being taken as died by the
+        :class:`bcib.watchdog.Watchdog`.
+        '''
+        self._submitter_thread = None
+
+    # -------------------------------------------------------------------------
+    #: states of bluesky's run engine in which the plan is not consumed
+    #: but can be continued
+    paused_states = ('pausing', 'paused', 'suspending')
+
+    @property
+    def is_paused(self):
+        '''Is the consumer of the iterator paused?
+        '''
+        return self._paused_since is not None
+
+    def pause(self):
+        '''The consumer of the iterator paused
+
+        The time the submitter waits for the result of the command
+        (see :meth:`_getResult`) is frozen until :meth:`resume`.
+        The command itself stays suspended within the consumer.
+        '''
+        if self._paused_since is not None:
+            return
+        self._pauses += 1
+        self._paused_since = time.monotonic()
+        self.log.info('%s: consumer paused while executing %s',
+                      self.__class__.__name__, self.last_command)
+
+    def resume(self):
+        '''The consumer of the iterator continues
+
+        The time without progress allowed to the command restarts
+        now.
+        '''
+        if self._paused_since is None:
+            return
+        now = time.monotonic()
+        # progress first: a waiting submitter must not see the pause
+        # ended but the deadline still running from before it
+        self._last_progress = now
+        paused = now - self._paused_since
+        self._paused_since = None
+        self.log.info('%s: consumer resumed after %.3f s',
+                      self.__class__.__name__, paused)
+
+    def stateHook(self, new_state, old_state=None):
+        '''Follow the state of bluesky's run engine
+
+        Use as ``RE.state_hook = bridge.stateHook``. Any state not
+        in :attr:`paused_states` resumes the bridge: e.g. after an
+        abort the submitter is answered by :meth:`stopDelegation`
+        (called by :func:`bcib.bridge_plan.bridge_plan_stub`).
+        '''
+        if str(new_state) in self.paused_states:
+            self.pause()
+        else:
+            self.resume()
 
 
 class _CallbackToBrigeMixin:
@@ -201,11 +571,15 @@ class _CallbackToBrigeMixin:
             return
 
         if self.cmd_state.is_waiting:
+            # Called by an other thread, e.g. the consumer aborted the
+            # plan. The command will not be answered
             txt = (
                 f'{cls_name}: still waiting for  response to delegated'
                 f' command {self.last_command}'
             )
             self.log.info(txt)
+            self._stopWaiting(txt)
+            return
 
         if not self.state.is_failed:
             self.state.set_stopping()
@@ -218,36 +592,307 @@ class _CallbackToBrigeMixin:
 
         # Inform the iterator that we are done
         self.submit(end_of_evaluation, wait_for_result=False)
-        self.state.set_stopped()
+        if not self.state.is_failed:
+            # a failed bridge stays failed until :meth:`reset`
+            self.state.set_stopped()
+        self._clearSubmitter()
         self.log.info(f'{cls_name}: command execution stopped')
 
-    def submit(self, cmd, wait_for_result=True):
+    def _stopWaiting(self, txt):
+        '''Stop the delegation while the submitter waits for a result
+
+        The submitter receives an :class:`ExecutionStopRequest`. A
+        result of the command arriving later is stale. The
+        iterator, if still running, is told to finish.
         '''
+        if not self.state.is_failed:
+            self.state.set_stopping()
+        self.resume()
+        # tagged: stale for later submissions if the submitter
+        # received its result meanwhile
+        seq = self._last_seq
+        self._bumpGeneration()
+        try:
+            self.result_queue.put((seq, ExecutionStopRequest(txt)),
+                                  block=False)
+        except queue.Full:
+            # The submitter will receive the result already there
+            pass
+        try:
+            self._putCommand(end_of_evaluation, 0)
+        except queue.Full:
+            self.log.warning('%s: could not queue end of evaluation',
+                             self.__class__.__name__)
+        if not self.state.is_failed:
+            self.state.set_stopped()
+        self._clearSubmitter()
+        self.log.info(f'{self.__class__.__name__}: command execution stopped')
+
+    def submit(self, cmd, wait_for_result=True, key=None, project=None):
+        '''Submit a command and wait for its result
+
+        If the bridge has a :attr:`cache` (see
+        :class:`bcib.cache.ResultCache`), the result of an earlier
+        command with the same key is returned without passing the
+        command over the bridge.
+
+        If the bridge has a :attr:`journal` (see
+        :class:`bcib.journal.EvaluationJournal`), the result is
+        replayed from the journal as long as the submitted commands
+        follow it. Otherwise the result is appended to the journal.
+
+        If a projection is given (or the bridge has a
+        :attr:`projector`), it is applied by the iterator to the
+        result. Only the projected value is passed back, logged,
+        cached and journaled. The result of a projection given here
+        bypasses the cache and the journal unless a `key` is given:
+        the key derived from the command does not tell projections
+        apart.
+
+        Args:
+            cmd:             the command
+            wait_for_result: see
+                             :meth:`CallbackIteratorBridgeInterface.submit`
+            key:             key of the command for the cache and the
+                             journal. If not given it is derived from
+                             the command by each of them
+            project:         callable reducing the result. Overrides
+                             :attr:`projector`
         '''
+        cache = self.cache
+        if isinstance(cmd, _CommandBatch):
+            # a batch is rarely submitted again as a whole
+            cache = None
+        if (not wait_for_result or cmd is end_of_evaluation
+                or (cache is None and self.journal is None)
+                or (project is not None and key is None)):
+            return self._submit(cmd, wait_for_result, project)
+
+        if cache is not None:
+            cache_key = key
+            if cache_key is None:
+                cache_key = cache.key(cmd)
+            found, r = cache.lookup(cache_key)
+            if found:
+                return r
+
+        if self.journal is not None:
+            journal_key = key
+            if journal_key is None:
+                journal_key = _command_key(cmd, self.journal.key)
+            found, r = self.journal.lookup(journal_key)
+            if not found:
+                r = self._submit(cmd, wait_for_result, project)
+                self.journal.append(journal_key, r)
+        else:
+            r = self._submit(cmd, wait_for_result, project)
+
+        if cache is not None:
+            cache.store(cache_key, r)
+        return r
+
+    def _putCommand(self, cmd, timeout):
+        '''Tag the command with the next sequence number and queue it
 
+        Returns:
+            the sequence number
+        '''
+        # next() on a count is atomic: stopDelegation may be called
+        # by an other thread than the solver
+        seq = next(self._sequence)
+        self._last_seq = seq
+        tracer = self.tracer
+        if tracer is None:
+            self.command_queue.put((seq, cmd), timeout=timeout)
+            return seq
+        t_start = time.perf_counter()
+        self.command_queue.put((seq, cmd), timeout=timeout)
+        tracer.span('enqueue', t_start, None, seq)
+        return seq
+
+    def _submit(self, cmd, wait_for_result, project=None):
+        '''Pass the command over the bridge and wait for the result
+        '''
+        tracer = self.tracer
+        if tracer is not None:
+            t_trace = time.perf_counter()
         self.cmd_state.set_submitting()
         self.last_command = cmd
-        self.command_queue.put(cmd, timeout=self.cmd_queue_timeout)
+        if cmd is not end_of_evaluation:
+            self._submitter_thread = threading.current_thread()
+            self._last_submit = time.monotonic()
+        policy = self.timeout_policy
+        exec_timeout = self.cmd_exec_timeout
+        if policy is not None and wait_for_result:
+            exec_timeout = policy.timeout(cmd, exec_timeout)
+            policy_cmd = cmd
+            t_start = time.perf_counter()
+        env = None
+        if self._stats is not None and cmd is not end_of_evaluation:
+            env = _Command(cmd, t_submit=time.perf_counter(),
+                           project=project)
+            cmd = env
+        elif project is not None:
+            cmd = _Command(cmd, project=project)
+        seq = self._putCommand(cmd, self.cmd_queue_timeout)
         self.cmd_state.set_submitted()
         if not wait_for_result:
             self.cmd_state.set_finished()
+            if tracer is not None:
+                tracer.span('submit', t_trace, None, self.last_command)
             return
 
         self.cmd_state.set_waiting()
+        pauses = self._pauses
+        if tracer is not None:
+            t_get = time.perf_counter()
         try:
-            r = self.result_queue.get(timeout=self.cmd_exec_timeout)
+            r = self._getResult(exec_timeout, seq)
         except queue.Empty:
-            self.log.error(f'Did not receive response for command {cmd}')
+            self.log.error('Did not receive response for command %s'
+                           ' within %s s', self.last_command, exec_timeout)
             self.cmd_state.set_failed()
             self.state.set_failed()
             raise
 
+        if tracer is not None:
+            t_now = time.perf_counter()
+            tracer.span('result get', t_get, t_now, seq)
+            tracer.span('submit', t_trace, t_now, self.last_command)
+
+        if env is not None and env.t_result is not None:
+            self._stats.record(env, time.perf_counter())
+
+        if (policy is not None and not isinstance(r, Exception)
+                and pauses == self._pauses):
+            # a round trip including a pause tells nothing
+            policy.record(policy_cmd, time.perf_counter() - t_start)
+
         if isinstance(r, Exception):
-            self.log.error(f'Command exeuction raised error {r}')
+            self.log.error('Command exeuction raised error %s', r)
+            # The response was processed: the bridge can be stopped
+            self.cmd_state.set_finished()
             raise r
         self.cmd_state.set_finished()
         return r
 
+    def _getResult(self, timeout, seq=None):
+        '''Receive the result from the iterator
+
+        `timeout` is the time allowed without progress: it restarts
+        with each message the iterator yields (see
+        :meth:`_superviseMessages`). Thus a command yielding many
+        messages does not time out as long as it makes progress.
+        While the consumer is paused (see :meth:`pause`) it does not
+        time out at all.
+
+        Results tagged with an other sequence number than `seq` are
+        stale, e.g. left over by a command which timed out. They are
+        dropped.
+        '''
+        wait = timeout
+        while True:
+            try:
+                r_seq, r = self.result_queue.get(timeout=wait)
+            except queue.Empty:
+                if self._paused_since is not None:
+                    wait = timeout
+                    continue
+                idle = time.monotonic() - self._last_progress
+                if idle >= timeout:
+                    raise
+                wait = timeout - idle
+                continue
+            if r_seq is None or seq is None or r_seq == seq:
+                return r
+            self.log.warning('Dropping stale result of submission %s while'
+                             ' waiting for %s', r_seq, seq)
+
+    def submit_many(self, cmds, project=None):
+        '''Submit a batch of commands and wait for all results
+
+        The commands are handed over to the iterator as one object
+        and executed in order within a single delegation. Thus the
+        batch needs only one round trip over the queues. Useful for
+        population based solvers evaluating many points at once.
+
+        If one of the commands raises an exception, the remaining
+        ones are not executed and the exception is raised.
+
+        The batch bypasses the :attr:`cache`.
+
+        Note:
+            :attr:`cmd_exec_timeout` is the time allowed without a
+            message of any command of the batch (see
+            :meth:`_getResult`).
+
+        Args:
+            cmds:    iterable of commands
+            project: applied to the result of each command
+
+        Returns:
+            list of the results in the order of the commands
+        '''
+        batch = _CommandBatch(list(cmds))
+        if len(batch) == 0:
+            return []
+        return self.submit(batch, project=project)
+
+    def submit_nowait(self, cmd, project=None):
+        '''Submit a command without waiting for its result
+
+        The command is queued and the call returns immediately.
+        Its result (or the exception it raised) is set on the
+        returned future once the iterator executed it. Thus a
+        solver can queue further commands while the iterator is
+        still working on the first one.
+
+        The number of commands waiting for execution is limited by
+        the size of the command queue (see `pipeline_depth` of
+        :func:`bcib.threaded_bridge.setup_bridge`). If the queue is
+        full the call blocks for at most :attr:`cmd_exec_timeout`.
+
+        Commands are executed in the order they were submitted.
+        Commands submitted by :meth:`submit` can be mixed with
+        these ones: then :meth:`submit` waits for all commands
+        queued before.
+
+        Commands still queued when :meth:`stopDelegation` is called
+        are dropped and their futures cancelled (see
+        :meth:`_superviseMessages`).
+
+        Args:
+            cmd:     the command
+            project: see :meth:`submit`
+
+        Returns:
+            :class:`CommandFuture`. Cancel it if the result is not
+            needed any more
+        '''
+        future = CommandFuture()
+        env = _Command(cmd, future, project=project)
+        if self._stats is not None:
+            env.t_submit = time.perf_counter()
+
+        self.cmd_state.set_submitting()
+        self.last_command = cmd
+        self._submitter_thread = threading.current_thread()
+        self._last_submit = time.monotonic()
+        try:
+            self._putCommand(env, self.cmd_exec_timeout)
+        except queue.Full:
+            self.log.error('Command window full: could not submit %s', cmd)
+            # Nothing was queued: the bridge can take the next command
+            self.cmd_state.set_failed()
+            self.cmd_state.set_undefined()
+            raise
+        self.cmd_state.set_submitted()
+        self.cmd_state.set_finished()
+        # heart beat of the pipeline, see :class:`bcib.watchdog.Watchdog`
+        self._outstanding.add(future)
+        future.add_done_callback(self._outstanding.discard)
+        return future
+
 
 class _BridgeToIteratorMixin:
     '''Receives objects from queue and passes it to the iterator
@@ -260,11 +905,16 @@ class _BridgeToIteratorMixin:
         # self.checkOnStart()
 
         r = None
+        self._iterator_thread = threading.current_thread()
+        self._iterating = True
         try:
             r = (yield from self.execute())
         finally:
+            self._iterating = False
+            self._left_iteration = time.monotonic()
+            # no return here: it would swallow the exception
             self.log.info('Iterator finished. Returning value %s', (r,))
-            return r
+        return r
 
     def execute(self):
         '''execute one command after the other.
@@ -285,96 +935,280 @@ class _BridgeToIteratorMixin:
             # raise AssertionError(txt)
 
         if self.state.is_stopping:
-            logger.waring('Executor is stopping. Still asked to restart')
+            self.log.warning('Executor is stopping. Still asked to restart')
 
         cls_name = self.__class__.__name__
-        self.log.info('%s waiting for commands to execute', (cls_name,))
+        self.log.info('%s waiting for commands to execute', cls_name)
 
+        tracer = self.tracer
         for cnt in itertools.count():
-            cmd = self.command_queue.get(self.next_cmd_timeout)
+            if tracer is not None:
+                t_trace = time.perf_counter()
+            try:
+                seq, cmd = self.command_queue.get(
+                    timeout=self.next_cmd_timeout
+                )
+            except queue.Empty:
+                self.log.error('%s: no command received within %s s',
+                               cls_name, self.next_cmd_timeout)
+                raise
+            if tracer is not None:
+                tracer.span('dequeue', t_trace, None, seq)
+
+            if self._isStale(seq):
+                self.log.info('%s: dropping stale cmd %s of submission %s',
+                              cls_name, cmd, seq)
+                self._dropCommand(cmd)
+                continue
 
             if cmd is end_of_evaluation:
                 # That's all folks
                 self.log.info('%s: evaluation finished', cls_name)
                 return
 
-            self.log.info(f'{cls_name}: executing cmd no, {cnt}: {cmd}')
+            env = None
+            future = None
+            project = self.projector
+            if isinstance(cmd, _Command):
+                env = cmd
+                cmd = env.cmd
+                future = env.future
+                if env.project is not None:
+                    project = env.project
+                if (future is not None
+                        and not future.set_running_or_notify_cancel()):
+                    self.log.info('%s: cmd no %d: %s was cancelled.'
+                                  ' Not executing it', cls_name, cnt, cmd)
+                    continue
+                if self._stats is not None:
+                    env.t_dequeue = time.perf_counter()
+                else:
+                    # only needed for counting messages
+                    env = None
+
+            self._last_progress = time.monotonic()
+            t_start = self._logCommandStart(cnt, cmd)
 
             try:
 
-                # Consider yielding message per message
-                # That would give this part a better idea what is happening.
-                # e.g. timeout reset after each command received.
-                # Thus timeout after the last command.
-                r = (yield from self._executeSingle(cmd))
+                if isinstance(cmd, _CommandBatch):
+                    r = (yield from self._executeBatch(cmd, env))
+                else:
+                    r = (yield from self._executeSingle(cmd, env, future))
+                if project is not None and not isinstance(r, Cancelled):
+                    r = self._projectResult(cmd, r, project)
 
             except Exception as exc:
                 stream = sys.stderr
                 stream.flush()
                 txt = f'Received exception {exc} while executing cmd {cmd}'
-                traceback.print_exc(stream)
+                traceback.print_exc(file=stream)
                 stream.write('Error: ' + txt)
                 stream.flush()
                 self.log.error(txt)
-                self.result_queue.put(exc)
+                self._putResult(exc, future, seq=seq)
                 raise exc
 
-            self.log.info(f'cmd {cmd} produced result {r}')
+            if env is not None:
+                env.t_done = time.perf_counter()
+            self._logCommandDone(cnt, cmd, r, t_start)
             # self.command_queue.task_done()
-            self.result_queue.put(r)
+            self._putResult(r, future, env, seq)
 
-    def _executeSingle(self, cmd):
-        '''
-        Todo:
-            Consider if a 'static' or instance message is yielded
-            as soon as execution stops.
+    def _projectResult(self, cmd, r, project):
+        '''Reduce the result before it is handed back
 
-            Why:
-                e.g. bluesky deferred pause request. Then timeouts should be
-                delayed until resume is issued. Halt, abort, should be handled.
+        For a batch the projection is applied to the result of each
+        command.
         '''
+        if isinstance(cmd, _CommandBatch):
+            return [project(v) for v in r]
+        return project(r)
 
-        cls_name = self.__class__.__name__
-        self.log.info(f'{cls_name}: waiting for commands to execute')
-
-        fmt = (
-            '{}: status is {} but commands are still requested to be executed.'
-            'Stopping before executing cmd {}'
-        )
+    def _logCommandStart(self, cnt, cmd):
+        '''Log that the command is executed
 
-        def run_iter(a_iter):
-            '''A much ado about intercepting in between all these messages
+        Returns:
+            start time, if needed by :meth:`_logCommandDone`
+        '''
+        if self.structured_log:
+            return time.perf_counter()
+        if self.log.isEnabledFor(logging.INFO):
+            self.log.info('%s: executing cmd no %d: %s',
+                          self.__class__.__name__, cnt, cmd)
+        return None
+
+    def _logCommandDone(self, cnt, cmd, r, t_start):
+        '''Log that the command finished
+
+        In structured mode only a compact record is emitted instead
+        of the representation of the result.
+        '''
+        if self.structured_log:
+            self._logEvent(
+                'executed', cmd_no=cnt, cmd=_command_name(cmd),
+                duration=time.perf_counter() - t_start,
+                result_type=type(r).__name__, result_len=_result_len(r)
+            )
+        elif self.log.isEnabledFor(logging.INFO):
+            self.log.info('cmd %s produced result %s', cmd, r)
+
+    def _putResult(self, r, future=None, env=None, seq=None):
+        '''Hand the result back to the submitter
+
+        Args:
+            r:      result or exception raised by the command
+            future: the future of a command submitted by
+                    :meth:`submit_nowait`. If None the result is
+                    put on the result queue
+            env:    the command envelope if statistics are collected
+            seq:    sequence number of the command
+        '''
+        tracer = self.tracer
+        if tracer is not None:
+            t_trace = time.perf_counter()
+        if env is not None:
+            env.t_result = time.perf_counter()
+            if future is not None:
+                self._stats.record(env)
+
+        if future is None:
+            self.result_queue.put((seq, r))
+        elif isinstance(r, Exception):
+            future.set_exception(r)
+        else:
+            future.set_result(r)
+        if tracer is not None:
+            tracer.span('result put', t_trace, None, seq)
+
+    def _executeBatch(self, batch, env=None):
+        '''Execute the commands of a batch one after the other
+
+        Returns:
+            list of the results
+        '''
+        r = []
+        for cmd in batch.cmds:
+            r.append((yield from self._executeSingle(cmd, env)))
+        return r
 
-            Todo:
-                Context manager
-            '''
-            while True:
-                try:
-                    val = next(a_iter)
-                except StopIteration as si:
-                    return si.value
+    def _dropPending(self):
+        '''Drop the commands queued once the delegation stops
 
-                if self.state.is_stopping:
+        Their futures are cancelled as done by :meth:`clearQueues`.
+        The end of evaluation is kept for the iterator.
+        '''
+        cls_name = self.__class__.__name__
+        eoe = None
+        while True:
+            try:
+                seq, cmd = self.command_queue.get(block=False)
+            except queue.Empty:
+                break
+            if cmd is end_of_evaluation:
+                eoe = (seq, cmd)
+                continue
+            self.log.info('%s: delegation stopped: dropping queued cmd %s',
+                          cls_name, cmd)
+            self._dropCommand(cmd)
+        if eoe is not None:
+            self.command_queue.put(eoe, block=False)
+
+    def _superviseMessages(self, gen, env=None, future=None):
+        '''Yield the messages of the generator one by one
+
+        Values sent and exceptions thrown into this generator are
+        passed on to `gen`. For each message
+
+            * the time of the last progress is updated. The submitter
+              waits :attr:`cmd_exec_timeout` from this time on (see
+              :meth:`_getResult`)
+            * every :attr:`check_interval` messages the state of the
+              bridge is checked. If the delegation is stopping or
+              stopped, the commands still queued are dropped (see
+              :meth:`_dropPending`): the command executed is
+              finished. If the bridge failed (e.g. the submitter
+              timed out), the command is closed and
+              :class:`ExecutionStopRequest` is raised. A query of the
+              (checked) state machine costs about as much as
+              handing over a message. Thus it is not made for each
+              message by default
+            * if cancellation of the command was requested on its
+              `future` (see :meth:`CommandFuture.cancel`), the
+              command is closed and :class:`Cancelled` is returned
+              instead of the message
+            * with a :attr:`tracer` the time until the consumer asks
+              for the next message is recorded (see :mod:`bcib.trace`)
+
+        Args:
+            gen:    the generator returned by the command
+            env:    the command envelope. Messages are counted in it
+            future: the :class:`CommandFuture` of the command
+        '''
+        interval = self.check_interval
+        tracer = self.tracer
+        send = gen.send
+        drained = False
+        send_val = None
+        exc = None
+        n_msgs = 0
+        while True:
+            try:
+                if exc is None:
+                    msg = send(send_val)
+                else:
+                    msg = gen.throw(exc)
+            except StopIteration as si:
+                if env is not None:
+                    env.n_msgs += n_msgs
+                return si.value
+            if future is not None and future.cancel_requested:
+                gen.close()
+                if env is not None:
+                    env.n_msgs += n_msgs
+                self.log.info('%s: command cancelled after %d messages',
+                              self.__class__.__name__, n_msgs)
+                return Cancelled(n_msgs)
+            n_msgs += 1
+            self._last_progress = time.monotonic()
+            if interval and n_msgs % interval == 0:
+                state = self.state
+                if state.is_failed:
+                    gen.close()
                     txt = (
-                        f'{cls_name} Request for stopping command execution.'
-                        f' Stopping before executing cmd {val}'
+                        f'{self.__class__.__name__}: bridge failed. Stopping'
+                        f' command execution before message {msg}'
                     )
-                    self.log.info(txt)
-                    raise ExecutionStopRequest(txt)
-
-                elif self.state.is_stopped or self.state.is_failed:
-                    txt = fmt.format(cls_name, self.state.state, val)
                     self.log.warning(txt)
                     raise ExecutionStopRequest(txt)
-
-                else:
-                    txt = 'Why am I in state {}'.format(self.state.state)
-                    raise AssertionError(txt)
-
-                yield val
-
-        r = (yield from cmd())
-        return r
+                if not drained and (state.is_stopping or state.is_stopped):
+                    drained = True
+                    self._dropPending()
+            exc = None
+            if tracer is not None:
+                t_trace = time.perf_counter()
+            try:
+                send_val = (yield msg)
+            except GeneratorExit:
+                gen.close()
+                raise
+            except BaseException as e:
+                exc = e
+                send_val = None
+            if tracer is not None:
+                tracer.span('message', t_trace, None, msg)
+
+    def _executeSingle(self, cmd, env=None, future=None):
+        '''Execute the command, supervising each of its messages
+
+        See :meth:`_superviseMessages`. If the consumer pauses, the
+        command stays suspended at its current message and continues
+        on resume: it is neither restarted nor re-issued. bluesky
+        rewinds to its last checkpoint by replaying the messages it
+        cached itself. Halt, abort or stop close the command: then
+        :meth:`stopDelegation` answers the waiting submitter.
+        '''
+        return (yield from self._superviseMessages(cmd(), env, future))
 
 
 class CallbackIteratorBridge(
@@ -387,6 +1221,10 @@ class CallbackIteratorBridge(
 
     see :class:`CallbackIteratorBridgeInterface` for details
     '''
+    #: the :class:`bcib.watchdog.Watchdog` if one was attached by
+    #: :func:`bcib.threaded_bridge.setup_bridge`
+    watchdog = None
+
     ## # -------------------------------------------------------------------------
     ## # Context manager methods
     ## def __enter__(self):
@@ -23,7 +23,37 @@ class CallbackIteratorBridgeInterface(metaclass=ABCMeta):
         result_queue  :    a queue of length 1
         next_cmd_timeout : maximum time to wait for the next command
         cmd_exec_timeout : maximum time to wait for the return value
-                           of the executed command
+                           of the executed command without any
+                           progress, i.e. a message yielded by it
+        check_interval :   check the state of the bridge every this
+                           many messages of a command. Execution
+                           stops if the bridge failed. 0: never
+        pipeline_depth :   number of commands that can be queued by
+                           :meth:`submit_nowait`. The command queue
+                           is expected to be of this length
+        state_checks :     if False compact state tracking without
+                           any transition checks is used
+        structured_log :   log a compact record per executed command
+                           instead of the representation of command
+                           and result
+        collect_stats :    record the timing of each command. See
+                           :mod:`bcib.stats`
+        stats_hook :       called with the timing of each command.
+                           Enables collecting the statistics
+        cache :            a :class:`bcib.cache.ResultCache`. Results
+                           of repeated commands are then taken from it
+        journal :          a :class:`bcib.journal.EvaluationJournal`.
+                           Results are recorded in it and replayed
+                           from it
+        projector :        applied by the iterator to the result of
+                           each command, unless a projection is given
+                           to :meth:`submit`. Only its return value
+                           is handed back
+        timeout_policy :   e.g. a :class:`bcib.timeouts.AdaptiveTimeout`.
+                           Derives the time to wait for the result of
+                           a command from the times observed before
+        tracer :           a :class:`bcib.trace.Tracer` recording the
+                           activity of both sides on a timeline
         log :              a logger.Logger instance. If not given a
                            default logger will be used
 
@@ -83,7 +113,7 @@ class CallbackIteratorBridgeInterface(metaclass=ABCMeta):
         raise NotImplementedError('Implement in derived class')
 
     @abstractmethod
-    def submit(self, obj, wait_for_result=True):
+    def submit(self, obj, wait_for_result=True, key=None, project=None):
         '''Submit a command to the iterator
 
         In a typical callback the user will submit an object. This
@@ -95,11 +125,48 @@ class CallbackIteratorBridgeInterface(metaclass=ABCMeta):
             wait_for_result : if the end result shall be waited for.
                               Typically only used internally.
                               Set to false when stopping delegation
+            key :             key of the object for the cache or the
+                              journal (if the bridge uses one)
+            project :         callable reducing the result, e.g. to
+                              the value of one signal. It is called
+                              by the iterator: only the reduced
+                              value is handed back
         Returns:
             the value returned by the iteration
         '''
         raise NotImplementedError('Implement in derived class')
 
+    @abstractmethod
+    def submit_many(self, objs, project=None):
+        '''Submit a batch of commands to the iterator
+
+        All objects are handed over to the iterator at once and
+        yielded one after the other.
+
+        Args:
+            objs:             iterable of objects to hand over to the
+                              delegator user
+            project :         applied to the result of each object
+        Returns:
+            list of the values returned by the iterations
+        '''
+        raise NotImplementedError('Implement in derived class')
+
+    @abstractmethod
+    def submit_nowait(self, obj, project=None):
+        '''Submit a command to the iterator without waiting
+
+        Args:
+            obj:              object to hand over to the delegator
+                              user
+            project :         see :meth:`submit`
+        Returns:
+            a :class:`concurrent.futures.Future` that will receive
+            the value returned by the iteration. Cancelling it
+            drops the command if it is still queued
+        '''
+        raise NotImplementedError('Implement in derived class')
+
     @abstractmethod
     def __iter__(self):
         '''
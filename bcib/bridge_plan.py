@@ -1,9 +1,20 @@
 '''A bluesky compatible bridge plan stub
 
 See :func:`bridge_plan_stub`
+
+For solvers providing an ask / tell interface no bridge is required.
+See :func:`ask_tell_plan_stub`
+
+Commands moving several axes at the same time are made by
+:func:`set_point_command`. These require bluesky.
 '''
 # from bluesky import plan_stubs as bps, preprocessors as bpp
+from .exceptions import ExecutionStopRequest
+import functools
+import itertools
 import logging
+import time
+import uuid
 
 logger = logging.getLogger('bcib')
 
@@ -27,6 +38,9 @@ def bridge_plan_stub(bridge, log=None):
         log = logger
 
     stop_method = bridge.stopDelegation
+    tracer = getattr(bridge, 'tracer', None)
+    if tracer is not None:
+        t_trace = time.perf_counter()
 
     def run_inner(bridge):
         return (yield from bridge)
@@ -34,12 +48,171 @@ def bridge_plan_stub(bridge, log=None):
     try:
         r = (yield from run_inner(bridge))
     except Exception as exc:
-        logger.error(
-            f'bridge_plan_stub: Failed to execute {bridge} reason: {exc}'
-        )
+        log.error('bridge_plan_stub: Failed to execute %s reason: %s',
+                  bridge, exc)
         raise exc
     finally:
-        logger.info(f'bridge_plan_stub: End of evaluating {bridge}')
+        log.info('bridge_plan_stub: End of evaluating %s', bridge)
         stop_method()
+        if tracer is not None:
+            tracer.span('bridge_plan_stub', t_trace)
+
+    return r
+
+
+def ask_tell_plan_stub(optimizer, make_cmd, reduce=None,
+                       max_evaluations=None, stop=None, log=None):
+    '''Plan stub driving an ask / tell optimizer
+
+    Many optimizers (e.g. scikit-optimize, nevergrad) provide an
+    ask / tell interface. Then no thread and no bridge is required:
+    the points are asked for and the messages of their evaluation
+    are yielded directly within the thread consuming the plan.
+
+    For each evaluation:
+
+    ::
+
+        x = optimizer.ask()
+        r = yield from make_cmd(x)()
+        optimizer.tell(x, reduce(r))
+
+    `make_cmd` returns the same kind of command as submitted to
+    :meth:`bcib.CallbackIteratorBridge.submit`.
+
+    The evaluation stops when
+        * `max_evaluations` were made
+        * `stop(optimizer)` returns True (checked before each ask)
+        * `optimizer.ask` raises :class:`bcib.ExecutionStopRequest`
+
+    Exceptions raised by the commands are raised as by
+    :func:`bridge_plan_stub`.
+
+    Args:
+        optimizer:       object with methods `ask()` and `tell(x, value)`
+        make_cmd:        returns the command for the asked point
+        reduce:          maps the result of the command to the value
+                         told to the optimizer. Defaults to the result
+        max_evaluations: maximum number of evaluations. None: no limit
+        stop:            callable returning True if the optimizer is
+                         done
+        log:             a :class:`logging.Logger` object
+
+    Returns:
+        the last value received, as :func:`bridge_plan_stub`
+    '''
+    if log is None:
+        log = logger
+
+    name = optimizer.__class__.__name__
+    r = None
+    if max_evaluations is None:
+        counter = itertools.count()
+    else:
+        counter = range(max_evaluations)
+
+    for cnt in counter:
+        if stop is not None and stop(optimizer):
+            log.info('ask_tell_plan_stub: %s done after %d evaluations',
+                     name, cnt)
+            break
+        try:
+            x = optimizer.ask()
+        except ExecutionStopRequest as esr:
+            log.info('ask_tell_plan_stub: %s requested stop after %d'
+                     ' evaluations: %s', name, cnt, esr)
+            break
+
+        cmd = make_cmd(x)
+        try:
+            r = (yield from cmd())
+        except Exception as exc:
+            log.error('ask_tell_plan_stub: Failed to execute %s reason: %s',
+                      cmd, exc)
+            raise exc
+
+        if reduce is not None:
+            optimizer.tell(x, reduce(r))
+        else:
+            optimizer.tell(x, r)
 
     return r
+
+
+def set_and_read_stub(set_point, detectors=(), group=None, read=None):
+    '''Move all axes of the set point at the same time, then read once
+
+    A `set` message is yielded for each axis, all within the same
+    group, followed by a single `wait` for this group. Thus the
+    time required is the one of the slowest axis and not the sum
+    of all of them. Then the detectors and the moved devices are
+    read by one `read` plan stub.
+
+    Args:
+        set_point: mapping or sequence of (device, value) pairs
+        detectors: devices to read together with the moved ones
+        group:     group of the `set` messages. A unique one is
+                   used by default
+        read:      plan stub called with the list of devices to
+                   read. Defaults to
+                   :func:`bluesky.plan_stubs.trigger_and_read`
+
+    Returns:
+        the value returned by `read`, i.e. the same as if the axes
+        were moved one after the other
+    '''
+    from bluesky import plan_stubs as bps
+
+    if read is None:
+        read = bps.trigger_and_read
+    if group is None:
+        group = str(uuid.uuid4())
+    if hasattr(set_point, 'items'):
+        set_point = set_point.items()
+    set_point = list(set_point)
+
+    yield from bps.checkpoint()
+    for device, value in set_point:
+        yield from bps.abs_set(device, value, group=group)
+    yield from bps.wait(group=group)
+
+    devices = list(detectors)
+    devices += [device for device, value in set_point
+                if device not in devices]
+    return (yield from read(devices))
+
+
+def set_point_command(motors, detectors=(), read=None):
+    '''Make commands moving the motors to a point of the solver
+
+    Typical usage within the solver callback:
+
+    ::
+
+        make_cmd = set_point_command([mx, my], dets)
+
+        def cb(x):
+            return bridge.submit(make_cmd(x), project=figure_of_merit)
+
+    Args:
+        motors:    the axes, in the order of the coordinates of the
+                   point
+        detectors: see :func:`set_and_read_stub`
+        read:      see :func:`set_and_read_stub`
+
+    Returns:
+        function mapping a point (a sequence of values, one per
+        motor) to a command for :meth:`bcib.CallbackIteratorBridge.submit`
+    '''
+    motors = list(motors)
+    detectors = list(detectors)
+
+    def make_cmd(x):
+        x = list(x)
+        if len(x) != len(motors):
+            txt = f'point {x} has {len(x)} values for {len(motors)} motors'
+            raise ValueError(txt)
+        return functools.partial(set_and_read_stub, list(zip(motors, x)),
+                                 detectors, read=read)
+
+    return make_cmd
@@ -0,0 +1,176 @@
+'''Cache of the results of submitted commands
+
+Solvers often evaluate the same point (or nearly the same point)
+again, e.g. brentq, Nelder-Mead or line searches. Each of these
+evaluations moves real hardware. A :class:`ResultCache` given to
+the bridge returns the result of such a repeated evaluation
+immediately, without passing the command over the bridge.
+
+The cache is keyed on a command key. By default it is derived from
+the function, the arguments and the keywords of the
+:func:`functools.partial` command (see :func:`partial_key`). A key
+can also be given explicitly to :meth:`submit`.
+
+Entries are evicted least recently used first, and optionally
+after a time to live. If a tolerance is given, float elements of
+the key match within this tolerance.
+
+Typical usage:
+
+::
+
+    cache = ResultCache(maxsize=256, ttl=600, atol=1e-6)
+    bridge = setup_bridge(cache=cache)
+
+    def cb(x):
+        r = bridge.submit(functools.partial(step_stub, dets, motor, x))
+        ...
+
+    print(cache.info())
+
+Warning:
+    Only use it if repeating the evaluation would give the same
+    result, i.e. if the measured system does not drift.
+'''
+import collections
+import math
+import threading
+import time
+
+
+def _freeze(obj):
+    '''Make lists, tuples, sets and dicts hashable
+    '''
+    if isinstance(obj, (list, tuple)):
+        return tuple(_freeze(v) for v in obj)
+    elif isinstance(obj, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in obj.items()))
+    elif isinstance(obj, (set, frozenset)):
+        return frozenset(_freeze(v) for v in obj)
+    return obj
+
+
+def partial_key(cmd):
+    '''Default command key: function, arguments and keywords
+
+    Args:
+        cmd: a :func:`functools.partial` object. Other objects are
+             used as key themselves
+    '''
+    func = getattr(cmd, 'func', None)
+    if func is None:
+        return cmd
+    return (func, _freeze(cmd.args), _freeze(cmd.keywords))
+
+
+def _match(a, b, rtol, atol):
+    '''Compare keys, float elements within the tolerance
+    '''
+    if isinstance(a, float) and isinstance(b, float):
+        return math.isclose(a, b, rel_tol=rtol, abs_tol=atol)
+    elif isinstance(a, tuple) and isinstance(b, tuple):
+        if len(a) != len(b):
+            return False
+        return all(_match(x, y, rtol, atol) for x, y in zip(a, b))
+    return a == b
+
+
+class ResultCache:
+    '''LRU cache of command results with optional time to live
+
+    Args:
+        maxsize: maximum number of entries
+        ttl:     time to live of an entry in seconds. None: no expiry
+        rtol:    relative tolerance for float elements of the key
+        atol:    absolute tolerance for float elements of the key
+        key:     function deriving the key from the command
+
+    If a tolerance is given, keys not found by an exact lookup are
+    compared to all entries. Thus keep `maxsize` moderate then.
+    '''
+    def __init__(self, maxsize=128, ttl=None, rtol=0.0, atol=0.0,
+                 key=partial_key):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.rtol = rtol
+        self.atol = atol
+        self.key = key
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> (time stored, result)
+        self._entries = collections.OrderedDict()
+
+    def __repr__(self):
+        cls_name = self.__class__.__name__
+        return (f'{cls_name}(maxsize={self.maxsize}, ttl={self.ttl},'
+                f' rtol={self.rtol}, atol={self.atol},'
+                f' hits={self.hits}, misses={self.misses})')
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _find(self, key):
+        '''key of the entry matching the given key or None
+        '''
+        try:
+            if key in self._entries:
+                return key
+        except TypeError:
+            # not hashable
+            return None
+
+        if self.rtol == 0 and self.atol == 0:
+            return None
+        for entry_key in self._entries:
+            if _match(key, entry_key, self.rtol, self.atol):
+                return entry_key
+        return None
+
+    def lookup(self, key):
+        '''Look up the result stored for the key
+
+        Returns:
+            tuple (found, result)
+        '''
+        with self._lock:
+            entry_key = self._find(key)
+            if entry_key is not None:
+                t_stored, r = self._entries[entry_key]
+                age = time.monotonic() - t_stored
+                if self.ttl is not None and age > self.ttl:
+                    del self._entries[entry_key]
+                else:
+                    self._entries.move_to_end(entry_key)
+                    self.hits += 1
+                    return True, r
+            self.misses += 1
+            return False, None
+
+    def store(self, key, r):
+        '''Store the result for the key
+
+        Keys which are not hashable are silently ignored.
+        '''
+        with self._lock:
+            try:
+                self._entries[key] = (time.monotonic(), r)
+            except TypeError:
+                return
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        '''Remove all entries and reset the counters
+        '''
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        '''Hit and miss counters and the current size
+        '''
+        return {'hits': self.hits, 'misses': self.misses,
+                'size': len(self._entries), 'maxsize': self.maxsize}
@@ -0,0 +1,112 @@
+'''Compact state tracking for the bridge
+
+The state machines of :mod:`bcib.bridge` are
+:class:`super_state_machine.machines.StateMachine` instances. Each
+query and each transition translates the state names and checks the
+transition table. As these state machines are mainly a debugging
+aid, this cost is not always wanted on every :meth:`submit`.
+
+:func:`compact_state_class` derives a class with the same interface
+(``is_<state>``, ``set_<state>()`` and :attr:`state`) from such a
+state machine. The state is stored as an int in a slot. Transitions
+are only validated if requested.
+
+The bridge selects these classes by ``state_checks=False``. See
+:class:`bcib.bridge._BaseClass_Bridge`.
+'''
+from super_state_machine.errors import TransitionError
+
+
+class CompactState:
+    '''Base class of the generated compact state classes
+
+    Args:
+        checked: validate each transition against the transition
+                 table of the original state machine
+
+    Raises:
+        super_state_machine.errors.TransitionError: in checked mode
+                 for transitions not allowed by the table
+    '''
+    __slots__ = ['_state', 'checked']
+
+    #: names of the states, indexed by the state number
+    _names = ()
+    #: allowed next states, indexed by the state number
+    _transitions = ()
+    _initial = 0
+
+    def __init__(self, checked=False):
+        self._state = self._initial
+        self.checked = checked
+
+    def __repr__(self):
+        cls_name = self.__class__.__name__
+        return f'{cls_name}(state={self.state!r}, checked={self.checked})'
+
+    @property
+    def state(self):
+        '''name of the current state
+        '''
+        return self._names[self._state]
+
+    def _set(self, new):
+        if self.checked and new not in self._transitions[self._state]:
+            txt = (
+                f'Cannot transit from {self._names[self._state]!r}'
+                f' to {self._names[new]!r}.'
+            )
+            raise TransitionError(txt)
+        self._state = new
+
+
+def _make_is(num):
+    def is_state(self):
+        return self._state == num
+    return property(is_state)
+
+
+def _make_set(num):
+    def set_state(self):
+        if self.checked:
+            self._set(num)
+        else:
+            self._state = num
+    return set_state
+
+
+def compact_state_class(machine_cls, name=None):
+    '''Derive a compact state class from a state machine class
+
+    Args:
+        machine_cls: a :class:`super_state_machine.machines.StateMachine`
+                     subclass with `States` enum and `Meta` class
+                     defining `initial_state` and `transitions`
+        name:        name of the class. Defaults to `Compact` followed
+                     by the name of the machine class
+    '''
+    if name is None:
+        name = 'Compact' + machine_cls.__name__
+
+    names = tuple(state.value for state in machine_cls.States)
+    index = {state_name: num for num, state_name in enumerate(names)}
+    transitions = tuple(
+        frozenset(
+            index[target]
+            for target in machine_cls.Meta.transitions.get(state_name, [])
+        )
+        for state_name in names
+    )
+
+    d = {
+        '__slots__': [],
+        '__doc__': f'Compact variant of :class:`{machine_cls.__name__}`',
+        '_names': names,
+        '_transitions': transitions,
+        '_initial': index[machine_cls.Meta.initial_state],
+    }
+    for state_name, num in index.items():
+        d['is_' + state_name] = _make_is(num)
+        d['set_' + state_name] = _make_set(num)
+
+    return type(name, (CompactState,), d)
@@ -2,3 +2,12 @@ class ExecutionStopRequest(RuntimeError):
     '''
     '''
     pass
+
+
+class PeerLost(RuntimeError):
+    '''The thread on the other side of the bridge is gone
+
+    Raised by the side still alive if the
+    :class:`bcib.watchdog.Watchdog` found its peer dead.
+    '''
+    pass
@@ -0,0 +1,242 @@
+'''Persistent journal of evaluations with replay
+
+If an optimisation fails part way (timeout,
+:class:`bcib.ExecutionStopRequest`, run engine abort) the
+evaluations made so far are lost. Running it again measures all of
+them again on the hardware.
+
+An :class:`EvaluationJournal` given to the bridge appends each
+(command key, result) pair to a memory mapped file. When the solver
+is restarted with the same journal, it typically submits the same
+commands again in the same order. This deterministic prefix is
+answered from the journal. As soon as a submitted key differs from
+the journal, or the journal is exhausted, the commands are executed
+again and appended to the journal.
+
+File layout:
+    * header: magic (8 bytes), number of used bytes (uint64)
+    * records: length (uint32) followed by the pickled
+      (key, result) tuple
+
+The number of used bytes is updated after the record is written.
+Thus a record that was not completely written is ignored when the
+journal is opened again.
+
+Typical usage:
+
+::
+
+    with EvaluationJournal('scan_042.journal') as journal:
+        bridge = setup_bridge(journal=journal)
+        ...
+'''
+import logging
+import mmap
+import os
+import pickle
+import struct
+
+logger = logging.getLogger('bcib')
+
+_magic = b'BCIBJRN1'
+_header = struct.Struct('<8sQ')
+_record_len = struct.Struct('<I')
+
+
+def _plain(obj):
+    '''Replace objects by something comparable across sessions
+    '''
+    if obj is None or isinstance(obj, (bool, int, float, complex, str,
+                                       bytes)):
+        return obj
+    elif isinstance(obj, (list, tuple)):
+        return tuple(_plain(v) for v in obj)
+    elif isinstance(obj, dict):
+        return tuple(sorted((k, _plain(v)) for k, v in obj.items()))
+    name = getattr(obj, 'name', None)
+    if isinstance(name, str):
+        # e.g. ophyd devices
+        return (type(obj).__qualname__, name)
+    return type(obj).__qualname__
+
+
+def journal_key(cmd):
+    '''Default command key of the journal
+
+    Made of the name of the function and the arguments of a
+    :func:`functools.partial` command. Arguments which are neither
+    numbers, strings nor containers are represented by their type
+    and their `name` attribute (e.g. ophyd devices). Thus the key
+    can be stored and compares equal in a later session.
+    '''
+    func = getattr(cmd, 'func', cmd)
+    name = getattr(func, '__qualname__', type(func).__qualname__)
+    module = getattr(func, '__module__', None)
+    args = getattr(cmd, 'args', ())
+    keywords = getattr(cmd, 'keywords', {})
+    return (module, name, _plain(args), _plain(keywords))
+
+
+class EvaluationJournal:
+    '''Append only journal of (key, result) pairs
+
+    Args:
+        path:       file of the journal
+        replay:     answer the prefix of the submissions matching
+                    the journal. If False an existing journal is
+                    discarded
+        key:        function deriving the key from the command
+        chunk_size: the file grows by this number of bytes
+        sync:       flush the memory map to disk after each record.
+                    Otherwise records survive a crash of the process,
+                    but not one of the operating system
+        log:        a :class:`logging.Logger` object
+    '''
+    def __init__(self, path, replay=True, key=journal_key,
+                 chunk_size=2**20, sync=False, log=None):
+        if log is None:
+            log = logger
+        self.log = log
+        self.path = path
+        self.key = key
+        self.chunk_size = chunk_size
+        self.sync = sync
+
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        self._fp = open(path, 'r+b' if exists else 'w+b')
+        if not exists:
+            self._fp.truncate(chunk_size)
+        self._map()
+
+        if exists:
+            magic = None
+            if len(self._mm) >= _header.size:
+                magic, used = _header.unpack_from(self._mm, 0)
+            if magic != _magic:
+                self.close()
+                raise ValueError(f'{path} is not an evaluation journal')
+        if not exists or not replay:
+            used = _header.size
+            self._setUsed(used)
+        self._used = used
+
+        #: offsets of the records to replay
+        self._offsets = self._scan()
+        self._replay_pos = 0
+        self.replayed = 0
+
+    def __repr__(self):
+        cls_name = self.__class__.__name__
+        return (f'{cls_name}({self.path!r}, records={len(self)},'
+                f' replaying={self.replaying})')
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def _map(self):
+        self._mm = mmap.mmap(self._fp.fileno(), 0)
+
+    def _setUsed(self, used):
+        _header.pack_into(self._mm, 0, _magic, used)
+
+    def _scan(self):
+        offsets = []
+        pos = _header.size
+        while pos < self._used:
+            offsets.append(pos)
+            n, = _record_len.unpack_from(self._mm, pos)
+            pos += _record_len.size + n
+        return offsets
+
+    def _read(self, offset):
+        n, = _record_len.unpack_from(self._mm, offset)
+        start = offset + _record_len.size
+        return pickle.loads(self._mm[start:start + n])
+
+    @property
+    def replaying(self):
+        '''True as long as the submissions follow the journal
+        '''
+        return self._replay_pos is not None
+
+    def _stopReplay(self):
+        '''Forget the records which were not replayed
+        '''
+        if self._replay_pos < len(self._offsets):
+            self.log.warning(
+                f'{self.__class__.__name__}: submission diverged from'
+                f' journal after {self._replay_pos} records. Discarding'
+                f' {len(self._offsets) - self._replay_pos} records'
+            )
+            self._used = self._offsets[self._replay_pos]
+            del self._offsets[self._replay_pos:]
+            self._setUsed(self._used)
+        self._replay_pos = None
+
+    def lookup(self, key):
+        '''Result of the next record if its key matches
+
+        Returns:
+            tuple (found, result)
+        '''
+        if self._replay_pos is None:
+            return False, None
+        if self._replay_pos >= len(self._offsets):
+            self._stopReplay()
+            return False, None
+
+        rec_key, r = self._read(self._offsets[self._replay_pos])
+        if rec_key != key:
+            self._stopReplay()
+            return False, None
+        self._replay_pos += 1
+        self.replayed += 1
+        return True, r
+
+    def append(self, key, r):
+        '''Append the record for a live evaluation
+
+        A record which can not be pickled is not journaled: the
+        evaluation already succeeded. A later replay diverges there.
+
+        Returns:
+            True if the record was appended
+        '''
+        if self._replay_pos is not None:
+            self._stopReplay()
+
+        try:
+            data = pickle.dumps((key, r), protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as exc:
+            # e.g. PicklingError, TypeError or AttributeError
+            self.log.warning('%s: not journaling result of %s: %s',
+                             self.__class__.__name__, key, exc)
+            return False
+        end = self._used + _record_len.size + len(data)
+        if end > len(self._mm):
+            size = -(-end // self.chunk_size) * self.chunk_size
+            self._mm.close()
+            self._fp.truncate(size)
+            self._map()
+
+        _record_len.pack_into(self._mm, self._used, len(data))
+        start = self._used + _record_len.size
+        self._mm[start:end] = data
+        self._offsets.append(self._used)
+        self._used = end
+        # only now the record becomes part of the journal
+        self._setUsed(end)
+        if self.sync:
+            self._mm.flush()
+        return True
+
+    def close(self):
+        self._mm.flush()
+        self._mm.close()
+        self._fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.close()
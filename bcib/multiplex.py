@@ -0,0 +1,353 @@
+'''Many submitting solvers, one iterator
+
+:class:`bcib.CallbackIteratorBridge` serves exactly one submitter.
+A multi start optimisation runs K independent solvers. With one
+bridge per solver the run engine would have to run them one after
+the other.
+
+:func:`setup_multiplex_bridge` returns a :class:`MultiplexBridge`
+with K channels. Each channel is the submitting half of a bridge
+(with :meth:`submit`, :meth:`submit_many`, :meth:`submit_nowait`
+and :meth:`stopDelegation`) used by one solver thread. The commands
+of all channels are scheduled into the single stream of messages
+of the multiplex bridge:
+
+    * round-robin: the channels are served in turn
+    * priority: the channel of highest priority with a pending
+      command is served. Channels of equal priority in turn
+
+The result of each command is handed back to the channel that
+submitted it. The iteration ends when all channels stopped their
+delegation.
+
+Typical usage:
+
+::
+
+    bridge = setup_multiplex_bridge(len(starts))
+
+    def run_solver(channel, x0):
+        try:
+            def cb(x):
+                return channel.submit(functools.partial(step_stub, x))
+            return solver(cb, x0)
+        finally:
+            channel.stopDelegation()
+
+    threads = [
+        threading.Thread(target=run_solver, args=(channel, x0))
+        for channel, x0 in zip(bridge.channels, starts)
+    ]
+    for thread in threads:
+        thread.start()
+    yield from bridge_plan_stub(bridge)
+
+The progress of the iterator is not seen by the channels: their
+:attr:`cmd_exec_timeout` limits the time from submission to result,
+including the time the command waited for the other channels.
+
+Warning:
+    An exception raised by a command ends the iteration for all
+    channels, as it does for :class:`bcib.CallbackIteratorBridge`.
+    Solvers still waiting for a result then receive an
+    :class:`bcib.ExecutionStopRequest`.
+'''
+from .bridge import (_BaseClass_Bridge, _CallbackToBrigeMixin,
+                     _BridgeToIteratorMixin, end_of_evaluation)
+from .exceptions import ExecutionStopRequest
+
+import collections
+import queue
+import threading
+
+policies = ('round-robin', 'priority')
+
+
+class _Scheduler:
+    '''Command queue of the multiplex bridge
+
+    Holds the commands pending per channel. :meth:`get` selects the
+    next one according to the policy. It only hands out
+    :data:`bcib.bridge.end_of_evaluation` once all channels stopped.
+
+    Args:
+        n_channels: number of channels
+        maxsize:    maximum number of pending commands per channel
+        policy:     one of :data:`policies`
+        priorities: priority per channel. Larger ones are served first
+    '''
+    def __init__(self, n_channels, maxsize, policy, priorities):
+        self.maxsize = maxsize
+        self.policy = policy
+        self.priorities = list(priorities)
+        #: the channel objects, used for checking for stale commands
+        self.channels = None
+        #: index of the channel of the last command handed out
+        self.current = None
+        self.stopped = [False] * n_channels
+        self._pending = [collections.deque() for i in range(n_channels)]
+        self._next = 0
+        self._cond = threading.Condition()
+
+    def __repr__(self):
+        cls_name = self.__class__.__name__
+        return (f'{cls_name}(channels={len(self._pending)},'
+                f' policy={self.policy!r}, pending={self.qsize()})')
+
+    def qsize(self):
+        return sum(len(pending) for pending in self._pending)
+
+    def empty(self):
+        return self.qsize() == 0
+
+    def full(self):
+        return False
+
+    def putChannel(self, index, item, block=True, timeout=None):
+        pending = self._pending[index]
+        with self._cond:
+            if not self._cond.wait_for(lambda: len(pending) < self.maxsize,
+                                       timeout if block else 0):
+                raise queue.Full
+            pending.append(item)
+            self._cond.notify_all()
+
+    def getChannel(self, index):
+        '''Remove a pending command of the channel without scheduling
+        '''
+        with self._cond:
+            try:
+                item = self._pending[index].popleft()
+            except IndexError:
+                raise queue.Empty
+            self._cond.notify_all()
+            return item
+
+    def dropChannel(self, index):
+        '''Remove all pending commands of the channel
+
+        Futures of dropped commands are cancelled.
+        '''
+        channel = self.channels[index]
+        with self._cond:
+            pending = self._pending[index]
+            while pending:
+                seq, cmd = pending.popleft()
+                channel._dropCommand(cmd)
+            self._cond.notify_all()
+
+    def _select(self):
+        '''Index of the channel to serve next or None
+        '''
+        n = len(self._pending)
+        selected = None
+        for i in range(n):
+            idx = (self._next + i) % n
+            if not self._pending[idx]:
+                continue
+            if self.policy == 'round-robin':
+                return idx
+            if (selected is None
+                    or self.priorities[idx] > self.priorities[selected]):
+                selected = idx
+        return selected
+
+    def _ready(self):
+        return self._select() is not None or all(self.stopped)
+
+    def get(self, block=True, timeout=None):
+        with self._cond:
+            while True:
+                if not self._cond.wait_for(self._ready,
+                                           timeout if block else 0):
+                    raise queue.Empty
+                idx = self._select()
+                if idx is None:
+                    # all channels stopped
+                    return (None, end_of_evaluation)
+                seq, cmd = self._pending[idx].popleft()
+                self._next = (idx + 1) % len(self._pending)
+                self._cond.notify_all()
+
+                channel = self.channels[idx]
+                if cmd is end_of_evaluation:
+                    self.stopped[idx] = True
+                    continue
+                if channel._isStale(seq):
+                    channel._dropCommand(cmd)
+                    continue
+                self.current = idx
+                return (seq, cmd)
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+
+class _ChannelQueue:
+    '''Command queue of one channel: feeds the scheduler
+    '''
+    __slots__ = ['scheduler', 'index']
+
+    def __init__(self, scheduler, index):
+        self.scheduler = scheduler
+        self.index = index
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(index={self.index})'
+
+    def put(self, item, block=True, timeout=None):
+        self.scheduler.putChannel(self.index, item, block, timeout)
+
+    def get(self, block=True, timeout=None):
+        return self.scheduler.getChannel(self.index)
+
+    def qsize(self):
+        return len(self.scheduler._pending[self.index])
+
+
+class _ResultRouter:
+    '''Result queue of the multiplex bridge
+
+    Puts the result on the result queue of the channel whose command
+    was executed last.
+    '''
+    __slots__ = ['scheduler']
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}()'
+
+    def put(self, item, block=True, timeout=None):
+        channel = self.scheduler.channels[self.scheduler.current]
+        channel.result_queue.put(item, block, timeout)
+
+    def qsize(self):
+        return 0
+
+
+class MultiplexChannel(_BaseClass_Bridge, _CallbackToBrigeMixin):
+    '''The submitting half of the bridge used by one solver
+
+    Each channel tracks its own state: one command at a time per
+    solver.
+
+    Args:
+        index: number of the channel
+    '''
+    def __init__(self, *, index, **kwargs):
+        super().__init__(**kwargs)
+        self.index = index
+
+    @property
+    def priority(self):
+        '''Priority of the channel for the policy 'priority'
+        '''
+        return self.command_queue.scheduler.priorities[self.index]
+
+    @priority.setter
+    def priority(self, value):
+        self.command_queue.scheduler.priorities[self.index] = value
+
+
+class MultiplexBridge(_BaseClass_Bridge, _BridgeToIteratorMixin):
+    '''The iterating half, serving all channels
+
+    Args:
+        channels: the :class:`MultiplexChannel` instances
+    '''
+    def __init__(self, *, channels=(), **kwargs):
+        super().__init__(**kwargs)
+        self.channels = list(channels)
+
+    def pause(self):
+        '''Freeze the deadline of all channels
+        '''
+        super().pause()
+        for channel in self.channels:
+            channel.pause()
+
+    def resume(self):
+        super().resume()
+        for channel in self.channels:
+            channel.resume()
+
+    def stopDelegation(self, fail_mode=False):
+        '''Stop the solvers still submitting commands
+
+        Called by :func:`bcib.bridge_plan.bridge_plan_stub` when the
+        iteration is finished. Channels which did not stop the
+        delegation receive an :class:`bcib.ExecutionStopRequest` as
+        response to the command they wait for. Their pending
+        commands are dropped.
+        '''
+        cls_name = self.__class__.__name__
+        if self.state.is_stopped:
+            txt = 'command delegation stopped. Not stopping again'
+            self.log.info(f'{cls_name}: {txt}')
+            return
+
+        if not self.state.is_failed:
+            self.state.set_stopping()
+
+        scheduler = self.command_queue
+        for channel, stopped in zip(self.channels, scheduler.stopped):
+            if stopped:
+                continue
+            txt = (f'{cls_name}: iteration stopped before solver of'
+                   f' channel {channel.index} finished')
+            self.log.info(txt)
+            scheduler.dropChannel(channel.index)
+            try:
+                channel.result_queue.put(
+                    (channel._last_seq, ExecutionStopRequest(txt)),
+                    block=False
+                )
+            except queue.Full:
+                # The solver will receive the result of the failed command
+                pass
+        self.state.set_stopped()
+
+
+def setup_multiplex_bridge(n_channels, policy='round-robin', priorities=None,
+                           pipeline_depth=1, **kwargs):
+    '''Set up a bridge serving `n_channels` solvers
+
+    Args:
+        n_channels:     number of channels, i.e. solvers
+        policy:         'round-robin' or 'priority'
+        priorities:     initial priority per channel. Larger ones are
+                        served first. Defaults to 0 for all channels
+        pipeline_depth: number of commands each channel can queue by
+                        :meth:`submit_nowait`
+        kwargs:         further arguments of both halves e.g. timeouts
+
+    Returns:
+        a :class:`MultiplexBridge`. Its channels are available as
+        :attr:`MultiplexBridge.channels`
+    '''
+    if n_channels < 1:
+        raise ValueError(f'number of channels {n_channels} must be >= 1')
+    if policy not in policies:
+        raise ValueError(f'policy {policy!r} not in {policies}')
+    if pipeline_depth < 1:
+        raise ValueError(f'pipeline depth {pipeline_depth} must be >= 1')
+    if priorities is None:
+        priorities = [0] * n_channels
+    if len(priorities) != n_channels:
+        txt = f'{len(priorities)} priorities given for {n_channels} channels'
+        raise ValueError(txt)
+
+    scheduler = _Scheduler(n_channels, pipeline_depth, policy, priorities)
+    channels = [
+        MultiplexChannel(index=i, command_queue=_ChannelQueue(scheduler, i),
+                         result_queue=queue.Queue(maxsize=1),
+                         pipeline_depth=pipeline_depth, **kwargs)
+        for i in range(n_channels)
+    ]
+    scheduler.channels = channels
+    bridge = MultiplexBridge(channels=channels, command_queue=scheduler,
+                             result_queue=_ResultRouter(scheduler),
+                             pipeline_depth=pipeline_depth, **kwargs)
+    return bridge
@@ -0,0 +1,255 @@
+'''Pool of bridges and solver threads reused across scan points
+
+A per step plan (e.g. `per_step` of bluesky's scan) solving a
+problem at each point would typically set up a new bridge and
+start a new solver thread at every step. For scans of many points
+the creation of the threads and the first use of the queues add
+noticeably to each step.
+
+A :class:`BridgePool` creates its bridges and solver threads once.
+Each bridge is warmed up by a round trip of a command doing
+nothing. :meth:`BridgePool.solve_plan` hands out a bridge, runs the
+solver on one of the worker threads and yields the messages of the
+submitted commands. Once both the solver and the plan are done
+with it, the bridge is recycled to its initial state (see
+:meth:`bcib.bridge._BaseClass_Bridge.recycle`) and returned to the
+pool.
+
+Typical usage:
+
+::
+
+    def solve(bridge, target):
+        # run on a worker thread of the pool
+        def cb(x):
+            return bridge.submit(functools.partial(step_stub, x)) - target
+        return brentq(cb, -10, 10)
+
+    def per_step(detectors, motor, step):
+        x = yield from pool.solve_plan(solve, step)
+
+    with BridgePool() as pool:
+        RE(bp.scan(dets, motor, 1, 5, 5, per_step=per_step))
+'''
+from .bridge import _RaiseInIterator
+from .bridge_plan import bridge_plan_stub
+from .threaded_bridge import setup_bridge
+
+import concurrent.futures
+import logging
+import queue
+import threading
+
+logger = logging.getLogger('bcib')
+
+
+def _noop():
+    '''Command yielding no message: used to warm up the bridges
+    '''
+    return None
+    yield
+
+
+def _warm_up(bridge):
+    return bridge.submit(_noop)
+
+
+class _Lease:
+    '''A bridge handed out by the pool for one delegation
+
+    The solver and the plan both use the bridge. The bridge is
+    returned to the pool when the last of both called :meth:`done`.
+    '''
+    __slots__ = ['pool', 'bridge', 'released', '_users', '_lock']
+
+    def __init__(self, pool, bridge):
+        self.pool = pool
+        self.bridge = bridge
+        #: set when the bridge is back in the pool
+        self.released = threading.Event()
+        self._users = 2
+        self._lock = threading.Lock()
+
+    def done(self):
+        with self._lock:
+            self._users -= 1
+            last = self._users == 0
+        if last:
+            self.pool._release(self.bridge)
+            self.released.set()
+
+
+class _Job:
+    '''Solver run on a worker thread of the pool
+    '''
+    __slots__ = ['solver', 'args', 'kwargs', 'lease', 'future']
+
+    def __init__(self, solver, args, kwargs, lease):
+        self.solver = solver
+        self.args = args
+        self.kwargs = kwargs
+        self.lease = lease
+        self.future = concurrent.futures.Future()
+
+    def run(self):
+        '''Run the solver and stop the delegation when it is done
+
+        Exceptions are forwarded to the iterator.
+        '''
+        bridge = self.lease.bridge
+        try:
+            r = self.solver(bridge, *self.args, **self.kwargs)
+        except Exception as exc:
+            bridge.log.error('Solver %s raised exception %s',
+                             self.solver, exc)
+            self.future.set_exception(exc)
+            try:
+                bridge._putCommand(_RaiseInIterator(exc),
+                                   bridge.cmd_queue_timeout)
+            except queue.Full:
+                bridge.log.error('Could not forward exception to the'
+                                 ' iterator')
+        else:
+            self.future.set_result(r)
+            bridge.stopDelegation()
+        finally:
+            self.lease.done()
+
+
+class BridgePool:
+    '''Warmed up bridges and long lived solver threads
+
+    Args:
+        size:         number of bridges and worker threads, i.e. the
+                      number of solvers that can run at the same time
+        warm_up:      pass a command doing nothing over each bridge
+                      when the pool is created
+        log:          a :class:`logging.Logger` object
+        bridge_kwargs: arguments of
+                      :func:`bcib.threaded_bridge.setup_bridge` e.g.
+                      timeouts
+    '''
+    def __init__(self, size=1, warm_up=True, log=None, **bridge_kwargs):
+        if size < 1:
+            raise ValueError(f'pool size {size} must be >= 1')
+        if log is None:
+            log = logger
+        self.log = log
+        self.size = size
+        self._closed = False
+
+        self._jobs = queue.Queue()
+        self._free = queue.Queue()
+        self._workers = [
+            threading.Thread(target=self._work, name=f'bcib-pool-{i}',
+                             daemon=True)
+            for i in range(size)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+        bridges = [setup_bridge(log=log, **bridge_kwargs)
+                   for i in range(size)]
+        for bridge in bridges:
+            if warm_up:
+                self._warmUp(bridge)
+            else:
+                self._free.put(bridge)
+
+    def __repr__(self):
+        cls_name = self.__class__.__name__
+        return (f'{cls_name}(size={self.size}, free={self._free.qsize()},'
+                f' closed={self._closed})')
+
+    def _work(self):
+        '''Loop of the worker threads
+        '''
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            job.run()
+
+    def _warmUp(self, bridge):
+        '''Round trip of a command doing nothing
+        '''
+        lease = _Lease(self, bridge)
+        job = _Job(_warm_up, (), {}, lease)
+        self._jobs.put(job)
+        try:
+            for msg in bridge:
+                pass
+        finally:
+            bridge.stopDelegation()
+            lease.done()
+        lease.released.wait(bridge.cmd_exec_timeout)
+        job.future.result()
+
+    def _release(self, bridge):
+        '''Return the bridge to the pool in a clean state
+        '''
+        bridge.recycle()
+        self._free.put(bridge)
+
+    def solve_plan(self, solver, *args, **kwargs):
+        '''Plan stub running the solver with a bridge of the pool
+
+        The solver is called as ``solver(bridge, *args, **kwargs)``
+        on a worker thread. Delegation is stopped when it returns.
+        The messages of the commands it submits are yielded as by
+        :func:`bcib.bridge_plan.bridge_plan_stub`. Exceptions raised
+        by the solver are raised by this plan.
+
+        Returns:
+            the return value of the solver
+
+        Raises:
+            RuntimeError: if the pool is closed or all bridges are in
+                          use. Use a larger pool for nested or
+                          concurrent plans.
+        '''
+        if self._closed:
+            raise RuntimeError(f'{self.__class__.__name__} is closed')
+        try:
+            bridge = self._free.get(block=False)
+        except queue.Empty:
+            txt = f'all {self.size} bridges of {self} in use'
+            raise RuntimeError(txt)
+
+        lease = _Lease(self, bridge)
+        job = _Job(solver, args, kwargs, lease)
+        self._jobs.put(job)
+        wait = True
+        try:
+            yield from bridge_plan_stub(bridge, log=self.log)
+        except GeneratorExit:
+            # e.g. run engine abort: do not block on the solver
+            wait = False
+            raise
+        finally:
+            lease.done()
+            if wait:
+                # next step shall find the bridge back in the pool
+                lease.released.wait(bridge.cmd_exec_timeout)
+        # The solver stopped the delegation: it has returned already
+        return job.future.result(timeout=bridge.cmd_exec_timeout)
+
+    def close(self, timeout=None):
+        '''Stop the worker threads
+
+        Solvers still running are waited for, up to `timeout` per
+        worker thread.
+        '''
+        if self._closed:
+            return
+        self._closed = True
+        for worker in self._workers:
+            self._jobs.put(None)
+        for worker in self._workers:
+            worker.join(timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.close()
@@ -0,0 +1,265 @@
+'''Bridge callback to iterator across processes
+
+The solver is run in a separate process. Thus a solver spending a
+lot of CPU time between its evaluations does not compete for the
+GIL with the consumer of the iterator (e.g. bluesky's run engine).
+
+The bridge is split into its two halves (see :mod:`bcib.bridge`):
+    1. :class:`ProcessCallbackBridge`: used by the solver in the
+       child process. It provides :meth:`submit`,
+       :meth:`submit_many` and :meth:`stopDelegation`
+    2. :class:`ProcessIteratorBridge`: iterated over in the parent
+       process e.g. by :func:`bcib.bridge_plan.bridge_plan_stub`.
+
+Both halves communicate over :class:`multiprocessing.Queue`
+instances. Commands, their results and exceptions raised by them
+have to be picklable. Thus use :func:`functools.partial` of module
+level functions as commands.
+
+A projection given to :meth:`submit` (or the `projector` of the
+bridge) is applied in the parent process before the result is sent.
+Thus only the reduced value crosses the process boundary. It has to
+be picklable, e.g. a module level function.
+
+The result cache, the journal, the statistics and the timeout
+policy keep their state within one process: these options are
+rejected (see :data:`process_local_options`).
+:meth:`ProcessCallbackBridge.submit_nowait` is not supported.
+
+Array valued results can be passed over shared memory by giving a
+`result_transport` (e.g.
+:class:`bcib.shared_memory.SharedArrayTransport`) to
+:func:`setup_process_bridge`.
+
+Exceptions raised by the solver are raised by the iterator. Exceptions
+raised by a command are raised in the solver. If the iterator stops
+before the solver finished, the solver receives an
+:class:`bcib.ExecutionStopRequest` when it waits for its next
+result.
+
+The progress of the iterator is not seen by the solver process: its
+:attr:`cmd_exec_timeout` limits the whole execution of a command.
+Neither is a pause of the consumer (see
+:meth:`bcib.bridge._BaseClass_Bridge.pause`): choose the timeout
+long enough for the pauses to be expected.
+
+Results are matched to the submission by their sequence number
+(see :mod:`bcib.bridge`). The :attr:`generation` is only known to
+the half it was bumped in: :meth:`reset` of the iterating half does
+not make the commands queued by the solver stale.
+
+Typical usage:
+
+::
+
+    def solve(bridge, x0):
+        # run in the child process
+        def cb(x):
+            return bridge.submit(functools.partial(step_stub, x))
+        return solver(cb, x0)
+
+    def plan():
+        bridge = setup_process_bridge(solve, args=(x0,))
+        yield from bridge_plan_stub(bridge)
+        bridge.join()
+'''
+from .bridge import (_BaseClass_Bridge, _CallbackToBrigeMixin,
+                     _BridgeToIteratorMixin, _RaiseInIterator)
+from .exceptions import ExecutionStopRequest
+
+import itertools
+import logging
+import multiprocessing
+import queue
+
+logger = logging.getLogger('bcib')
+
+#: options of the bridge only working within one process
+process_local_options = ('cache', 'journal', 'collect_stats', 'stats_hook',
+                         'timeout_policy')
+
+
+class ProcessCallbackBridge(_BaseClass_Bridge, _CallbackToBrigeMixin):
+    '''The submitting half of the bridge
+
+    Used by the solver in the child process.
+
+    Args:
+        result_transport: decodes the results received from the
+                          iterator. See
+                          :class:`bcib.shared_memory.SharedArrayTransport`
+    '''
+    def __init__(self, *, result_transport=None, **kwargs):
+        super().__init__(**kwargs)
+        self.result_transport = result_transport
+
+    def __getstate__(self):
+        d = self.__dict__.copy()
+        # Each process tracks its own state
+        del d['state']
+        del d['cmd_state']
+        # itertools objects can not be pickled (python >= 3.14)
+        d['_sequence'] = self._last_seq + 1
+        return d
+
+    def __setstate__(self, d):
+        d['_sequence'] = itertools.count(d['_sequence'])
+        self.__dict__.update(d)
+        self._setupStates()
+
+    def _getResult(self, timeout, seq=None):
+        r = super()._getResult(timeout, seq)
+        if self.result_transport is not None and not isinstance(r, Exception):
+            r = self.result_transport.decode(r)
+        return r
+
+    def submit_nowait(self, cmd, project=None):
+        '''Not supported: futures can not be shared between processes
+
+        Raises:
+            TypeError: always. Use :meth:`submit` or :meth:`submit_many`
+        '''
+        cls_name = self.__class__.__name__
+        raise TypeError(f'{cls_name} does not support futures')
+
+
+class ProcessIteratorBridge(_BaseClass_Bridge, _BridgeToIteratorMixin):
+    '''The iterating half of the bridge
+
+    Used by the consumer in the parent process.
+
+    Args:
+        process:          the process running the solver
+        result_transport: encodes the results before they are sent
+                          to the solver
+    '''
+    def __init__(self, *, process=None, result_transport=None, **kwargs):
+        super().__init__(**kwargs)
+        self.process = process
+        self.result_transport = result_transport
+
+    def _putResult(self, r, future=None, env=None, seq=None):
+        if self.result_transport is not None and not isinstance(r, Exception):
+            r = self.result_transport.encode(r)
+        super()._putResult(r, future, env, seq)
+
+    def execute(self):
+        r = (yield from super().execute())
+        # Only reached when the solver stopped the delegation
+        self.state.set_stopping()
+        self.state.set_stopped()
+        return r
+
+    def stopDelegation(self, fail_mode=False):
+        '''Stop the solver if it is still submitting commands
+
+        Called by :func:`bcib.bridge_plan.bridge_plan_stub` when the
+        iteration is finished. If the solver did not stop the
+        delegation itself, it receives a
+        :class:`bcib.ExecutionStopRequest` as response to the
+        command it is waiting for.
+        '''
+        cls_name = self.__class__.__name__
+        if self.state.is_stopped:
+            txt = 'command delegation stopped. Not stopping again'
+            self.log.info(f'{cls_name}: {txt}')
+            return
+
+        if not self.state.is_failed:
+            self.state.set_stopping()
+
+        txt = f'{cls_name}: iteration stopped before solver finished'
+        self.log.info(txt)
+        if fail_mode:
+            self.clearQueues()
+        try:
+            # not tagged: answers whatever the solver waits for
+            self.result_queue.put((None, ExecutionStopRequest(txt)),
+                                  block=False)
+        except queue.Full:
+            # The solver will receive the result of the failed command
+            pass
+        self.state.set_stopped()
+
+    def join(self, timeout=None):
+        '''Wait for the solver process to finish
+        '''
+        if self.process is not None:
+            self.process.join(timeout)
+
+
+def _run_solver(bridge, target, args, kwargs):
+    '''Executed in the child process
+
+    Runs the solver and stops the delegation when it is done.
+    Exceptions are forwarded to the iterator.
+    '''
+    try:
+        target(bridge, *args, **kwargs)
+    except Exception as exc:
+        bridge.log.error(f'Solver {target} raised exception {exc}')
+        try:
+            bridge._putCommand(_RaiseInIterator(exc),
+                               bridge.cmd_queue_timeout)
+        except queue.Full:
+            bridge.log.error('Could not forward exception to the iterator')
+        raise
+    else:
+        bridge.stopDelegation()
+    finally:
+        # make sure that the feeder thread delivered all objects
+        bridge.command_queue.close()
+        bridge.command_queue.join_thread()
+
+
+def setup_process_bridge(target, args=(), kwargs=None, *, mp_context=None,
+                         result_transport=None, log=None, **bridge_kwargs):
+    '''Run the solver `target` in a separate process
+
+    Args:
+        target:        solver function. Called as
+                       ``target(bridge, *args, **kwargs)`` in the child
+                       process. `bridge` is a
+                       :class:`ProcessCallbackBridge`. Delegation is
+                       stopped when the target returns.
+        args:          positional arguments for the target
+        kwargs:        keyword arguments for the target
+        mp_context:    name of the :mod:`multiprocessing` start method
+        result_transport: e.g. a
+                       :class:`bcib.shared_memory.SharedArrayTransport`.
+                       Owned by the caller
+        log:           a :class:`logging.Logger` object
+        bridge_kwargs: timeouts passed to both bridge halves
+
+    Returns:
+        a :class:`ProcessIteratorBridge` instance. The solver process
+        is already started.
+
+    Raises:
+        TypeError: if one of :data:`process_local_options` is given.
+                   These keep their state within the process using
+                   them: the results would not be seen by the parent
+    '''
+    for name in process_local_options:
+        if bridge_kwargs.get(name):
+            raise TypeError(f'{name} is not supported by the process bridge')
+    if kwargs is None:
+        kwargs = {}
+    if log is None:
+        log = logger
+
+    ctx = multiprocessing.get_context(mp_context)
+    q_cmd = ctx.Queue(maxsize=1)
+    q_res = ctx.Queue(maxsize=1)
+
+    submitter = ProcessCallbackBridge(command_queue=q_cmd, result_queue=q_res,
+                                      result_transport=result_transport,
+                                      log=log, **bridge_kwargs)
+    process = ctx.Process(target=_run_solver, name='bcib-solver',
+                          args=(submitter, target, args, kwargs), daemon=True)
+    bridge = ProcessIteratorBridge(command_queue=q_cmd, result_queue=q_res,
+                                   process=process,
+                                   result_transport=result_transport,
+                                   log=log, **bridge_kwargs)
+    process.start()
+    return bridge
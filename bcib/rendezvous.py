@@ -0,0 +1,119 @@
+'''Single slot rendezvous channel for the threaded bridge
+
+The threaded bridge hands each command and each result over a
+:class:`queue.Queue` of length one. Each of these queues has its
+own mutex, three condition variables and a deque. Each wait on a
+condition variable allocates a new lock.
+
+:class:`RendezvousChannel` is a replacement for exactly this use
+case: a single slot, which is either empty or full. Each of the two
+states is signalled by a pre-allocated lock, which is held while
+the state does not apply. Thus a hand over costs one lock release
+and one acquire. Optionally the waiting side spins for a short
+time before parking on the lock.
+
+Warning:
+    Spinning competes with the peer for the GIL. It only pays off if
+    the peer answers from code releasing the GIL (or on a free
+    threaded interpreter). Check with ``benchmarks/rendezvous_bench.py``
+    before enabling it.
+
+The channel implements the subset of the :class:`queue.Queue` API
+used by the bridge. Use it by
+
+::
+
+    bridge = setup_bridge(rendezvous=True)
+
+see :func:`bcib.threaded_bridge.setup_bridge`.
+'''
+import queue
+import threading
+import time
+
+
+class RendezvousChannel:
+    '''Hand over one object at a time between threads
+
+    Args:
+        spin_time: time in seconds to poll for the slot state before
+                   blocking. 0 disables spinning. While spinning
+                   the GIL is released in between the polls.
+    '''
+    def __init__(self, spin_time=0.0):
+        self.spin_time = spin_time
+        self._item = None
+        # Held while the slot is empty
+        self._full = threading.Lock()
+        self._full.acquire()
+        # Held while the slot is full
+        self._empty = threading.Lock()
+
+    def __repr__(self):
+        cls_name = self.__class__.__name__
+        return f'{cls_name}(spin_time={self.spin_time}, qsize={self.qsize()})'
+
+    def _acquire(self, lock, block, timeout):
+        '''Acquire the lock signalling the state
+        '''
+        if lock.acquire(False):
+            return True
+        if not block:
+            return False
+
+        if self.spin_time > 0:
+            t_end = time.perf_counter() + self.spin_time
+            while time.perf_counter() < t_end:
+                # let the peer run
+                time.sleep(0)
+                if lock.acquire(False):
+                    return True
+            if timeout is not None:
+                timeout = max(timeout - self.spin_time, 0)
+
+        if timeout is None:
+            return lock.acquire()
+        if timeout < 0:
+            raise ValueError("'timeout' must be a non-negative number")
+        return lock.acquire(timeout=timeout)
+
+    def put(self, item, block=True, timeout=None):
+        '''Put the item into the slot
+
+        Raises:
+            queue.Full: if the slot did not get empty in time
+        '''
+        if not self._acquire(self._empty, block, timeout):
+            raise queue.Full
+        self._item = item
+        self._full.release()
+
+    def get(self, block=True, timeout=None):
+        '''Remove the item from the slot and return it
+
+        Raises:
+            queue.Empty: if no item was put in time
+        '''
+        if not self._acquire(self._full, block, timeout):
+            raise queue.Empty
+        item = self._item
+        self._item = None
+        self._empty.release()
+        return item
+
+    def put_nowait(self, item):
+        return self.put(item, block=False)
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def qsize(self):
+        '''Approximate number of items in the channel: 0 or 1
+        '''
+        return 0 if self._full.locked() else 1
+
+    def empty(self):
+        return self.qsize() == 0
+
+    def full(self):
+        return self.qsize() == 1
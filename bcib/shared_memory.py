@@ -0,0 +1,193 @@
+'''Shared memory transport for array valued results
+
+Results handed from the iterator to the solver process by
+:mod:`bcib.process_bridge` are pickled. For large arrays (e.g. area
+detector images or spectra contained in a ``trigger_and_read``
+result) this copying dominates the cost of an evaluation.
+
+:class:`SharedArrayTransport` copies these arrays once into a ring
+of slots allocated in :mod:`multiprocessing.shared_memory` and
+replaces them by small descriptors. Only the descriptors are
+pickled. The solver side replaces the descriptors by
+:class:`numpy.ndarray` views of the shared memory: no further copy
+is made.
+
+Warning:
+    The views are only valid until the slot is reused, i.e. until
+    `n_slots` - 1 further results were received. Copy the arrays if
+    they are needed longer.
+
+Typical usage:
+
+::
+
+    with SharedArrayTransport(n_slots=4, slot_size=64 * 2**20) as transport:
+        bridge = setup_process_bridge(solve, result_transport=transport)
+        yield from bridge_plan_stub(bridge)
+        bridge.join()
+'''
+from multiprocessing import shared_memory, resource_tracker
+import logging
+import sys
+
+import numpy as np
+
+logger = logging.getLogger('bcib')
+
+#: arrays are placed at offsets aligned to this number of bytes
+_alignment = 64
+
+
+def _rebuild(obj, values):
+    '''Container of the type of `obj` holding `values`
+    '''
+    if hasattr(obj, '_fields'):
+        # namedtuple: takes the fields as positional arguments
+        return type(obj)(*values)
+    return type(obj)(values)
+
+
+class _SharedArray:
+    '''Descriptor of an array placed in the shared memory
+    '''
+    __slots__ = ['offset', 'shape', 'dtype']
+
+    def __init__(self, offset, shape, dtype):
+        self.offset = offset
+        self.shape = shape
+        self.dtype = dtype
+
+    def __repr__(self):
+        cls_name = self.__class__.__name__
+        return (f'{cls_name}(offset={self.offset}, shape={self.shape},'
+                f' dtype={self.dtype})')
+
+
+class SharedArrayTransport:
+    '''Transport numpy arrays of results over shared memory
+
+    Args:
+        n_slots:    number of ring slots
+        slot_size:  size of each slot in bytes. All arrays of one
+                    result have to fit into one slot. Otherwise they
+                    are pickled as usual
+        min_nbytes: smaller arrays are pickled as usual
+        log:        a :class:`logging.Logger` object
+
+    The instance is created in the process running the iterator
+    and owns the shared memory. When sent to the solver process it
+    attaches to the same shared memory.
+    '''
+    def __init__(self, n_slots=4, slot_size=16 * 2**20,
+                 min_nbytes=2**16, log=None):
+        if n_slots < 2:
+            raise ValueError(f'need at least 2 slots, got {n_slots}')
+        if log is None:
+            log = logger
+        self.log = log
+        self.n_slots = n_slots
+        self.slot_size = slot_size
+        self.min_nbytes = min_nbytes
+        self._slot = 0
+        self._owner = True
+        self.shm = shared_memory.SharedMemory(create=True,
+                                              size=n_slots * slot_size)
+
+    def __repr__(self):
+        cls_name = self.__class__.__name__
+        return (f'{cls_name}(name={self.shm.name!r}, n_slots={self.n_slots},'
+                f' slot_size={self.slot_size},'
+                f' min_nbytes={self.min_nbytes})')
+
+    def __getstate__(self):
+        d = self.__dict__.copy()
+        d['shm'] = self.shm.name
+        d['_owner'] = False
+        return d
+
+    def __setstate__(self, d):
+        self.__dict__.update(d)
+        name = d['shm']
+        if sys.version_info >= (3, 13):
+            self.shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            # Only the owner shall unlink the shared memory
+            resource_tracker.unregister(self.shm._name, 'shared_memory')
+
+    # -------------------------------------------------------------------------
+    def encode(self, r):
+        '''Place the arrays of the result in the next slot
+
+        Returns:
+            the result with the arrays replaced by descriptors
+        '''
+        base = self._slot * self.slot_size
+        end = base + self.slot_size
+        # offset of the next free byte: a list so the walker can
+        # update it
+        pos = [base]
+
+        def place(arr):
+            offset = -(-pos[0] // _alignment) * _alignment
+            if offset + arr.nbytes > end:
+                self.log.warning(
+                    f'{self.__class__.__name__}: slot size {self.slot_size}'
+                    f' exceeded: pickling array of {arr.nbytes} bytes'
+                )
+                return arr
+            view = np.ndarray(arr.shape, dtype=arr.dtype,
+                              buffer=self.shm.buf, offset=offset)
+            view[...] = arr
+            pos[0] = offset + arr.nbytes
+            return _SharedArray(offset, arr.shape, arr.dtype.str)
+
+        def walk(obj):
+            if isinstance(obj, np.ndarray):
+                if obj.nbytes < self.min_nbytes or obj.dtype.hasobject:
+                    return obj
+                return place(obj)
+            elif isinstance(obj, dict):
+                return {k: walk(v) for k, v in obj.items()}
+            elif isinstance(obj, (list, tuple)):
+                return _rebuild(obj, [walk(v) for v in obj])
+            return obj
+
+        r = walk(r)
+        if pos[0] != base:
+            self._slot = (self._slot + 1) % self.n_slots
+        return r
+
+    def decode(self, r):
+        '''Replace the descriptors by read only views of the shared memory
+        '''
+        def walk(obj):
+            if isinstance(obj, _SharedArray):
+                view = np.ndarray(obj.shape, dtype=obj.dtype,
+                                  buffer=self.shm.buf, offset=obj.offset)
+                view.flags.writeable = False
+                return view
+            elif isinstance(obj, dict):
+                return {k: walk(v) for k, v in obj.items()}
+            elif isinstance(obj, (list, tuple)):
+                return _rebuild(obj, [walk(v) for v in obj])
+            return obj
+
+        return walk(r)
+
+    # -------------------------------------------------------------------------
+    def close(self):
+        '''Release the shared memory
+
+        The owner also unlinks it. All views have to be released
+        before.
+        '''
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.close()
@@ -0,0 +1,28 @@
+'''Solvers implemented as generators
+
+The solvers of e.g. :mod:`scipy.optimize` call a function for each
+evaluation. To use them within a plan, they have to run in a
+separate thread and their function calls are passed over a
+:class:`bcib.CallbackIteratorBridge`.
+
+The solvers of this package are generators themselves: the function
+to evaluate returns a generator (e.g. a bluesky plan), which yields
+its messages and returns the value. The solver evaluates it by
+``yield from f(x)``. Thus the solver can be used directly as plan
+stub: no thread and no bridge are required and the cost of each
+step is deterministic.
+
+Typical usage:
+
+::
+
+    def objective(x):
+        r = yield from step_stub(detectors, motor, x)
+        return r[motor.readback.name]['value'] - target
+
+    def solve_stub(detectors, motor, target):
+        x = yield from brentq(objective, -10, 10)
+        return x
+'''
+from .root import bisect, brentq
+from .minimize import golden, nelder_mead
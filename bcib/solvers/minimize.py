@@ -0,0 +1,163 @@
+'''Minimisation of scalar functions
+
+The function `f` returns a generator, see :mod:`bcib.solvers`.
+'''
+import math
+
+_inv_phi = (math.sqrt(5) - 1) / 2
+
+
+def golden(f, a, b, xtol=1e-8, maxiter=200):
+    '''Minimise f within the interval [a, b] by golden section search
+
+    f is expected to be unimodal within the interval.
+
+    Args:
+        f:       function returning a generator, which returns the
+                 function value
+        a, b:    the interval
+        xtol:    absolute tolerance of the minimum
+        maxiter: maximum number of iterations
+
+    Returns:
+        tuple (x, f(x)) of the minimum found
+
+    Raises:
+        RuntimeError: if not converged within `maxiter` iterations
+    '''
+    if a > b:
+        a, b = b, a
+    c = b - _inv_phi * (b - a)
+    d = a + _inv_phi * (b - a)
+    fc = yield from f(c)
+    fd = yield from f(d)
+    for i in range(maxiter):
+        if b - a < xtol:
+            if fc < fd:
+                return c, fc
+            return d, fd
+        if fc < fd:
+            b, d, fd = d, c, fc
+            c = b - _inv_phi * (b - a)
+            fc = yield from f(c)
+        else:
+            a, c, fc = c, d, fd
+            d = a + _inv_phi * (b - a)
+            fd = yield from f(d)
+    raise RuntimeError(f'golden: failed to converge after {maxiter} steps')
+
+
+def nelder_mead(f, x0, xatol=1e-4, fatol=1e-4, maxiter=None, maxfev=None,
+                initial_simplex=None):
+    '''Minimise f by the Nelder-Mead simplex algorithm
+
+    Follows :func:`scipy.optimize.minimize` with method='Nelder-Mead'.
+
+    Args:
+        f:               function returning a generator, which returns
+                         the function value. It is called with a list
+                         of the coordinates
+        x0:              start point
+        xatol:           absolute tolerance of the simplex vertices
+        fatol:           absolute tolerance of the function values
+        maxiter:         maximum number of iterations. Default
+                         200 * number of dimensions
+        maxfev:          maximum number of function evaluations. Default
+                         200 * number of dimensions
+        initial_simplex: list of n + 1 points. If not given, each
+                         coordinate of x0 is changed by 5 %
+
+    Returns:
+        tuple (x, f(x)) of the minimum found
+
+    Raises:
+        RuntimeError: if the maximum number of iterations or function
+                      evaluations was reached
+    '''
+    rho, chi, psi, sigma = 1, 2, 0.5, 0.5
+
+    x0 = [float(v) for v in x0]
+    n = len(x0)
+    if maxiter is None:
+        maxiter = 200 * n
+    if maxfev is None:
+        maxfev = 200 * n
+
+    if initial_simplex is None:
+        sim = [x0]
+        for k in range(n):
+            y = list(x0)
+            y[k] = (1 + 0.05) * y[k] if y[k] != 0 else 0.00025
+            sim.append(y)
+    else:
+        sim = [[float(v) for v in p] for p in initial_simplex]
+        if len(sim) != n + 1:
+            raise ValueError(f'initial simplex needs {n + 1} points')
+
+    fsim = []
+    for p in sim:
+        fsim.append((yield from f(list(p))))
+    fcalls = n + 1
+
+    def combine(a, xbar, coeff):
+        '''xbar + coeff * (xbar - a)'''
+        return [xb + coeff * (xb - av) for xb, av in zip(xbar, a)]
+
+    for iterations in range(1, maxiter + 1):
+        order = sorted(range(n + 1), key=lambda i: fsim[i])
+        sim = [sim[i] for i in order]
+        fsim = [fsim[i] for i in order]
+
+        x_spread = max(abs(sim[k][j] - sim[0][j])
+                       for k in range(1, n + 1) for j in range(n))
+        f_spread = max(abs(fsim[0] - fv) for fv in fsim[1:])
+        if x_spread <= xatol and f_spread <= fatol:
+            return sim[0], fsim[0]
+        if fcalls >= maxfev:
+            break
+
+        xbar = [sum(p[j] for p in sim[:-1]) / n for j in range(n)]
+        xr = combine(sim[-1], xbar, rho)
+        fxr = yield from f(xr)
+        fcalls += 1
+        doshrink = False
+
+        if fxr < fsim[0]:
+            xe = combine(sim[-1], xbar, rho * chi)
+            fxe = yield from f(xe)
+            fcalls += 1
+            if fxe < fxr:
+                sim[-1], fsim[-1] = xe, fxe
+            else:
+                sim[-1], fsim[-1] = xr, fxr
+        elif fxr < fsim[-2]:
+            sim[-1], fsim[-1] = xr, fxr
+        elif fxr < fsim[-1]:
+            # contraction outside
+            xc = combine(sim[-1], xbar, psi * rho)
+            fxc = yield from f(xc)
+            fcalls += 1
+            if fxc <= fxr:
+                sim[-1], fsim[-1] = xc, fxc
+            else:
+                doshrink = True
+        else:
+            # contraction inside
+            xcc = combine(sim[-1], xbar, -psi)
+            fxcc = yield from f(xcc)
+            fcalls += 1
+            if fxcc < fsim[-1]:
+                sim[-1], fsim[-1] = xcc, fxcc
+            else:
+                doshrink = True
+
+        if doshrink:
+            for k in range(1, n + 1):
+                sim[k] = [sim[0][j] + sigma * (sim[k][j] - sim[0][j])
+                          for j in range(n)]
+                fsim[k] = yield from f(sim[k])
+                fcalls += 1
+
+    txt = (f'nelder_mead: failed to converge within {maxiter} iterations'
+           f' and {maxfev} function evaluations')
+    raise RuntimeError(txt)
@@ -0,0 +1,113 @@
+'''Root finding of scalar functions
+
+Ports of the bisection and Brent's method as implemented in
+:func:`scipy.optimize.bisect` and :func:`scipy.optimize.brentq`.
+The function `f` returns a generator, see :mod:`bcib.solvers`.
+'''
+import math
+import sys
+
+_rtol = 4 * sys.float_info.epsilon
+
+
+def _check_bracket(a, b, fa, fb):
+    if fa * fb > 0:
+        txt = f'f(a) = {fa} and f(b) = {fb} must have different signs'
+        raise ValueError(txt)
+
+
+def bisect(f, a, b, xtol=2e-12, rtol=_rtol, maxiter=100):
+    '''Find a root of f in the interval [a, b] by bisection
+
+    Args:
+        f:       function returning a generator, which returns the
+                 function value
+        a, b:    the interval. f(a) and f(b) must differ in sign
+        xtol:    absolute tolerance of the root
+        rtol:    relative tolerance of the root
+        maxiter: maximum number of iterations
+
+    Returns:
+        the root
+
+    Raises:
+        ValueError:   if f(a) and f(b) have the same sign
+        RuntimeError: if not converged within `maxiter` iterations
+    '''
+    fa = yield from f(a)
+    fb = yield from f(b)
+    _check_bracket(a, b, fa, fb)
+    if fa == 0:
+        return a
+    if fb == 0:
+        return b
+
+    dm = b - a
+    for i in range(maxiter):
+        dm /= 2
+        xm = a + dm
+        fm = yield from f(xm)
+        if fm * fa >= 0:
+            a = xm
+        if fm == 0 or abs(dm) < xtol + rtol * abs(xm):
+            return xm
+    raise RuntimeError(f'bisect: failed to converge after {maxiter} steps')
+
+
+def brentq(f, a, b, xtol=2e-12, rtol=_rtol, maxiter=100):
+    '''Find a root of f in the interval [a, b] by Brent's method
+
+    Same arguments and exceptions as :func:`bisect`
+    '''
+    xpre, xcur = a, b
+    fpre = yield from f(xpre)
+    fcur = yield from f(xcur)
+    _check_bracket(a, b, fpre, fcur)
+    if fpre == 0:
+        return xpre
+    if fcur == 0:
+        return xcur
+
+    xblk = fblk = spre = scur = 0.0
+    for i in range(maxiter):
+        if (fpre != 0 and fcur != 0
+                and math.copysign(1, fpre) != math.copysign(1, fcur)):
+            xblk, fblk = xpre, fpre
+            spre = scur = xcur - xpre
+        if abs(fblk) < abs(fcur):
+            xpre, xcur, xblk = xcur, xblk, xcur
+            fpre, fcur, fblk = fcur, fblk, fcur
+
+        delta = (xtol + rtol * abs(xcur)) / 2
+        sbis = (xblk - xcur) / 2
+        if fcur == 0 or abs(sbis) < delta:
+            return xcur
+
+        if abs(spre) > delta and abs(fcur) < abs(fpre):
+            if xpre == xblk:
+                # interpolate
+                stry = -fcur * (xcur - xpre) / (fcur - fpre)
+            else:
+                # extrapolate
+                dpre = (fpre - fcur) / (xpre - xcur)
+                dblk = (fblk - fcur) / (xblk - xcur)
+                stry = (-fcur * (fblk * dblk - fpre * dpre)
+                        / (dblk * dpre * (fblk - fpre)))
+            if 2 * abs(stry) < min(abs(spre), 3 * abs(sbis) - delta):
+                # good short step
+                spre, scur = scur, stry
+            else:
+                # bisect
+                spre = scur = sbis
+        else:
+            # bisect
+            spre = scur = sbis
+
+        xpre, fpre = xcur, fcur
+        if abs(scur) > delta:
+            xcur += scur
+        else:
+            xcur += delta if sbis > 0 else -delta
+        fcur = yield from f(xcur)
+
+    raise RuntimeError(f'brentq: failed to converge after {maxiter} steps')
@@ -0,0 +1,179 @@
+'''Timing statistics of the commands passed over the bridge
+
+For each command the bridge can record
+    * the time it waited in the command queue (submit to dequeue)
+    * the time spent executing it, i.e. iterating over its messages
+    * the number of messages it yielded
+    * the time the result needed to get back to the submitter
+
+These are accumulated in histograms of fixed size. Thus one can see
+if the time is spent by the solver, the bridge hand over or the
+consumer (e.g. the run engine and its hardware).
+
+Enable it by
+
+::
+
+    bridge = setup_bridge(collect_stats=True)
+    ...
+    snapshot = bridge.stats()
+
+Note:
+    The result latency is only known for commands submitted by
+    :meth:`submit` within the same process. For commands submitted
+    by :meth:`submit_nowait` it is recorded as `None`.
+'''
+import collections
+import math
+import threading
+
+#: timing record of one command, passed to the hook
+CommandTiming = collections.namedtuple(
+    'CommandTiming',
+    ['cmd', 'queue_wait', 'execution', 'n_msgs', 'result_latency']
+)
+
+
+class Histogram:
+    '''Histogram with logarithmically spaced bins of fixed number
+
+    Args:
+        lo:               lower edge of the first bin. Smaller values
+                          are counted in the underflow bin
+        hi:               upper edge of the last bin. Larger values
+                          are counted in the overflow bin
+        bins_per_decade:  resolution
+    '''
+    def __init__(self, lo=1e-6, hi=1e3, bins_per_decade=10):
+        self.lo = lo
+        self.hi = hi
+        self.bins_per_decade = bins_per_decade
+        n_bins = int(round(math.log10(hi / lo) * bins_per_decade))
+        #: upper edges of the bins. The last bin is the overflow bin
+        self.edges = [lo * 10 ** (i / bins_per_decade)
+                      for i in range(n_bins + 1)] + [math.inf]
+        self.reset()
+
+    def __repr__(self):
+        cls_name = self.__class__.__name__
+        return (f'{cls_name}(lo={self.lo}, hi={self.hi},'
+                f' bins_per_decade={self.bins_per_decade},'
+                f' count={self.count})')
+
+    def reset(self):
+        self.counts = [0] * len(self.edges)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        if value < self.lo:
+            idx = 0
+        elif value >= self.hi:
+            idx = len(self.edges) - 1
+        else:
+            idx = int(math.log10(value / self.lo) * self.bins_per_decade) + 1
+        self.counts[idx] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q):
+        '''Estimate of the percentile: upper edge of the bin containing it
+        '''
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        cum = 0
+        for edge, cnt in zip(self.edges, self.counts):
+            cum += cnt
+            if cum >= rank:
+                return min(edge, self.max)
+        return self.max
+
+    def snapshot(self):
+        '''Summary of the histogram as dictionary
+        '''
+        if self.count == 0:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'mean': self.total / self.count,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.percentile(0.5),
+            'p90': self.percentile(0.9),
+            'p99': self.percentile(0.99),
+            'edges': list(self.edges),
+            'counts': list(self.counts),
+        }
+
+
+class BridgeStats:
+    '''Collects the timing of the commands executed by the bridge
+
+    Args:
+        hook: called with a :class:`CommandTiming` for each
+              command. It is called in the thread recording the
+              timing and should return quickly.
+    '''
+    def __init__(self, hook=None):
+        self.hook = hook
+        self._lock = threading.Lock()
+        self.queue_wait = Histogram()
+        self.execution = Histogram()
+        self.result_latency = Histogram()
+        self.n_msgs = Histogram(lo=1, hi=1e6, bins_per_decade=5)
+
+    def __repr__(self):
+        cls_name = self.__class__.__name__
+        return f'{cls_name}(hook={self.hook}, count={self.execution.count})'
+
+    def record(self, cmd, t_received=None):
+        '''Record the time stamps collected in the command envelope
+
+        Args:
+            cmd:        a :class:`bcib.bridge._Command` instance
+            t_received: time the result was received by the submitter
+        '''
+        result_latency = None
+        if t_received is not None:
+            result_latency = t_received - cmd.t_result
+        timing = CommandTiming(
+            cmd=cmd.cmd, queue_wait=cmd.t_dequeue - cmd.t_submit,
+            execution=cmd.t_done - cmd.t_dequeue, n_msgs=cmd.n_msgs,
+            result_latency=result_latency
+        )
+        with self._lock:
+            self.queue_wait.add(timing.queue_wait)
+            self.execution.add(timing.execution)
+            self.n_msgs.add(timing.n_msgs)
+            if result_latency is not None:
+                self.result_latency.add(result_latency)
+        if self.hook is not None:
+            self.hook(timing)
+
+    def reset(self):
+        with self._lock:
+            for hist in (self.queue_wait, self.execution,
+                         self.result_latency, self.n_msgs):
+                hist.reset()
+
+    def snapshot(self):
+        '''Current state of all histograms
+
+        Returns:
+            dictionary of histogram summaries (see
+            :meth:`Histogram.snapshot`). Times are given in seconds
+        '''
+        with self._lock:
+            return {
+                'queue_wait': self.queue_wait.snapshot(),
+                'execution': self.execution.snapshot(),
+                'n_msgs': self.n_msgs.snapshot(),
+                'result_latency': self.result_latency.snapshot(),
+            }
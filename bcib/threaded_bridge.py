@@ -1,12 +1,49 @@
 from .bridge import CallbackIteratorBridge
+from .rendezvous import RendezvousChannel
+from .watchdog import Watchdog
 from queue import Queue
 
 
-def setup_bridge():
+def setup_bridge(pipeline_depth=1, rendezvous=False, spin_time=0.0,
+                 state_checks=True, watchdog=None, **kwargs):
     '''Convenience function for setting up the callback bridge
+
+    Args:
+        pipeline_depth: number of commands that can be queued by
+                        :meth:`CallbackIteratorBridge.submit_nowait`
+                        while the iterator is executing a command
+        rendezvous:     use :class:`bcib.rendezvous.RendezvousChannel`
+                        instead of :class:`queue.Queue` for handing
+                        over commands and results. Only supports a
+                        pipeline depth of 1
+        spin_time:      time the rendezvous channels spin before
+                        blocking
+        state_checks:   validate the transitions of the state
+                        machines. Disable it to save the cost of
+                        the checks on each submission
+        watchdog:       interval in seconds of a
+                        :class:`bcib.watchdog.Watchdog` started for the
+                        bridge. None: no watchdog
+        kwargs:         further arguments of
+                        :class:`CallbackIteratorBridge` e.g. timeouts
+                        or `structured_log`
     '''
-    q_cmd = Queue(maxsize=1)
-    q_res = Queue(maxsize=1)
+    if pipeline_depth < 1:
+        raise ValueError(f'pipeline depth {pipeline_depth} must be >= 1')
+
+    if rendezvous:
+        if pipeline_depth != 1:
+            txt = f'rendezvous requires pipeline depth 1 not {pipeline_depth}'
+            raise ValueError(txt)
+        q_cmd = RendezvousChannel(spin_time=spin_time)
+        q_res = RendezvousChannel(spin_time=spin_time)
+    else:
+        q_cmd = Queue(maxsize=pipeline_depth)
+        q_res = Queue(maxsize=1)
 
-    executor = CallbackIteratorBridge(command_queue=q_cmd, result_queue=q_res)
+    executor = CallbackIteratorBridge(command_queue=q_cmd, result_queue=q_res,
+                                      pipeline_depth=pipeline_depth,
+                                      state_checks=state_checks, **kwargs)
+    if watchdog is not None:
+        executor.watchdog = Watchdog(executor, interval=watchdog).start()
     return executor
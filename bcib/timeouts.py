@@ -0,0 +1,137 @@
+'''Timeouts learned from the observed execution times
+
+The timeouts of the bridge are fixed (see
+:class:`bcib.bridge._BaseClass_Bridge`). A value long enough for a
+slow motor move takes far too long to detect a fast evaluation loop
+that hangs.
+
+An :class:`AdaptiveTimeout` given to the bridge records the round
+trip time of each submitted command, per command type. Once enough
+samples of a type were seen, the time the submitter waits for the
+result of such a command is derived from a high percentile of
+these times. Until then, the fixed :attr:`cmd_exec_timeout` is used.
+
+Enable it by
+
+::
+
+    policy = AdaptiveTimeout(quantile=0.99, factor=3, floor=0.05)
+    bridge = setup_bridge(cmd_exec_timeout=60, timeout_policy=policy)
+
+Note:
+    Only the time waited for the result of a command is adapted.
+    :attr:`cmd_queue_timeout` and :attr:`next_cmd_timeout` are
+    used as given.
+'''
+from .bridge import _command_name, _CommandBatch
+from .stats import Histogram
+
+import threading
+
+
+def command_type(cmd):
+    '''Default key of the command type
+
+    The name of the function of the command. A batch of commands is
+    keyed by the name of its first command and its length.
+    '''
+    if isinstance(cmd, _CommandBatch):
+        if len(cmd) == 0:
+            return ('batch', None, 0)
+        return ('batch', _command_name(cmd.cmds[0]), len(cmd))
+    return _command_name(cmd)
+
+
+class AdaptiveTimeout:
+    '''Timeout policy derived from percentiles per command type
+
+    The timeout of a command type is
+    ``factor * percentile(quantile)`` of its recorded round trip
+    times, limited to [floor, ceiling].
+
+    Args:
+        quantile:    the percentile used, e.g. 0.99
+        factor:      margin applied to the percentile
+        floor:       minimum timeout in seconds
+        ceiling:     maximum timeout in seconds. None: no limit
+        min_samples: number of samples of a command type required
+                     before its timeout is adapted. Before, the
+                     fixed timeout of the bridge is used
+        key:         function deriving the command type
+    '''
+    def __init__(self, quantile=0.99, factor=3.0, floor=0.01, ceiling=None,
+                 min_samples=10, key=command_type):
+        if not 0 < quantile <= 1:
+            raise ValueError(f'quantile {quantile} not within (0, 1]')
+        if factor < 1:
+            raise ValueError(f'factor {factor} must be >= 1')
+        self.quantile = quantile
+        self.factor = factor
+        self.floor = floor
+        self.ceiling = ceiling
+        self.min_samples = min_samples
+        self.key = key
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def __repr__(self):
+        cls_name = self.__class__.__name__
+        return (f'{cls_name}(quantile={self.quantile}, factor={self.factor},'
+                f' floor={self.floor}, ceiling={self.ceiling},'
+                f' min_samples={self.min_samples},'
+                f' types={len(self._histograms)})')
+
+    def record(self, cmd, duration):
+        '''Record the round trip time of a command
+        '''
+        key = self.key(cmd)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram()
+            hist.add(duration)
+
+    def _timeout(self, hist):
+        t = self.factor * hist.percentile(self.quantile)
+        t = max(t, self.floor)
+        if self.ceiling is not None:
+            t = min(t, self.ceiling)
+        return t
+
+    def timeout(self, cmd, fallback):
+        '''Time to wait for the result of the command
+
+        Args:
+            cmd:      the command
+            fallback: used if not enough samples were recorded for
+                      the command type
+        '''
+        hist = self._histograms.get(self.key(cmd))
+        if hist is None or hist.count < self.min_samples:
+            return fallback
+        with self._lock:
+            return self._timeout(hist)
+
+    def reset(self):
+        '''Forget all recorded times
+        '''
+        with self._lock:
+            self._histograms.clear()
+
+    def snapshot(self):
+        '''Number of samples and current timeout per command type
+
+        Returns:
+            dictionary command type: dict with 'count' and 'timeout'.
+            The timeout is None if the fallback is used
+        '''
+        with self._lock:
+            return {
+                key: {
+                    'count': hist.count,
+                    'timeout': (self._timeout(hist)
+                                if hist.count >= self.min_samples
+                                else None),
+                }
+                for key, hist in self._histograms.items()
+            }
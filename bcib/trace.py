@@ -0,0 +1,171 @@
+'''Timeline of the activity on both sides of the bridge
+
+The statistics (see :mod:`bcib.stats`) tell how long commands took
+on average. To see where the time of a single evaluation goes, the
+solver thread and the thread consuming the iterator (e.g. the run
+engine) have to be seen on one timeline.
+
+A :class:`Tracer` given to the bridge records spans of
+
+    * the submitter: `submit` (the whole call), `enqueue` (putting
+      the command on the command queue) and `result get` (waiting
+      for the result)
+    * the iterator: `dequeue` (waiting for the next command),
+      `message` (from yielding a message until the consumer asks
+      for the next one) and `result put`
+    * :func:`bcib.bridge_plan.bridge_plan_stub`: the whole plan
+
+The spans are stored in a ring buffer allocated up front: recording
+does not allocate memory for the buffer and only the latest
+`capacity` spans are kept. :meth:`Tracer.dump` writes them in the
+Chrome trace event format. Load the file into Perfetto
+(https://ui.perfetto.dev) or chrome://tracing.
+
+Enable it by
+
+::
+
+    tracer = Tracer()
+    bridge = setup_bridge(tracer=tracer)
+    ...
+    tracer.dump('bridge_trace.json')
+
+Note:
+    Only threads share the tracer. The child process of
+    :func:`bcib.process_bridge.setup_process_bridge` records into
+    its own copy.
+'''
+import itertools
+import json
+import os
+import threading
+import time
+
+
+def _describe(detail):
+    '''Short description of the detail of a span, e.g. a message
+    '''
+    command = getattr(detail, 'command', None)
+    if command is not None:
+        # e.g. a bluesky Msg
+        return str(command)
+    if isinstance(detail, (str, int, float)):
+        return detail
+    txt = repr(detail)
+    if len(txt) > 80:
+        txt = txt[:77] + '...'
+    return txt
+
+
+class Tracer:
+    '''Records spans of the bridge activity into a ring buffer
+
+    Args:
+        capacity: number of spans kept. Older ones are overwritten
+    '''
+    def __init__(self, capacity=65536):
+        if capacity < 1:
+            raise ValueError(f'capacity {capacity} must be >= 1')
+        self.capacity = capacity
+        self.clear()
+
+    def __repr__(self):
+        cls_name = self.__class__.__name__
+        return (f'{cls_name}(capacity={self.capacity},'
+                f' recorded={self.recorded})')
+
+    def __getstate__(self):
+        # a copy sent to an other process starts empty
+        return {'capacity': self.capacity}
+
+    def __setstate__(self, state):
+        self.capacity = state['capacity']
+        self.clear()
+
+    def clear(self):
+        '''Forget all recorded spans
+        '''
+        self._buffer = [None] * self.capacity
+        # next() on a count is atomic: no lock needed
+        self._counter = itertools.count()
+        self._last = -1
+        self._thread_names = {}
+
+    @property
+    def recorded(self):
+        '''Number of spans recorded since the last :meth:`clear`
+        '''
+        return self._last + 1
+
+    @property
+    def dropped(self):
+        '''Number of spans overwritten
+        '''
+        return max(self.recorded - self.capacity, 0)
+
+    def span(self, name, t_start, t_end=None, detail=None):
+        '''Record a span of the current thread
+
+        Args:
+            name:    name of the span
+            t_start: :func:`time.perf_counter` at its start
+            t_end:   :func:`time.perf_counter` at its end. Defaults
+                     to now
+            detail:  object describing the span. Only converted to
+                     text by :meth:`events`
+        '''
+        if t_end is None:
+            t_end = time.perf_counter()
+        tid = threading.get_ident()
+        if tid not in self._thread_names:
+            self._thread_names[tid] = threading.current_thread().name
+        idx = next(self._counter)
+        self._buffer[idx % self.capacity] = (name, t_start, t_end, tid,
+                                             detail)
+        if idx > self._last:
+            self._last = idx
+
+    def spans(self):
+        '''The spans kept, ordered by their start
+
+        Returns:
+            list of tuples (name, t_start, t_end, thread id, detail)
+        '''
+        return sorted((s for s in self._buffer if s is not None),
+                      key=lambda s: s[1])
+
+    def events(self):
+        '''The spans as Chrome trace events
+
+        Returns:
+            list of dictionaries: complete events ('X') and the
+            names of the threads as metadata events ('M')
+        '''
+        pid = os.getpid()
+        events = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+             'args': {'name': name}}
+            for tid, name in list(self._thread_names.items())
+        ]
+        for name, t_start, t_end, tid, detail in self.spans():
+            event = {
+                'name': name, 'cat': 'bcib', 'ph': 'X',
+                'ts': t_start * 1e6, 'dur': (t_end - t_start) * 1e6,
+                'pid': pid, 'tid': tid,
+            }
+            if detail is not None:
+                event['args'] = {'detail': _describe(detail)}
+            events.append(event)
+        return events
+
+    def dump(self, filename):
+        '''Write the spans to a Chrome trace JSON file
+        '''
+        trace = {
+            'traceEvents': self.events(),
+            'displayTimeUnit': 'ms',
+            'otherData': {'recorded': self.recorded,
+                          'dropped': self.dropped},
+        }
+        with open(filename, 'w') as fp:
+            json.dump(trace, fp)
@@ -0,0 +1,224 @@
+'''Watchdog supervising the threads on both sides of a bridge
+
+If the consumer of the iterator (e.g. the run engine) dies, the
+submitter only notices after :attr:`cmd_exec_timeout`. If the
+submitter dies, the iterator waits for the next command for
+:attr:`next_cmd_timeout`.
+
+A :class:`Watchdog` checks the heart beats of both sides every
+`interval` seconds:
+
+    * the submitter: the thread of the last submission
+    * the iterator: the thread iterating over the bridge, whether it
+      is still iterating and the time of its last message
+
+If the submitter waits for a result (of :meth:`submit` or of a
+future of :meth:`submit_nowait`) but the iterating thread died or
+left the iteration after the submission, or the iterator waits
+for commands but the submitting thread died, the bridge is failed
+(`state.set_failed()`). The side still alive receives a
+:class:`bcib.PeerLost` exception: the outstanding futures are set to
+it too. The stacks of both threads are
+logged and kept in :attr:`Watchdog.reports`.
+
+Optionally a stall, i.e. a waiting submitter while the iterator did
+not yield a message for `stall_time`, is reported the same way. The
+bridge is not failed for a stall: that is left to the timeouts.
+No stall is reported while the consumer is paused (see
+:meth:`bcib.bridge._BaseClass_Bridge.pause`).
+
+Typical usage:
+
+::
+
+    bridge = setup_bridge(watchdog=0.05)
+
+or
+
+::
+
+    with Watchdog(bridge, interval=0.05, stall_time=2):
+        ...
+'''
+from .bridge import _RaiseInIterator
+from .exceptions import PeerLost
+
+import concurrent.futures
+import logging
+import queue
+import sys
+import threading
+import time
+import traceback
+import weakref
+
+logger = logging.getLogger('bcib')
+
+
+def thread_stack(thread):
+    '''Current stack of the thread as text
+
+    Returns:
+        the formatted stack or None if the thread is not running
+    '''
+    if thread is None:
+        return None
+    frame = sys._current_frames().get(thread.ident)
+    if frame is None:
+        return None
+    return ''.join(traceback.format_stack(frame))
+
+
+class Watchdog:
+    '''Supervise the submitting and the iterating thread of a bridge
+
+    The watchdog only keeps a weak reference to the bridge. Its
+    thread ends when the bridge is gone or :meth:`stop` is called.
+
+    Args:
+        bridge:     a :class:`bcib.CallbackIteratorBridge`
+        interval:   time between two checks in seconds
+        stall_time: report a waiting submitter if the iterator did
+                    not yield a message for this time. None: do not
+                    check for stalls
+        log:        a :class:`logging.Logger` object
+    '''
+    def __init__(self, bridge, interval=0.1, stall_time=None, log=None):
+        if log is None:
+            log = logger
+        self.log = log
+        self.interval = interval
+        self.stall_time = stall_time
+        #: diagnostics: one dictionary per detected problem
+        self.reports = []
+        self._bridge = weakref.ref(bridge)
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._stall_reported = None
+
+    def __repr__(self):
+        cls_name = self.__class__.__name__
+        return (f'{cls_name}(interval={self.interval},'
+                f' stall_time={self.stall_time},'
+                f' reports={len(self.reports)})')
+
+    def start(self):
+        if self._thread is not None:
+            return self
+        self._thread = threading.Thread(target=self._run,
+                                        name='bcib-watchdog', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.stop()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            bridge = self._bridge()
+            if bridge is None:
+                return
+            try:
+                self.check(bridge)
+            except Exception as exc:
+                self.log.error('%s: check failed: %s',
+                               self.__class__.__name__, exc)
+            del bridge
+
+    def _report(self, bridge, reason):
+        '''Capture the stacks of both threads
+        '''
+        submitter = bridge._submitter_thread
+        iterator = bridge._iterator_thread
+        report = {
+            'time': time.time(),
+            'reason': reason,
+            'command': bridge.last_command,
+            'submitter_thread': getattr(submitter, 'name', None),
+            'submitter_stack': thread_stack(submitter),
+            'iterator_thread': getattr(iterator, 'name', None),
+            'iterator_stack': thread_stack(iterator),
+            'since_last_submit': time.monotonic() - bridge._last_submit,
+            'since_last_message': time.monotonic() - bridge._last_progress,
+        }
+        self.reports.append(report)
+        self.log.error(
+            '%s: %s\nsubmitter %s:\n%s\niterator %s:\n%s',
+            self.__class__.__name__, reason,
+            report['submitter_thread'], report['submitter_stack'],
+            report['iterator_thread'], report['iterator_stack']
+        )
+        return report
+
+    def _fail(self, bridge, reason):
+        self._report(bridge, reason)
+        if not bridge.state.is_failed:
+            bridge.state.set_failed()
+
+    def check(self, bridge):
+        '''Check both sides of the bridge once
+
+        Returns:
+            True if the bridge was failed by this check
+        '''
+        if bridge.state.is_failed:
+            return False
+
+        submitter = bridge._submitter_thread
+        iterator = bridge._iterator_thread
+        # pipelined submissions wait on their futures
+        outstanding = list(bridge._outstanding)
+        waiting = bridge.cmd_state.is_waiting or bool(outstanding)
+
+        if bridge._iterating:
+            iterator_gone = not iterator.is_alive()
+        else:
+            # left the iteration without answering the submission
+            iterator_gone = (bridge._iterating is False and
+                             bridge._left_iteration > bridge._last_submit)
+        if waiting and iterator_gone:
+            reason = f'iterating thread {iterator.name} gone'
+            self._fail(bridge, reason)
+            try:
+                # tagged with the submission waited for: stale for
+                # later ones if its result arrived meanwhile
+                bridge.result_queue.put((bridge._last_seq, PeerLost(reason)),
+                                        block=False)
+            except queue.Full:
+                pass
+            for future in outstanding:
+                try:
+                    future.set_exception(PeerLost(reason))
+                except concurrent.futures.InvalidStateError:
+                    # done meanwhile
+                    pass
+            return True
+
+        if (bridge._iterating and submitter is not None
+                and not submitter.is_alive()
+                and not (bridge.state.is_stopping
+                         or bridge.state.is_stopped)):
+            reason = f'submitting thread {submitter.name} died'
+            self._fail(bridge, reason)
+            try:
+                bridge._putCommand(_RaiseInIterator(PeerLost(reason)), 0)
+            except queue.Full:
+                # iterator stops at the next check of the state
+                pass
+            return True
+
+        if self.stall_time is not None and waiting and not bridge.is_paused:
+            progress = bridge._last_progress
+            idle = time.monotonic() - max(progress, bridge._last_submit)
+            if idle > self.stall_time and progress != self._stall_reported:
+                self._stall_reported = progress
+                self._report(bridge, f'no message for {idle:.3f} s')
+        return False
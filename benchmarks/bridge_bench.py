@@ -0,0 +1,231 @@
+'''Round trip latency and throughput of the callback iterator bridge
+
+Runs offline: no run engine or hardware is required. A solver thread
+submits commands to a :class:`bcib.CallbackIteratorBridge`. The
+commands are consumed by a stand in for bluesky's run engine, which
+iterates over :func:`bcib.bridge_plan.bridge_plan_stub` and sends
+`None` back for each message.
+
+The scenarios vary
+
+    * the number of messages yielded per command
+    * the size of the returned payload (a reading like dict with a
+      list of floats)
+    * the log level of the 'bcib' logger (messages are formatted
+      into an in memory stream)
+    * the bridge setup (queues or rendezvous channels, state checks,
+      structured logging)
+
+For each scenario the round trip latency percentiles of
+:meth:`submit`, the commands per second and the messages per second
+are measured. The results are written as JSON, together with some
+information on the environment. A previous result file can be given
+to compare against.
+
+Usage (from the root of the repository)::
+
+    PYTHONPATH=. python benchmarks/bridge_bench.py -o bench.json
+    PYTHONPATH=. python benchmarks/bridge_bench.py --quick \\
+        --compare bench.json
+'''
+from bcib.threaded_bridge import setup_bridge
+from bcib.bridge_plan import bridge_plan_stub
+import argparse
+import datetime
+import functools
+import io
+import itertools
+import json
+import logging
+import platform
+import subprocess
+import sys
+import threading
+import time
+
+logger = logging.getLogger('bcib')
+
+#: bridge setups: label and arguments of :func:`setup_bridge`
+bridge_setups = {
+    'queue': dict(),
+    'rendezvous': dict(rendezvous=True),
+    'queue-unchecked': dict(state_checks=False),
+    'queue-structured': dict(structured_log=True),
+}
+
+
+def cmd(n_yields, payload):
+    for i in range(n_yields):
+        yield ('msg', i)
+    return payload
+
+
+def make_payload(size):
+    '''A result resembling the output of trigger_and_read
+    '''
+    return {
+        'det': {'value': [0.0] * size, 'timestamp': 0.0},
+        'mot': {'value': 0.0, 'timestamp': 0.0},
+    }
+
+
+def run_engine_loop(plan):
+    '''Stand in for the run engine: consume all messages
+
+    Returns:
+        number of messages consumed
+    '''
+    n_msgs = 0
+    ret = None
+    while True:
+        try:
+            plan.send(ret)
+        except StopIteration:
+            return n_msgs
+        n_msgs += 1
+        ret = None
+
+
+def run_scenario(setup, n_cmds, n_yields, payload_size, log_level):
+    '''Submit n_cmds commands and time them
+
+    Returns:
+        dict with the measured values
+    '''
+    bridge = setup_bridge(**bridge_setups[setup])
+    logger.setLevel(log_level)
+
+    consumed = []
+
+    def consume():
+        consumed.append(run_engine_loop(bridge_plan_stub(bridge)))
+
+    thread = threading.Thread(target=consume, name='run_engine')
+    thread.start()
+
+    p = functools.partial(cmd, n_yields, make_payload(payload_size))
+    dts = []
+    t_start = time.perf_counter()
+    try:
+        for i in range(n_cmds):
+            t0 = time.perf_counter()
+            bridge.submit(p)
+            dts.append(time.perf_counter() - t0)
+    finally:
+        bridge.stopDelegation()
+    t_total = time.perf_counter() - t_start
+    thread.join()
+
+    dts.sort()
+
+    def percentile(q):
+        return dts[min(int(len(dts) * q), len(dts) - 1)] * 1e6
+
+    return {
+        'setup': setup,
+        'n_cmds': n_cmds,
+        'n_yields': n_yields,
+        'payload_size': payload_size,
+        'log_level': logging.getLevelName(log_level),
+        'latency_us': {
+            'p50': percentile(0.5),
+            'p90': percentile(0.9),
+            'p99': percentile(0.99),
+            'max': dts[-1] * 1e6,
+        },
+        'commands_per_s': n_cmds / t_total,
+        'messages_per_s': consumed[0] / t_total,
+    }
+
+
+def scenario_key(r):
+    return (r['setup'], r['n_yields'], r['payload_size'], r['log_level'])
+
+
+def environment():
+    try:
+        rev = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+            text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        rev = None
+    return {
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'git_revision': rev,
+        'python': sys.version,
+        'platform': platform.platform(),
+    }
+
+
+def report(results, reference=None):
+    ref = {}
+    if reference is not None:
+        ref = {scenario_key(r): r for r in reference['results']}
+
+    print(f'{"setup":17s} {"yields":>6s} {"payload":>7s} {"log":>7s}'
+          f' {"p50/us":>8s} {"p99/us":>8s} {"cmd/s":>9s} {"msg/s":>9s}')
+    for r in results:
+        lat = r['latency_us']
+        line = (
+            f'{r["setup"]:17s} {r["n_yields"]:6d} {r["payload_size"]:7d}'
+            f' {r["log_level"]:>7s} {lat["p50"]:8.1f} {lat["p99"]:8.1f}'
+            f' {r["commands_per_s"]:9.0f} {r["messages_per_s"]:9.0f}'
+        )
+        old = ref.get(scenario_key(r))
+        if old is not None:
+            ratio = r['commands_per_s'] / old['commands_per_s']
+            line += f'  ({ratio:5.2f} x reference)'
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-n', type=int, default=5000,
+                        help='commands per scenario')
+    parser.add_argument('--quick', action='store_true',
+                        help='run a reduced set of scenarios')
+    parser.add_argument('-o', '--output',
+                        help='write the results to this JSON file')
+    parser.add_argument('--compare',
+                        help='JSON file of a previous run to compare with')
+    args = parser.parse_args()
+
+    if args.quick:
+        setups = ['queue', 'rendezvous']
+        yields = [1, 10]
+        payloads = [10]
+        levels = [logging.WARNING]
+    else:
+        setups = list(bridge_setups)
+        yields = [1, 10, 100]
+        payloads = [10, 10000]
+        levels = [logging.WARNING, logging.INFO]
+
+    # Log into memory: measure formatting, not the terminal
+    handler = logging.StreamHandler(io.StringIO())
+    logger.addHandler(handler)
+    logger.propagate = False
+
+    results = []
+    for setup, n_yields, size, level in itertools.product(
+            setups, yields, payloads, levels):
+        results.append(run_scenario(setup, args.n, n_yields, size, level))
+        # do not let the log grow too much
+        handler.stream.seek(0)
+        handler.stream.truncate()
+
+    reference = None
+    if args.compare:
+        with open(args.compare) as fp:
+            reference = json.load(fp)
+    report(results, reference)
+
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump({'environment': environment(), 'n_cmds': args.n,
+                       'results': results}, fp, indent=2)
+
+
+if __name__ == '__main__':
+    main()
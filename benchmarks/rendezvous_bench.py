@@ -0,0 +1,112 @@
+'''Round trip latency: queue.Queue versus RendezvousChannel
+
+Measures
+
+    * the bare channels: a command and a result handed over between
+      two threads
+    * the full bridge: :meth:`submit` of a command yielding a single
+      message, consumed by a thread iterating over the bridge
+
+Usage (from the root of the repository)::
+
+    PYTHONPATH=. python benchmarks/rendezvous_bench.py -n 20000
+'''
+from bcib.rendezvous import RendezvousChannel
+from bcib.threaded_bridge import setup_bridge
+from queue import Queue
+import argparse
+import functools
+import statistics
+import threading
+import time
+
+
+def channel_round_trip(factory, n):
+    '''Latencies of command / result round trips over bare channels
+    '''
+    q_cmd, q_res = factory(), factory()
+
+    def echo():
+        while True:
+            item = q_cmd.get()
+            if item is None:
+                return
+            q_res.put(item)
+
+    thread = threading.Thread(target=echo)
+    thread.start()
+    dts = []
+    for i in range(n):
+        t0 = time.perf_counter()
+        q_cmd.put(i, timeout=1)
+        q_res.get(timeout=5)
+        dts.append(time.perf_counter() - t0)
+    q_cmd.put(None)
+    thread.join()
+    return dts
+
+
+def cmd():
+    yield 'msg'
+    return 1
+
+
+def bridge_round_trip(bridge, n):
+    '''Latencies of submit round trips over the bridge
+    '''
+    def consume():
+        for msg in bridge:
+            pass
+
+    thread = threading.Thread(target=consume)
+    thread.start()
+    p = functools.partial(cmd)
+    dts = []
+    try:
+        for i in range(n):
+            t0 = time.perf_counter()
+            bridge.submit(p)
+            dts.append(time.perf_counter() - t0)
+    finally:
+        bridge.stopDelegation()
+    thread.join()
+    return dts
+
+
+def report(label, dts):
+    dts = sorted(dts)
+    p50 = dts[len(dts) // 2] * 1e6
+    p99 = dts[int(len(dts) * 0.99)] * 1e6
+    mean = statistics.fmean(dts) * 1e6
+    print(f'{label:36s} mean {mean:8.2f} us  p50 {p50:8.2f} us'
+          f'  p99 {p99:8.2f} us')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-n', type=int, default=20000,
+                        help='number of round trips')
+    parser.add_argument('--spin-time', type=float, default=20e-6,
+                        help='spin time of the spinning rendezvous channel')
+    args = parser.parse_args()
+    n = args.n
+
+    report('channel: queue.Queue(1)',
+           channel_round_trip(lambda: Queue(maxsize=1), n))
+    report('channel: rendezvous',
+           channel_round_trip(RendezvousChannel, n))
+    report('channel: rendezvous spinning',
+           channel_round_trip(
+               lambda: RendezvousChannel(spin_time=args.spin_time), n))
+
+    report('bridge: queue.Queue(1)',
+           bridge_round_trip(setup_bridge(), n))
+    report('bridge: rendezvous',
+           bridge_round_trip(setup_bridge(rendezvous=True), n))
+    report('bridge: rendezvous spinning',
+           bridge_round_trip(setup_bridge(rendezvous=True,
+                                          spin_time=args.spin_time), n))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+'''State tracking cost: state machines versus compact states
+
+Runs the transitions a single :meth:`submit` performs (submitting,
+submitted, waiting, finished) plus the bridge state queries for
+
+    * the :mod:`super_state_machine` based state machines
+    * the compact states with transition checks
+    * the compact states without transition checks
+
+Usage (from the root of the repository)::
+
+    PYTHONPATH=. python benchmarks/state_bench.py -n 100000
+'''
+from bcib.bridge import (BridgeState, CommandProcessingState,
+                         CompactBridgeState, CompactCommandProcessingState)
+import argparse
+import time
+
+
+def one_submit(state, cmd_state):
+    cmd_state.set_submitting()
+    cmd_state.set_submitted()
+    cmd_state.set_waiting()
+    cmd_state.set_finished()
+    state.is_stopping
+    state.is_stopped
+    state.is_failed
+
+
+def run(state, cmd_state, n):
+    cmd_state.set_submitting()
+    cmd_state.set_submitted()
+    cmd_state.set_finished()
+    t0 = time.perf_counter()
+    for i in range(n):
+        one_submit(state, cmd_state)
+    return (time.perf_counter() - t0) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-n', type=int, default=100000,
+                        help='number of simulated submissions')
+    args = parser.parse_args()
+
+    variants = [
+        ('state machine', BridgeState(), CommandProcessingState()),
+        ('compact, checked', CompactBridgeState(checked=True),
+         CompactCommandProcessingState(checked=True)),
+        ('compact', CompactBridgeState(), CompactCommandProcessingState()),
+    ]
+    ref = None
+    for label, state, cmd_state in variants:
+        dt = run(state, cmd_state, args.n)
+        if ref is None:
+            ref = dt
+        print(f'{label:20s} {dt * 1e6:8.3f} us per submit'
+              f'  ({ref / dt:6.1f} x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -4,8 +4,7 @@ This example rather shows that the current interface still
 requires improvement.
 '''
 import logging
-from bcib.threaded_bridge import setup_bridge
-from bcib.bridge_plan import bridge_plan_stub
+from bcib.pool import BridgePool
 from ophyd import Component as Cpt, Device, Signal
 from ophyd.status import AndStatus
 
@@ -16,7 +15,6 @@ import bluesky.plans as bp
 import bluesky.plan_stubs as bps
 
 from scipy.optimize import brentq
-import threading
 from functools import partial
 import enum
 
@@ -51,10 +49,13 @@ class Bookkeeping(Device):
             self.status.set(SolverState.failed)
 
 
-def solve_stub(detectors, motor, step, log=None):
+def solve_stub(detectors, motor, step, *, pool):
     '''
 
     This stub should be a bit more generic
+
+    The bridge and the solver thread are taken from the pool: no
+    thread is started per step.
     '''
     bk_dev = detectors[0]
 
@@ -68,36 +69,30 @@ def solve_stub(detectors, motor, step, log=None):
         r = (yield from bps.trigger_and_read(all_dev))
         return r
 
-    def cb(val):
-        cmd = partial(step_stub, detectors, motor, val)
-        r = bridge.submit(cmd)
-        val = r[motor.readback.name]['value']
-        return val - step
+    def run_solver(bridge):
+        def readback(r):
+            # executed by the run engine thread: only the value is
+            # handed back to the solver
+            return r[motor.readback.name]['value']
 
-    bridge = setup_bridge()
+        def cb(val):
+            cmd = partial(step_stub, detectors, motor, val)
+            val = bridge.submit(cmd, project=readback)
+            return val - step
 
-    def run_solver():
         a, b = -10, 10
-        r = brentq(cb, a, b)
-        bridge.stopDelegation()
-        return r
+        return brentq(cb, a, b)
 
     yield from bps.mv(bk_dev.status, SolverState.searching)
     yield from bps.mv(bk_dev.target, step)
 
-    thread = threading.Thread(target=run_solver, name='run_solver')
-    thread.start()
-
     try:
-        (yield from bridge_plan_stub(bridge, log=log))
+        (yield from pool.solve_plan(run_solver))
     except Exception:
         yield from bps.mv(bk_dev.status, SolverState.failed)
     else:
         yield from bps.mv(bk_dev.status, SolverState.finished)
 
-    thread.join()
-    del thread
-
 
 def main():
     act = MimicActuator(name='act')
@@ -108,7 +103,9 @@ def main():
 
     lt = LiveTable([bk_dev.status.name, bk_dev.target.name,
                     act.setpoint.name, act.readback.name])
-    RE(bp.scan(dets, act, 1, 5, 5, per_step=solve_stub), lt)
+    with BridgePool() as pool:
+        per_step = partial(solve_stub, pool=pool)
+        RE(bp.scan(dets, act, 1, 5, 5, per_step=per_step), lt)
 
 
 if __name__ == '__main__':
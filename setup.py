@@ -10,8 +10,8 @@ setup(
     license="GPL",
     keywords="callback, iterator",
     url="https://github.com/hz-b/naus",
-    packages=['bcib'],
-    extra_requires={"bluesky": ["bluesky"]},
+    packages=['bcib', 'bcib.solvers'],
+    extra_requires={"bluesky": ["bluesky"], "numpy": ["numpy"]},
     classifiers=[
         "Development Status :: 2 - Pre - Alpha",
         "Intended Audience :: Science/Research",
@@ -0,0 +1,69 @@
+from bcib.bridge_plan import ask_tell_plan_stub
+from bcib import ExecutionStopRequest
+import functools
+import unittest
+from util import consume
+
+
+class GridOptimizer:
+    '''Minimal ask / tell optimizer: walks a grid
+    '''
+    def __init__(self, points):
+        self.points = list(points)
+        self.told = []
+
+    def ask(self):
+        if len(self.told) == len(self.points):
+            raise ExecutionStopRequest('grid exhausted')
+        return self.points[len(self.told)]
+
+    def tell(self, x, value):
+        self.told.append((x, value))
+
+
+def step(x):
+    r = yield ('set', x)
+    return {'x': x, 'y': (x - 1) ** 2, 'sent': r}
+
+
+class TestAskTell(unittest.TestCase):
+    def test00_grid(self):
+        '''Optimizer asked until it requests to stop
+        '''
+        opt = GridOptimizer([0.0, 1.0, 2.0])
+        plan = ask_tell_plan_stub(opt, lambda x: functools.partial(step, x),
+                                  reduce=lambda r: r['y'])
+        r, messages = consume(plan, reply=len)
+        self.assertEqual(opt.told, [(0.0, 1.0), (1.0, 0.0), (2.0, 1.0)])
+        self.assertEqual(messages, [('set', 0.0), ('set', 1.0), ('set', 2.0)])
+        self.assertEqual(r['sent'], 3)
+
+    def test01_limits(self):
+        '''Maximum evaluations and stop criterion
+        '''
+        opt = GridOptimizer(range(10))
+        consume(ask_tell_plan_stub(opt, lambda x: functools.partial(step, x),
+                                   max_evaluations=4))
+        self.assertEqual(len(opt.told), 4)
+
+        opt = GridOptimizer(range(10))
+        consume(ask_tell_plan_stub(opt, lambda x: functools.partial(step, x),
+                                   stop=lambda o: len(o.told) >= 2))
+        self.assertEqual(len(opt.told), 2)
+
+    def test02_exception(self):
+        '''Exception of the command raised by the plan
+        '''
+        def failing(x):
+            yield 'Test'
+            raise ValueError('Test failure')
+
+        opt = GridOptimizer(range(3))
+        with self.assertRaises(ValueError):
+            consume(ask_tell_plan_stub(
+                opt, lambda x: functools.partial(failing, x)))
+        self.assertEqual(opt.told, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
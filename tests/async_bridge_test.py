@@ -0,0 +1,172 @@
+import logging
+from bcib.async_bridge import setup_async_bridge
+import asyncio
+import unittest
+import functools
+
+logger = logging.getLogger('bcib')
+
+
+class TestAsyncBridge(unittest.TestCase):
+    def setUp(self):
+        self.bridge = setup_async_bridge(pipeline_depth=2)
+
+    def _run(self, solve):
+        '''run solver and consumer in the same event loop
+        '''
+        messages = []
+
+        async def consume():
+            async for elem in self.bridge:
+                messages.append(elem)
+
+        async def main():
+            _, r = await asyncio.gather(consume(), solve())
+            return r
+
+        r = asyncio.run(main())
+        return r, messages
+
+    def test00_submit(self):
+        '''Submit commands one after the other
+        '''
+        def cmd(val):
+            yield 'Test'
+            return val * 2
+
+        async def solve():
+            try:
+                r = [await self.bridge.submit(functools.partial(cmd, i))
+                     for i in range(3)]
+            finally:
+                await self.bridge.stopDelegation()
+            return r
+
+        r, messages = self._run(solve)
+        self.assertEqual(r, [0, 2, 4])
+        self.assertEqual(messages, ['Test'] * 3)
+
+    def test01_submit_nowait_and_many(self):
+        '''Pipelined and batched submission
+        '''
+        def cmd(val):
+            yield 'Test'
+            return val + 1
+
+        async def solve():
+            try:
+                futures = [
+                    await self.bridge.submit_nowait(functools.partial(cmd, i))
+                    for i in range(3)
+                ]
+                r = [await f for f in futures]
+                r += await self.bridge.submit_many(
+                    [functools.partial(cmd, i) for i in range(3, 5)]
+                )
+            finally:
+                await self.bridge.stopDelegation()
+            return r
+
+        r, _ = self._run(solve)
+        self.assertEqual(r, [1, 2, 3, 4, 5])
+
+    def test02_exception(self):
+        '''Exception raised by the command reaches the solver
+        '''
+        def cmd():
+            yield 'Test'
+            raise ValueError('Test failure')
+
+        async def consume():
+            with self.assertRaises(ValueError):
+                async for elem in self.bridge:
+                    pass
+
+        async def solve():
+            try:
+                with self.assertRaises(ValueError):
+                    await self.bridge.submit(functools.partial(cmd))
+            finally:
+                await self.bridge.stopDelegation()
+
+        async def main():
+            await asyncio.gather(consume(), solve())
+
+        asyncio.run(main())
+
+    def test03_athrow(self):
+        '''Exception thrown into the iterator reaches the command
+        '''
+        self.bridge = setup_async_bridge(cmd_exec_timeout=2)
+        caught = []
+
+        def cmd():
+            try:
+                yield 'Test'
+            except KeyError as exc:
+                caught.append(exc)
+                yield 'Recovered'
+            return 'done'
+
+        async def consume():
+            messages = []
+            it = self.bridge.__aiter__()
+            messages.append(await it.__anext__())
+            messages.append(await it.athrow(KeyError('Test')))
+            async for elem in it:
+                messages.append(elem)
+            return messages
+
+        async def solve():
+            try:
+                return await self.bridge.submit(cmd)
+            finally:
+                await self.bridge.stopDelegation()
+
+        async def main():
+            return await asyncio.gather(consume(), solve())
+
+        messages, r = asyncio.run(main())
+        self.assertEqual(messages, ['Test', 'Recovered'])
+        self.assertEqual(r, 'done')
+        self.assertEqual(len(caught), 1)
+
+    def test04_unsupported_options(self):
+        with self.assertRaises(TypeError):
+            setup_async_bridge(collect_stats=True)
+
+    def test05_submit_nowait_window_full(self):
+        '''Bridge still usable after the command window was full
+        '''
+        self.bridge = setup_async_bridge(cmd_exec_timeout=0.05)
+
+        def cmd(val):
+            yield 'Test'
+            return val
+
+        async def solve():
+            try:
+                first = await self.bridge.submit_nowait(
+                    functools.partial(cmd, 1))
+                with self.assertRaises(asyncio.TimeoutError):
+                    await self.bridge.submit_nowait(functools.partial(cmd, 2))
+                self.bridge.cmd_exec_timeout = 5
+                r = await self.bridge.submit(functools.partial(cmd, 3))
+                return [await first, r]
+            finally:
+                await self.bridge.stopDelegation()
+
+        async def main():
+            solver = asyncio.create_task(solve())
+            # consumer starts once the window was found full
+            await asyncio.sleep(0.1)
+            messages = [msg async for msg in self.bridge]
+            return messages, await solver
+
+        messages, r = asyncio.run(main())
+        self.assertEqual(r, [1, 3])
+        self.assertEqual(messages, ['Test'] * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,9 @@
 import logging
 # logging.basicConfig(level='DEBUG')
 from bcib.threaded_bridge import setup_bridge
+import queue
 import threading
+import time
 import unittest
 import functools
 
@@ -174,6 +176,467 @@ class TestExecutor(unittest.TestCase):
         self.assertEqual(r, 'Result 3')
         logger.info('done')
 
+    def test05_submit_nowait_pipelined(self):
+        '''Queue several commands before waiting for the results
+        '''
+        self.bridge = setup_bridge(pipeline_depth=3)
+
+        def cmd(val):
+            yield 'Test'
+            return val * 2
+
+        def do_iter():
+            for elem in self.bridge:
+                pass
+
+        self.thread = threading.Thread(target=do_iter)
+        self.thread.start()
+        try:
+            futures = [self.bridge.submit_nowait(functools.partial(cmd, i))
+                       for i in range(5)]
+            r = [f.result(timeout=5) for f in futures]
+        finally:
+            self.bridge.stopDelegation()
+        self.thread.join()
+        self.assertEqual(r, [0, 2, 4, 6, 8])
+
+    def test06_submit_nowait_exception(self):
+        '''Exceptions are set on the future
+        '''
+        def cmd():
+            yield 'Test'
+            raise ValueError('Test failure')
+
+        def do_iter():
+            try:
+                for elem in self.bridge:
+                    pass
+            except ValueError:
+                pass
+
+        self.thread = threading.Thread(target=do_iter)
+        self.thread.start()
+        try:
+            future = self.bridge.submit_nowait(functools.partial(cmd))
+            with self.assertRaises(ValueError):
+                future.result(timeout=5)
+        finally:
+            self.bridge.stopDelegation()
+        self.thread.join()
+
+    def test07_submit_many(self):
+        '''Submit a batch of commands in one go
+        '''
+        def cmd(val):
+            yield 'Test'
+            yield 'Test1'
+            return val + 1
+
+        partials = [functools.partial(cmd, i) for i in range(4)]
+
+        def do_iter():
+            self.messages = list(self.bridge)
+
+        self.thread = threading.Thread(target=do_iter)
+        self.thread.start()
+        try:
+            r = self.bridge.submit_many(partials)
+            r_empty = self.bridge.submit_many([])
+        finally:
+            self.bridge.stopDelegation()
+        self.thread.join()
+        self.assertEqual(r, [1, 2, 3, 4])
+        self.assertEqual(r_empty, [])
+        self.assertEqual(len(self.messages), 8)
+
+    def test08_structured_log(self):
+        '''Compact records instead of the result representation
+        '''
+        self.bridge = setup_bridge(structured_log=True)
+
+        def cmd():
+            yield 'Test'
+            return {'det': 1, 'mot': 2}
+
+        with self.assertLogs('bcib', level='INFO') as cm:
+            self._run_as_iterator([functools.partial(cmd)])
+        records = [rec for rec in cm.records if hasattr(rec, 'bcib_event')]
+        self.assertEqual(len(records), 1)
+        fields = records[0].bcib_fields
+        self.assertEqual(fields['cmd_no'], 0)
+        self.assertEqual(fields['result_len'], 2)
+        self.assertEqual(fields['cmd'], 'TestExecutor.test08_structured_log'
+                         '.<locals>.cmd')
+
+    def test09_stale_result_after_reset(self):
+        '''Result of a timed out command is not handed to the next one
+        '''
+        self.bridge = setup_bridge(cmd_exec_timeout=0.2)
+
+        def cmd(val):
+            yield val
+            return val
+
+        def do_iter():
+            # consumer blocking on the first message like slow hardware
+            for elem in self.bridge:
+                if elem == 'slow':
+                    time.sleep(0.5)
+
+        self.thread = threading.Thread(target=do_iter)
+        self.thread.start()
+        try:
+            with self.assertRaises(queue.Empty):
+                self.bridge.submit(functools.partial(cmd, 'slow'))
+            self.assertTrue(self.bridge.state.is_failed)
+            self.bridge.reset()
+            self.bridge.cmd_exec_timeout = 5
+            with self.assertLogs('bcib', level='WARNING'):
+                r = self.bridge.submit(functools.partial(cmd, 'fast'))
+        finally:
+            self.bridge.stopDelegation()
+        self.thread.join()
+        self.assertEqual(r, 'fast')
+
+    def test10_stale_command_dropped(self):
+        '''Commands queued before reset are not executed
+        '''
+        def cmd(val):
+            yield val
+            return val
+
+        self.bridge.submit(functools.partial(cmd, 'stale'),
+                           wait_for_result=False)
+        self.bridge.state.set_failed()
+        self.bridge.reset()
+
+        messages = []
+
+        def do_iter():
+            messages.extend(self.bridge)
+
+        self.thread = threading.Thread(target=do_iter)
+        self.thread.start()
+        try:
+            r = self.bridge.submit(functools.partial(cmd, 'fresh'))
+        finally:
+            self.bridge.stopDelegation()
+        self.thread.join()
+        self.assertEqual(r, 'fresh')
+        self.assertEqual(messages, ['fresh'])
+
+    def test11_project(self):
+        '''Only the projected value is handed back
+        '''
+        def cmd(val):
+            yield 'Test'
+            return {'det': {'value': val, 'timestamp': 0.0}}
+
+        def det_value(r):
+            return r['det']['value']
+
+        def do_iter():
+            for elem in self.bridge:
+                pass
+
+        self.thread = threading.Thread(target=do_iter)
+        self.thread.start()
+        try:
+            r = self.bridge.submit(functools.partial(cmd, 3),
+                                   project=det_value)
+            r_many = self.bridge.submit_many(
+                [functools.partial(cmd, i) for i in range(3)],
+                project=det_value
+            )
+            future = self.bridge.submit_nowait(functools.partial(cmd, 4),
+                                               project=det_value)
+            r_future = future.result(timeout=5)
+            r_full = self.bridge.submit(functools.partial(cmd, 5))
+        finally:
+            self.bridge.stopDelegation()
+        self.thread.join()
+        self.assertEqual(r, 3)
+        self.assertEqual(r_many, [0, 1, 2])
+        self.assertEqual(r_future, 4)
+        self.assertEqual(r_full['det']['value'], 5)
+
+    def test12_projector(self):
+        '''Bridge level projection, overridden per submission
+        '''
+        self.bridge = setup_bridge(projector=len, collect_stats=True)
+
+        def cmd(val):
+            yield 'Test'
+            return [val] * val
+
+        r = self._run_as_iterator([functools.partial(cmd, 3)])
+        self.assertEqual(r, 3)
+        r = self._run_as_iterator([functools.partial(cmd, 3)])
+        self.assertEqual(r, 3)
+        self.assertEqual(self.bridge.stats()['execution']['count'], 2)
+
+        def do_iter():
+            for elem in self.bridge:
+                pass
+
+        self.thread = threading.Thread(target=do_iter)
+        self.thread.start()
+        try:
+            r = self.bridge.submit(functools.partial(cmd, 2), project=sum)
+        finally:
+            self.bridge.stopDelegation()
+        self.thread.join()
+        self.assertEqual(r, 4)
+
+    def test13_progress_resets_timeout(self):
+        '''No timeout while the command yields messages
+        '''
+        self.bridge = setup_bridge(cmd_exec_timeout=0.2)
+
+        def cmd():
+            for i in range(6):
+                yield 'Test'
+            return 'done'
+
+        def do_iter():
+            for elem in self.bridge:
+                time.sleep(0.1)
+
+        self.thread = threading.Thread(target=do_iter)
+        self.thread.start()
+        try:
+            r = self.bridge.submit(cmd)
+        finally:
+            self.bridge.stopDelegation()
+        self.thread.join()
+        self.assertEqual(r, 'done')
+
+    def test14_stop_on_failure(self):
+        '''Command stopped at the next message once the bridge failed
+        '''
+        from bcib import ExecutionStopRequest
+
+        self.bridge = setup_bridge(cmd_exec_timeout=0.1, check_interval=1)
+        messages = []
+
+        def cmd():
+            for i in range(10):
+                yield i
+            return 'done'
+
+        def do_iter():
+            try:
+                for elem in self.bridge:
+                    messages.append(elem)
+                    if elem == 0:
+                        time.sleep(0.3)
+            except ExecutionStopRequest as esr:
+                messages.append(esr)
+
+        self.thread = threading.Thread(target=do_iter)
+        self.thread.start()
+        with self.assertRaises(queue.Empty):
+            self.bridge.submit(cmd)
+        self.thread.join()
+        self.assertEqual(messages[0], 0)
+        self.assertEqual(len(messages), 2)
+        self.assertIsInstance(messages[-1], ExecutionStopRequest)
+
+    def test15_next_cmd_timeout(self):
+        '''Iteration fails if no command arrives
+        '''
+        self.bridge = setup_bridge(next_cmd_timeout=0.05)
+        with self.assertRaises(queue.Empty):
+            list(self.bridge)
+
+    def test16_pause_freezes_timeout(self):
+        '''No timeout while the consumer is paused
+        '''
+        self.bridge = setup_bridge(cmd_exec_timeout=0.1)
+
+        def cmd():
+            yield 'pause'
+            yield 'Test'
+            return 'done'
+
+        def do_iter():
+            for elem in self.bridge:
+                if elem == 'pause':
+                    self.bridge.stateHook('paused', 'running')
+                    time.sleep(0.3)
+                    self.bridge.stateHook('running', 'paused')
+
+        self.thread = threading.Thread(target=do_iter)
+        self.thread.start()
+        try:
+            r = self.bridge.submit(cmd)
+        finally:
+            self.bridge.stopDelegation()
+        self.thread.join()
+        self.assertEqual(r, 'done')
+        self.assertFalse(self.bridge.is_paused)
+
+    def test17_abort_while_waiting(self):
+        '''Waiting submitter is stopped if the consumer aborts the plan
+        '''
+        from bcib import ExecutionStopRequest
+        from bcib.bridge_plan import bridge_plan_stub
+
+        received = []
+
+        def cmd():
+            yield 'Test'
+            yield 'not reached'
+            return 'done'
+
+        def solve():
+            try:
+                self.bridge.submit(cmd)
+            except ExecutionStopRequest as esr:
+                received.append(esr)
+            finally:
+                self.bridge.stopDelegation()
+
+        self.thread = threading.Thread(target=solve)
+        self.thread.start()
+        plan = bridge_plan_stub(self.bridge)
+        self.assertEqual(next(plan), 'Test')
+        self.bridge.stateHook('paused', 'running')
+        # e.g. RE.abort(): the plan is closed
+        plan.close()
+        self.bridge.stateHook('idle', 'paused')
+        self.thread.join(5)
+        self.assertFalse(self.thread.is_alive())
+        self.assertEqual(len(received), 1)
+        self.assertTrue(self.bridge.state.is_stopped)
+
+    def test18_cancel_commands(self):
+        '''Queued command dropped, running one stopped at next message
+        '''
+        from bcib import Cancelled
+
+        self.bridge = setup_bridge(pipeline_depth=3)
+        messages = []
+        first = threading.Event()
+        proceed = threading.Event()
+
+        def cmd(val):
+            for i in range(3):
+                yield (val, i)
+            return val
+
+        def do_iter():
+            for elem in self.bridge:
+                messages.append(elem)
+                if elem == (0, 0):
+                    first.set()
+                    proceed.wait(5)
+
+        self.thread = threading.Thread(target=do_iter)
+        self.thread.start()
+        try:
+            running, queued, last = [
+                self.bridge.submit_nowait(functools.partial(cmd, i))
+                for i in range(3)
+            ]
+            self.assertTrue(first.wait(5))
+            self.assertTrue(queued.cancel())
+            self.assertTrue(running.cancel())
+            proceed.set()
+            r = running.result(timeout=5)
+            self.assertEqual(last.result(timeout=5), 2)
+            self.assertFalse(last.cancel())
+        finally:
+            self.bridge.stopDelegation()
+        self.thread.join()
+        self.assertIsInstance(r, Cancelled)
+        self.assertEqual(r.n_msgs, 1)
+        self.assertTrue(queued.cancelled())
+        self.assertEqual(messages, [(0, 0), (2, 0), (2, 1), (2, 2)])
+
+    def test19_submit_nowait_window_full(self):
+        '''Bridge still usable after the command window was full
+        '''
+        self.bridge = setup_bridge(cmd_exec_timeout=0.05)
+
+        def cmd(val):
+            yield 'Test'
+            return val
+
+        first = self.bridge.submit_nowait(functools.partial(cmd, 1))
+        with self.assertRaises(queue.Full):
+            self.bridge.submit_nowait(functools.partial(cmd, 2))
+
+        self.bridge.cmd_exec_timeout = 5
+        self.thread = threading.Thread(target=lambda: list(self.bridge))
+        self.thread.start()
+        try:
+            r = self.bridge.submit(functools.partial(cmd, 3))
+        finally:
+            self.bridge.stopDelegation()
+        self.thread.join()
+        self.assertEqual(first.result(timeout=5), 1)
+        self.assertEqual(r, 3)
+
+    def test20_late_stop_request_stale(self):
+        '''Stop request racing with the result is stale for later ones
+        '''
+        def cmd():
+            yield 'Test'
+            return 'done'
+
+        self.thread = threading.Thread(target=lambda: list(self.bridge))
+        self.thread.start()
+        r = self.bridge.submit(cmd)
+        # stop requested while the result was handed over
+        self.bridge._stopWaiting('late stop')
+        self.thread.join()
+        self.assertEqual(r, 'done')
+        with self.assertRaises(queue.Empty):
+            self.bridge._getResult(0.05, self.bridge._last_seq + 1)
+
+    def test21_stop_with_queued_futures(self):
+        '''Queued commands are cancelled when the delegation stops
+        '''
+        from bcib.bridge_plan import bridge_plan_stub
+
+        self.bridge = setup_bridge(pipeline_depth=3, check_interval=1)
+        messages = []
+        failures = []
+        first = threading.Event()
+        proceed = threading.Event()
+
+        def cmd(val):
+            for i in range(5):
+                yield (val, i)
+            return val
+
+        def do_iter():
+            try:
+                for elem in bridge_plan_stub(self.bridge):
+                    messages.append(elem)
+                    if elem == (0, 0):
+                        first.set()
+                        proceed.wait(5)
+            except Exception as exc:
+                failures.append(exc)
+
+        self.thread = threading.Thread(target=do_iter)
+        self.thread.start()
+        futures = [self.bridge.submit_nowait(functools.partial(cmd, i))
+                   for i in range(3)]
+        self.assertTrue(first.wait(5))
+        self.bridge.stopDelegation()
+        proceed.set()
+        self.thread.join(5)
+        self.assertFalse(self.thread.is_alive())
+        self.assertEqual(failures, [])
+        self.assertEqual(futures[0].result(timeout=1), 0)
+        self.assertTrue(futures[1].cancelled())
+        self.assertTrue(futures[2].cancelled())
+        self.assertEqual(messages, [(0, i) for i in range(5)])
+        self.assertEqual(self.bridge.command_queue.qsize(), 0)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,135 @@
+from bcib.cache import ResultCache, partial_key
+from bcib.threaded_bridge import setup_bridge
+import functools
+import threading
+import time
+import unittest
+
+
+def step(dets, x):
+    return x
+
+
+class TestResultCache(unittest.TestCase):
+    def test00_lru(self):
+        '''Least recently used entry is evicted
+        '''
+        cache = ResultCache(maxsize=2)
+        cache.store('a', 1)
+        cache.store('b', 2)
+        self.assertEqual(cache.lookup('a'), (True, 1))
+        cache.store('c', 3)
+        self.assertEqual(cache.lookup('b'), (False, None))
+        self.assertEqual(cache.lookup('c'), (True, 3))
+        self.assertEqual(cache.info()['hits'], 2)
+        self.assertEqual(cache.info()['misses'], 1)
+
+    def test01_ttl(self):
+        '''Entries expire
+        '''
+        cache = ResultCache(ttl=0.01)
+        cache.store('a', 1)
+        time.sleep(0.02)
+        self.assertEqual(cache.lookup('a'), (False, None))
+        self.assertEqual(len(cache), 0)
+
+    def test02_tolerance(self):
+        '''Float arguments match within the tolerance
+        '''
+        cache = ResultCache(atol=1e-6)
+        key = partial_key(functools.partial(step, ['det'], 1.0))
+        cache.store(key, 'r')
+        near = partial_key(functools.partial(step, ['det'], 1.0 + 1e-9))
+        far = partial_key(functools.partial(step, ['det'], 1.1))
+        self.assertEqual(cache.lookup(near), (True, 'r'))
+        self.assertEqual(cache.lookup(far), (False, None))
+
+    def test03_bridge(self):
+        '''Cache hits do not cross the bridge
+        '''
+        cache = ResultCache()
+        bridge = setup_bridge(cache=cache)
+        executed = []
+
+        def cmd(x):
+            executed.append(x)
+            yield 'Test'
+            return x * 2
+
+        def do_iter():
+            for elem in bridge:
+                pass
+
+        thread = threading.Thread(target=do_iter)
+        thread.start()
+        try:
+            r = [bridge.submit(functools.partial(cmd, x))
+                 for x in [1.0, 2.0, 1.0, 2.0]]
+            r.append(bridge.submit(functools.partial(cmd, 3.0), key='k'))
+            r.append(bridge.submit(functools.partial(cmd, 4.0), key='k'))
+        finally:
+            bridge.stopDelegation()
+        thread.join()
+        self.assertEqual(r, [2.0, 4.0, 2.0, 4.0, 6.0, 6.0])
+        self.assertEqual(executed, [1.0, 2.0, 3.0])
+        self.assertEqual(cache.info()['hits'], 3)
+
+    def test04_batch_bypasses_cache(self):
+        '''Batches neither hit nor take entries of the cache
+        '''
+        cache = ResultCache()
+        bridge = setup_bridge(cache=cache)
+
+        def cmd(x):
+            yield 'Test'
+            return x * 2
+
+        def do_iter():
+            for elem in bridge:
+                pass
+
+        thread = threading.Thread(target=do_iter)
+        thread.start()
+        try:
+            r = [bridge.submit_many([functools.partial(cmd, 1.0),
+                                     functools.partial(cmd, 2.0)])
+                 for i in range(3)]
+        finally:
+            bridge.stopDelegation()
+        thread.join()
+        self.assertEqual(r, [[2.0, 4.0]] * 3)
+        info = cache.info()
+        self.assertEqual((info['hits'], info['misses'], info['size']),
+                         (0, 0, 0))
+
+    def test05_projection(self):
+        '''Results of other projections are not mixed up
+        '''
+        cache = ResultCache()
+        bridge = setup_bridge(cache=cache)
+
+        def cmd():
+            yield 'Test'
+            return {'a': 3, 'b': 4}
+
+        def do_iter():
+            for elem in bridge:
+                pass
+
+        thread = threading.Thread(target=do_iter)
+        thread.start()
+        try:
+            r = [bridge.submit(cmd, project=lambda r: r['a']),
+                 bridge.submit(cmd, project=lambda r: r['b']),
+                 bridge.submit(cmd),
+                 bridge.submit(cmd, project=lambda r: r['a'], key='a'),
+                 bridge.submit(cmd, project=lambda r: r['b'], key='a')]
+        finally:
+            bridge.stopDelegation()
+        thread.join()
+        self.assertEqual(r, [3, 4, {'a': 3, 'b': 4}, 3, 3])
+        self.assertEqual(cache.info()['hits'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+from bcib.bridge import (BridgeState, CommandProcessingState,
+                         CompactBridgeState, CompactCommandProcessingState)
+from bcib.threaded_bridge import setup_bridge
+from super_state_machine.errors import TransitionError
+import functools
+import threading
+import unittest
+
+
+class TestCompactState(unittest.TestCase):
+    def test00_same_interface(self):
+        '''Compact state follows the state machine
+        '''
+        for machine_cls, compact_cls in [
+                (BridgeState, CompactBridgeState),
+                (CommandProcessingState, CompactCommandProcessingState),
+        ]:
+            machine = machine_cls()
+            compact = compact_cls(checked=True)
+            self.assertEqual(machine.state, compact.state)
+            for start, targets in machine_cls.Meta.transitions.items():
+                for target in targets:
+                    machine.force_set(start)
+                    compact._state = compact._names.index(start)
+                    getattr(machine, 'set_' + target)()
+                    getattr(compact, 'set_' + target)()
+                    self.assertEqual(machine.state, compact.state)
+                    self.assertTrue(getattr(compact, 'is_' + target))
+
+    def test01_checked(self):
+        '''Invalid transitions only raise in checked mode
+        '''
+        state = CompactBridgeState(checked=True)
+        with self.assertRaises(TransitionError):
+            state.set_stopped()
+        state = CompactBridgeState()
+        state.set_stopped()
+        self.assertTrue(state.is_stopped)
+        self.assertFalse(state.is_running)
+
+    def test02_bridge(self):
+        '''Bridge without state checks
+        '''
+        bridge = setup_bridge(state_checks=False)
+        self.assertIsInstance(bridge.state, CompactBridgeState)
+
+        def cmd(val):
+            yield 'Test'
+            return val
+
+        def do_iter():
+            for elem in bridge:
+                pass
+
+        thread = threading.Thread(target=do_iter)
+        thread.start()
+        try:
+            r = [bridge.submit(functools.partial(cmd, i)) for i in range(3)]
+        finally:
+            bridge.stopDelegation()
+        thread.join()
+        self.assertEqual(r, [0, 1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
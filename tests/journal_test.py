@@ -0,0 +1,160 @@
+from bcib.journal import EvaluationJournal, journal_key
+from bcib.threaded_bridge import setup_bridge
+import functools
+import os
+import tempfile
+import threading
+import unittest
+
+
+class Device:
+    def __init__(self, name):
+        self.name = name
+
+
+def step(dets, x):
+    yield 'Test'
+    return {'x': x, 'y': x ** 2}
+
+
+class TestEvaluationJournal(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'test.journal')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def run_solver(self, journal, xs):
+        bridge = setup_bridge(journal=journal)
+        executed = []
+        dets = [Device('det')]
+
+        def cmd(x):
+            executed.append(x)
+            return (yield from step(dets, x))
+
+        def do_iter():
+            for elem in bridge:
+                pass
+
+        thread = threading.Thread(target=do_iter)
+        thread.start()
+        try:
+            r = [bridge.submit(functools.partial(cmd, x), key=x) for x in xs]
+        finally:
+            bridge.stopDelegation()
+        thread.join()
+        return r, executed
+
+    def test00_key(self):
+        '''Keys compare equal for new but equivalent objects
+        '''
+        k1 = journal_key(functools.partial(step, [Device('det')], 1.0))
+        k2 = journal_key(functools.partial(step, [Device('det')], 1.0))
+        self.assertEqual(k1, k2)
+
+    def test01_replay(self):
+        '''Prefix is replayed, remaining commands executed
+        '''
+        with EvaluationJournal(self.path, chunk_size=64) as journal:
+            r1, executed = self.run_solver(journal, [1.0, 2.0, 3.0])
+        self.assertEqual(executed, [1.0, 2.0, 3.0])
+
+        with EvaluationJournal(self.path) as journal:
+            self.assertEqual(len(journal), 3)
+            r2, executed = self.run_solver(journal, [1.0, 2.0, 3.0, 4.0])
+            self.assertEqual(journal.replayed, 3)
+        self.assertEqual(executed, [4.0])
+        self.assertEqual(r2[:3], r1)
+
+        # diverging after the first record
+        with EvaluationJournal(self.path) as journal:
+            r3, executed = self.run_solver(journal, [1.0, 5.0])
+            self.assertEqual(len(journal), 2)
+        self.assertEqual(executed, [5.0])
+
+        with EvaluationJournal(self.path, replay=False) as journal:
+            self.assertEqual(len(journal), 0)
+
+    def test02_batch_diverging(self):
+        '''A batch of other commands is not answered from the journal
+        '''
+        def run_batch(journal, xs):
+            bridge = setup_bridge(journal=journal)
+            executed = []
+
+            def cmd(x):
+                executed.append(x)
+                yield 'Test'
+                return x * 10
+
+            def do_iter():
+                for elem in bridge:
+                    pass
+
+            thread = threading.Thread(target=do_iter)
+            thread.start()
+            try:
+                r = bridge.submit_many(functools.partial(cmd, x) for x in xs)
+            finally:
+                bridge.stopDelegation()
+            thread.join()
+            return r, executed
+
+        with EvaluationJournal(self.path) as journal:
+            r, executed = run_batch(journal, [1, 2])
+        self.assertEqual(r, [10, 20])
+
+        with EvaluationJournal(self.path) as journal:
+            r, executed = run_batch(journal, [1, 2])
+            self.assertEqual(journal.replayed, 1)
+        self.assertEqual(executed, [])
+        self.assertEqual(r, [10, 20])
+
+        with EvaluationJournal(self.path) as journal:
+            r, executed = run_batch(journal, [7, 8, 9])
+            self.assertEqual(journal.replayed, 0)
+        self.assertEqual(executed, [7, 8, 9])
+        self.assertEqual(r, [70, 80, 90])
+
+    def test03_unpicklable_result(self):
+        '''Result is returned even if it can not be journaled
+        '''
+        with EvaluationJournal(self.path) as journal:
+            bridge = setup_bridge(journal=journal)
+
+            def cmd(x):
+                yield 'Test'
+                if x == 1:
+                    return threading.Lock()
+                return x
+
+            def do_iter():
+                for elem in bridge:
+                    pass
+
+            thread = threading.Thread(target=do_iter)
+            thread.start()
+            try:
+                r = [bridge.submit(functools.partial(cmd, x))
+                     for x in [0, 1, 2]]
+            finally:
+                bridge.stopDelegation()
+            thread.join()
+            self.assertEqual(len(journal), 2)
+        self.assertEqual(r[0], 0)
+        self.assertEqual(r[2], 2)
+        self.assertTrue(hasattr(r[1], 'acquire'))
+
+    def test04_not_a_journal(self):
+        '''Refuse to overwrite other files
+        '''
+        with open(self.path, 'wb') as fp:
+            fp.write(b'something else entirely')
+        with self.assertRaises(ValueError):
+            EvaluationJournal(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
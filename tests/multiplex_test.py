@@ -0,0 +1,119 @@
+from bcib.multiplex import setup_multiplex_bridge
+from bcib.bridge_plan import bridge_plan_stub
+from bcib import ExecutionStopRequest
+import functools
+import threading
+import unittest
+from util import consume
+
+
+def cmd(channel, i):
+    yield (channel, i)
+    return channel * 100 + i
+
+
+class TestMultiplexBridge(unittest.TestCase):
+
+    def _start(self, bridge, target):
+        threads = [threading.Thread(target=target, args=(channel,))
+                   for channel in bridge.channels]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def test00_results_routed(self):
+        '''Each solver receives the results of its own commands
+        '''
+        bridge = setup_multiplex_bridge(3)
+        results = {}
+
+        def solve(channel):
+            try:
+                results[channel.index] = [
+                    channel.submit(functools.partial(cmd, channel.index, i))
+                    for i in range(5)
+                ]
+            finally:
+                channel.stopDelegation()
+
+        threads = self._start(bridge, solve)
+        r, messages = consume(bridge_plan_stub(bridge))
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(messages), 15)
+        for idx in range(3):
+            self.assertEqual(results[idx], [idx * 100 + i for i in range(5)])
+            # messages of each channel in order of submission
+            self.assertEqual([i for c, i in messages if c == idx],
+                             list(range(5)))
+
+    def _schedule(self, bridge, n):
+        '''Queue n commands per channel, return the order of execution
+        '''
+        for channel in bridge.channels:
+            for i in range(n):
+                channel._putCommand(functools.partial(cmd, channel.index, i),
+                                    timeout=0)
+        order = []
+        for i in range(n * len(bridge.channels)):
+            seq, c = bridge.command_queue.get(block=False)
+            order.append(c.args)
+        return order
+
+    def test01_round_robin(self):
+        bridge = setup_multiplex_bridge(3, pipeline_depth=2)
+        order = self._schedule(bridge, 2)
+        self.assertEqual([c for c, i in order], [0, 1, 2, 0, 1, 2])
+
+    def test02_priority(self):
+        '''Highest priority first, equal priorities in turn
+        '''
+        bridge = setup_multiplex_bridge(3, policy='priority',
+                                        priorities=[0, 1, 1],
+                                        pipeline_depth=2)
+        order = self._schedule(bridge, 2)
+        self.assertEqual([c for c, i in order], [1, 2, 1, 2, 0, 0])
+
+    def test03_command_exception(self):
+        '''Failing command stops the other solvers too
+        '''
+        bridge = setup_multiplex_bridge(2)
+        received = {}
+        started = threading.Event()
+
+        def failing():
+            yield 'Test'
+            raise ValueError('Test failure')
+
+        def solve(channel):
+            try:
+                if channel.index == 0:
+                    started.wait(5)
+                    channel.submit(failing)
+                else:
+                    started.set()
+                    channel.submit(functools.partial(cmd, 1, 0))
+                    channel.submit(functools.partial(cmd, 1, 1))
+            except Exception as exc:
+                received[channel.index] = exc
+            finally:
+                channel.stopDelegation()
+
+        threads = self._start(bridge, solve)
+        with self.assertRaises(ValueError):
+            consume(bridge_plan_stub(bridge))
+        for thread in threads:
+            thread.join()
+        self.assertIsInstance(received[0], ValueError)
+        self.assertIsInstance(received[1], ExecutionStopRequest)
+
+    def test04_arguments(self):
+        with self.assertRaises(ValueError):
+            setup_multiplex_bridge(2, policy='fifo')
+        with self.assertRaises(ValueError):
+            setup_multiplex_bridge(2, priorities=[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+from bcib.pool import BridgePool
+import functools
+import threading
+import unittest
+from util import consume
+
+
+def step(x):
+    yield ('set', x)
+    return x ** 3 * 2 + 10
+
+
+def solve(bridge, target):
+    '''Bisection on the readback of step
+    '''
+    a, b = -10.0, 10.0
+    for i in range(30):
+        x = (a + b) / 2
+        if bridge.submit(functools.partial(step, x)) < target:
+            a = x
+        else:
+            b = x
+    return x
+
+
+class TestBridgePool(unittest.TestCase):
+    def setUp(self):
+        self.pool = BridgePool(size=1)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test00_reuse(self):
+        '''Same bridge and worker thread for each step
+        '''
+        threads = set()
+
+        def solver(bridge, target):
+            threads.add(threading.current_thread())
+            return solve(bridge, target)
+
+        n_threads = threading.active_count()
+        bridges = set()
+        for target in (12.0, 26.0, 64.0):
+            bridge = self.pool._free.queue[0]
+            bridges.add(id(bridge))
+            x, messages = consume(self.pool.solve_plan(solver, target))
+            self.assertAlmostEqual(x ** 3 * 2 + 10, target, places=4)
+            self.assertEqual(len(messages), 30)
+            self.assertTrue(bridge.state.is_undefined)
+            self.assertTrue(bridge.cmd_state.is_undefined)
+            self.assertEqual(threading.active_count(), n_threads)
+        self.assertEqual(len(bridges), 1)
+        self.assertEqual(len(threads), 1)
+
+    def test01_solver_exception(self):
+        '''Exception of the solver raised by the plan, bridge reusable
+        '''
+        def failing(bridge):
+            bridge.submit(functools.partial(step, 0))
+            raise ValueError('Test failure')
+
+        with self.assertRaises(ValueError):
+            consume(self.pool.solve_plan(failing))
+
+        x, messages = consume(self.pool.solve_plan(solve, 12.0))
+        self.assertAlmostEqual(x, 1.0, places=4)
+
+    def test02_all_in_use(self):
+        '''Only size plans at the same time
+        '''
+        plan = self.pool.solve_plan(solve, 12.0)
+        next(plan)
+        with self.assertRaises(RuntimeError):
+            next(self.pool.solve_plan(solve, 12.0))
+        consume(plan)
+
+    def test03_closed(self):
+        self.pool.close()
+        with self.assertRaises(RuntimeError):
+            next(self.pool.solve_plan(solve, 12.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
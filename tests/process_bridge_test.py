@@ -0,0 +1,101 @@
+import logging
+from bcib.process_bridge import setup_process_bridge
+from bcib.bridge_plan import bridge_plan_stub
+import functools
+import unittest
+from util import consume
+
+logger = logging.getLogger('bcib')
+
+
+def cmd(val):
+    yield 'Test'
+    return val * 2
+
+
+def failing_cmd():
+    yield 'Test'
+    raise ValueError('Test failure')
+
+
+def solve(bridge, n):
+    r = [bridge.submit(functools.partial(cmd, i)) for i in range(n)]
+    r += bridge.submit_many([functools.partial(cmd, i) for i in range(n)])
+    bridge.submit(functools.partial(cmd, sum(r)))
+
+
+def failing_solve(bridge):
+    raise ZeroDivisionError('Solver failure')
+
+
+def solve_failing_cmd(bridge):
+    try:
+        bridge.submit(functools.partial(failing_cmd))
+    except ValueError:
+        # Received the exception raised by the command
+        return
+    raise AssertionError('Command exception not received')
+
+
+class TestProcessBridge(unittest.TestCase):
+
+    def test00_submit(self):
+        '''Commands submitted from the child process
+        '''
+        bridge = setup_process_bridge(solve, args=(3,))
+        r, messages = consume(bridge_plan_stub(bridge))
+        bridge.join(5)
+        self.assertEqual(r, None)
+        self.assertEqual(len(messages), 7)
+        self.assertEqual(bridge.process.exitcode, 0)
+        self.assertTrue(bridge.state.is_stopped)
+
+    def test01_solver_exception(self):
+        '''Exception raised by the solver is raised by the iterator
+        '''
+        bridge = setup_process_bridge(failing_solve)
+        with self.assertRaises(ZeroDivisionError):
+            consume(bridge_plan_stub(bridge))
+        bridge.join(5)
+
+    def test02_command_exception(self):
+        '''Exception raised by the command is raised in both processes
+        '''
+        bridge = setup_process_bridge(solve_failing_cmd)
+        with self.assertRaises(ValueError):
+            consume(bridge_plan_stub(bridge))
+        bridge.join(5)
+        self.assertEqual(bridge.process.exitcode, 0)
+
+    def test03_stop_request(self):
+        '''Solver receives a stop request when the iteration stops
+        '''
+        bridge = setup_process_bridge(solve, args=(3,))
+        plan = bridge_plan_stub(bridge)
+        next(plan)
+        plan.close()
+        bridge.join(5)
+        self.assertNotEqual(bridge.process.exitcode, 0)
+
+    def test04_spawn(self):
+        '''Submitting half pickled to a spawned process
+        '''
+        bridge = setup_process_bridge(solve, args=(2,), mp_context='spawn')
+        r, messages = consume(bridge_plan_stub(bridge))
+        bridge.join(10)
+        self.assertEqual(len(messages), 5)
+        self.assertEqual(bridge.process.exitcode, 0)
+
+    def test05_process_local_options(self):
+        '''Options keeping state within one process are rejected
+        '''
+        from bcib.timeouts import AdaptiveTimeout
+        with self.assertRaises(TypeError):
+            setup_process_bridge(solve, args=(1,), collect_stats=True)
+        with self.assertRaises(TypeError):
+            setup_process_bridge(solve, args=(1,),
+                                 timeout_policy=AdaptiveTimeout())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+from bcib.rendezvous import RendezvousChannel
+from bcib.threaded_bridge import setup_bridge
+import functools
+import queue
+import threading
+import unittest
+
+
+class TestRendezvousChannel(unittest.TestCase):
+    def test00_put_get(self):
+        '''Single slot semantics
+        '''
+        ch = RendezvousChannel()
+        self.assertEqual(ch.qsize(), 0)
+        with self.assertRaises(queue.Empty):
+            ch.get(block=False)
+        ch.put('a')
+        self.assertEqual(ch.qsize(), 1)
+        with self.assertRaises(queue.Full):
+            ch.put('b', timeout=0.01)
+        self.assertEqual(ch.get(), 'a')
+        with self.assertRaises(queue.Empty):
+            ch.get(timeout=0.01)
+
+    def test01_spinning(self):
+        '''Hand over between threads while spinning
+        '''
+        ch = RendezvousChannel(spin_time=1e-4)
+        received = []
+
+        def receive():
+            for i in range(100):
+                received.append(ch.get(timeout=5))
+
+        thread = threading.Thread(target=receive)
+        thread.start()
+        for i in range(100):
+            ch.put(i, timeout=5)
+        thread.join()
+        self.assertEqual(received, list(range(100)))
+
+    def test02_bridge(self):
+        '''Bridge using rendezvous channels
+        '''
+        bridge = setup_bridge(rendezvous=True)
+
+        def cmd(val):
+            yield 'Test'
+            return val
+
+        def do_iter():
+            for elem in bridge:
+                pass
+
+        thread = threading.Thread(target=do_iter)
+        thread.start()
+        try:
+            r = [bridge.submit(functools.partial(cmd, i)) for i in range(10)]
+        finally:
+            bridge.stopDelegation()
+        thread.join()
+        self.assertEqual(r, list(range(10)))
+
+        with self.assertRaises(ValueError):
+            setup_bridge(pipeline_depth=2, rendezvous=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+from bcib.bridge_plan import set_point_command
+import unittest
+from util import consume
+
+try:
+    import bluesky
+except ImportError:
+    bluesky = None
+
+
+def read(devices):
+    '''Stand in for trigger_and_read
+    '''
+    yield ('read', devices)
+    return {dev: {'value': 0.0, 'timestamp': 0.0} for dev in devices}
+
+
+class TestSetPointCommand(unittest.TestCase):
+    def test00_dimension(self):
+        make_cmd = set_point_command(['mx', 'my'], ['det'])
+        with self.assertRaises(ValueError):
+            make_cmd([1.0])
+
+    @unittest.skipIf(bluesky is None, 'bluesky not available')
+    def test01_grouped_set(self):
+        '''All axes set in one group, waited for and read once
+        '''
+        make_cmd = set_point_command(['mx', 'my'], ['det', 'my'], read=read)
+        r, messages = consume(make_cmd([1.0, 2.0])())
+
+        commands = [msg[0] for msg in messages[:-1]]
+        self.assertEqual(commands, ['checkpoint', 'set', 'set', 'wait'])
+        sets = messages[1:3]
+        self.assertEqual([(msg.obj, msg.args) for msg in sets],
+                         [('mx', (1.0,)), ('my', (2.0,))])
+        groups = {msg.kwargs['group'] for msg in messages[1:4]}
+        self.assertEqual(len(groups), 1)
+        self.assertEqual(messages[-1], ('read', ['det', 'my', 'mx']))
+        self.assertEqual(list(r), ['det', 'my', 'mx'])
+
+
+if __name__ == '__main__':
+    unittest.main()
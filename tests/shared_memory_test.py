@@ -0,0 +1,84 @@
+import logging
+from bcib.process_bridge import setup_process_bridge
+from bcib.bridge_plan import bridge_plan_stub
+import collections
+import functools
+import unittest
+
+try:
+    import numpy as np
+    from bcib.shared_memory import SharedArrayTransport
+except ImportError:
+    np = None
+
+logger = logging.getLogger('bcib')
+
+
+def read_cmd(n):
+    yield 'Test'
+    return {'det': {'value': np.arange(n, dtype=float), 'timestamp': 1.0}}
+
+
+def solve(bridge, n):
+    r = bridge.submit(functools.partial(read_cmd, n))
+    arr = r['det']['value']
+    assert not arr.flags.writeable
+    assert arr.sum() == n * (n - 1) / 2
+    del arr, r
+
+
+@unittest.skipIf(np is None, 'numpy not available')
+class TestSharedArrayTransport(unittest.TestCase):
+    def setUp(self):
+        self.transport = SharedArrayTransport(n_slots=2, slot_size=2**16,
+                                              min_nbytes=1024)
+
+    def tearDown(self):
+        self.transport.close()
+
+    def test00_encode_decode(self):
+        '''Large arrays replaced by descriptors, small ones kept
+        '''
+        big = np.arange(1000, dtype=float)
+        small = np.arange(10)
+        r = self.transport.encode({'big': big, 'small': small, 'x': [1.0]})
+        self.assertNotIsInstance(r['big'], np.ndarray)
+        self.assertIs(r['small'], small)
+        d = self.transport.decode(r)
+        np.testing.assert_array_equal(d['big'], big)
+        self.assertEqual(d['x'], [1.0])
+        del d
+
+    def test01_slot_exceeded(self):
+        '''Arrays not fitting into a slot are kept
+        '''
+        big = np.zeros(2**14)
+        r = self.transport.encode((big,))
+        self.assertIs(r[0], big)
+
+    def test02_namedtuple(self):
+        '''Named tuples keep their type
+        '''
+        Reading = collections.namedtuple('Reading', ['value', 'timestamp'])
+        big = np.arange(1000, dtype=float)
+        r = self.transport.encode([Reading(big, 1.0)])
+        d = self.transport.decode(r)
+        self.assertIsInstance(d[0], Reading)
+        np.testing.assert_array_equal(d[0].value, big)
+        self.assertEqual(d[0].timestamp, 1.0)
+        del d
+
+    def test03_process_bridge(self):
+        '''Arrays received by the solver process over shared memory
+        '''
+        bridge = setup_process_bridge(solve, args=(1000,),
+                                      result_transport=self.transport)
+        plan = bridge_plan_stub(bridge)
+        for msg in plan:
+            pass
+        bridge.join(5)
+        self.assertEqual(bridge.process.exitcode, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+from bcib.solvers import bisect, brentq, golden, nelder_mead
+import math
+import unittest
+
+
+def plan_function(func, messages):
+    '''Wrap a plain function into a function returning a plan
+    '''
+    def f(x):
+        messages.append(x)
+        r = yield ('read', x)
+        assert r == 'ack'
+        return func(x)
+    return f
+
+
+def run(plan):
+    '''Consume the plan as the run engine would
+    '''
+    ret = None
+    try:
+        while True:
+            plan.send(ret)
+            ret = 'ack'
+    except StopIteration as si:
+        return si.value
+
+
+class TestRoot(unittest.TestCase):
+    def test00_roots(self):
+        '''Roots of the function of the bluesky example
+        '''
+        def func(x):
+            return x ** 3 * 2 + 10 - 3
+
+        expected = -(7 / 2) ** (1 / 3)
+        for solver in (bisect, brentq):
+            messages = []
+            f = plan_function(func, messages)
+            x = run(solver(f, -10, 10))
+            self.assertAlmostEqual(x, expected, places=10)
+            self.assertTrue(len(messages) > 2)
+
+    def test01_brentq_fewer_steps(self):
+        '''Brent needs far less evaluations than bisection
+        '''
+        n_bisect, n_brent = [], []
+        run(bisect(plan_function(math.cos, n_bisect), 0, 3))
+        x = run(brentq(plan_function(math.cos, n_brent), 0, 3))
+        self.assertAlmostEqual(x, math.pi / 2, places=10)
+        self.assertLess(len(n_brent), len(n_bisect) / 2)
+
+    def test02_bracket(self):
+        '''Same sign at both ends
+        '''
+        with self.assertRaises(ValueError):
+            run(brentq(plan_function(lambda x: x ** 2 + 1, []), -1, 1))
+
+
+class TestMinimize(unittest.TestCase):
+    def test00_golden(self):
+        x, fx = run(golden(plan_function(lambda x: (x - 2) ** 2 + 1, []),
+                           -5, 5, xtol=1e-8))
+        self.assertAlmostEqual(x, 2, places=6)
+        self.assertAlmostEqual(fx, 1)
+
+    def test01_nelder_mead(self):
+        '''Rosenbrock function
+        '''
+        def rosen(x):
+            return (1 - x[0]) ** 2 + 100 * (x[1] - x[0] ** 2) ** 2
+
+        x, fx = run(nelder_mead(plan_function(rosen, []), [-1.2, 1.0],
+                                xatol=1e-8, fatol=1e-8, maxiter=2000,
+                                maxfev=4000))
+        self.assertAlmostEqual(x[0], 1, places=4)
+        self.assertAlmostEqual(x[1], 1, places=4)
+
+    def test02_nelder_mead_maxfev(self):
+        with self.assertRaises(RuntimeError):
+            run(nelder_mead(plan_function(lambda x: x[0] ** 2, []), [1.0],
+                            xatol=0, fatol=0, maxfev=10))
+
+
+if __name__ == '__main__':
+    unittest.main()
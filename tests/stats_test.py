@@ -0,0 +1,65 @@
+from bcib.stats import Histogram
+from bcib.threaded_bridge import setup_bridge
+import functools
+import threading
+import time
+import unittest
+
+
+class TestHistogram(unittest.TestCase):
+    def test00_bins(self):
+        '''Values end up in the right bins
+        '''
+        hist = Histogram(lo=1e-3, hi=1, bins_per_decade=1)
+        self.assertEqual(len(hist.edges), 5)
+        for val in [1e-4, 2e-3, 5e-2, 0.5, 10]:
+            hist.add(val)
+        self.assertEqual(hist.counts, [1, 1, 1, 1, 1])
+        self.assertEqual(hist.percentile(0.5), 1e-1)
+        self.assertEqual(hist.percentile(1.0), 10)
+        snapshot = hist.snapshot()
+        self.assertEqual(snapshot['count'], 5)
+        self.assertEqual(snapshot['max'], 10)
+
+
+class TestBridgeStats(unittest.TestCase):
+    def test00_timing(self):
+        '''Timing recorded for blocking and non blocking submission
+        '''
+        timings = []
+        bridge = setup_bridge(pipeline_depth=2, stats_hook=timings.append)
+
+        def cmd(n):
+            for i in range(n):
+                yield i
+            time.sleep(0.01)
+            return n
+
+        def do_iter():
+            for elem in bridge:
+                pass
+
+        thread = threading.Thread(target=do_iter)
+        thread.start()
+        try:
+            bridge.submit(functools.partial(cmd, 3))
+            bridge.submit_nowait(functools.partial(cmd, 2)).result(5)
+            bridge.submit_many([functools.partial(cmd, 1)] * 2)
+        finally:
+            bridge.stopDelegation()
+        thread.join()
+
+        self.assertEqual([t.n_msgs for t in timings], [3, 2, 2])
+        self.assertIsNone(timings[1].result_latency)
+        for t in timings:
+            self.assertGreaterEqual(t.execution, 0.01)
+            self.assertGreaterEqual(t.queue_wait, 0)
+
+        stats = bridge.stats()
+        self.assertEqual(stats['execution']['count'], 3)
+        self.assertEqual(stats['result_latency']['count'], 2)
+        self.assertIsNone(setup_bridge().stats())
+
+
+if __name__ == '__main__':
+    unittest.main()
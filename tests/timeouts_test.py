@@ -0,0 +1,89 @@
+from bcib.threaded_bridge import setup_bridge
+from bcib.timeouts import AdaptiveTimeout
+from bcib.bridge import _CommandBatch
+import functools
+import queue
+import threading
+import time
+import unittest
+
+
+def fast():
+    yield 'fast'
+    return 1
+
+
+def slow():
+    yield 'slow'
+    return 2
+
+
+class TestAdaptiveTimeout(unittest.TestCase):
+    def test00_fallback(self):
+        '''Fixed timeout until enough samples were recorded
+        '''
+        policy = AdaptiveTimeout(min_samples=3, floor=0.0)
+        for i in range(2):
+            policy.record(fast, 1e-3)
+        self.assertEqual(policy.timeout(fast, 5), 5)
+        policy.record(fast, 1e-3)
+        t = policy.timeout(fast, 5)
+        self.assertGreaterEqual(t, 3e-3)
+        self.assertLess(t, 1e-2)
+        # other command types are not affected
+        self.assertEqual(policy.timeout(slow, 5), 5)
+
+    def test01_bounds(self):
+        policy = AdaptiveTimeout(min_samples=1, floor=0.5, ceiling=2)
+        policy.record(fast, 1e-3)
+        policy.record(slow, 10)
+        self.assertEqual(policy.timeout(fast, 5), 0.5)
+        self.assertEqual(policy.timeout(slow, 5), 2)
+        snapshot = policy.snapshot()
+        self.assertEqual(snapshot['fast'], {'count': 1, 'timeout': 0.5})
+
+    def test02_batch(self):
+        '''Batches keyed by their first command and their length
+        '''
+        policy = AdaptiveTimeout(min_samples=1)
+        policy.record(_CommandBatch([fast, fast]), 1)
+        self.assertEqual(policy.timeout(_CommandBatch([fast]), 5), 5)
+        self.assertEqual(policy.timeout(_CommandBatch([slow, slow]), 5), 5)
+        self.assertGreater(policy.timeout(_CommandBatch([fast, fast]), 5), 1)
+
+    def test03_hung_command(self):
+        '''Hung command detected long before the fixed timeout
+        '''
+        policy = AdaptiveTimeout(min_samples=5, floor=0.02)
+        bridge = setup_bridge(cmd_exec_timeout=5, timeout_policy=policy)
+
+        def step(msg):
+            yield msg
+            return 3
+
+        release = threading.Event()
+
+        def do_iter():
+            for elem in bridge:
+                if elem == 'hang':
+                    release.wait(5)
+
+        thread = threading.Thread(target=do_iter)
+        thread.start()
+        try:
+            for i in range(20):
+                bridge.submit(functools.partial(step, 'step'))
+            t0 = time.perf_counter()
+            with self.assertRaises(queue.Empty):
+                bridge.submit(functools.partial(step, 'hang'))
+            dt = time.perf_counter() - t0
+        finally:
+            release.set()
+            bridge.reset()
+            bridge.stopDelegation()
+        thread.join()
+        self.assertLess(dt, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
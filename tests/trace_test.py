@@ -0,0 +1,82 @@
+from bcib.trace import Tracer
+from bcib.threaded_bridge import setup_bridge
+from bcib.bridge_plan import bridge_plan_stub
+import functools
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+
+def cmd(val):
+    yield ('Test', val)
+    yield ('Test', val)
+    return val
+
+
+class TestTracer(unittest.TestCase):
+    def test00_ring_buffer(self):
+        '''Only the latest spans are kept
+        '''
+        tracer = Tracer(capacity=3)
+        for i in range(5):
+            t = time.perf_counter()
+            tracer.span('span', t, t, i)
+        self.assertEqual(tracer.recorded, 5)
+        self.assertEqual(tracer.dropped, 2)
+        self.assertEqual([s[-1] for s in tracer.spans()], [2, 3, 4])
+        tracer.clear()
+        self.assertEqual(tracer.spans(), [])
+
+    def test01_bridge_timeline(self):
+        '''Spans of solver, iterator and plan end up in one trace file
+        '''
+        tracer = Tracer()
+        bridge = setup_bridge(tracer=tracer)
+        results = []
+
+        def solve():
+            try:
+                for i in range(3):
+                    results.append(bridge.submit(functools.partial(cmd, i)))
+            finally:
+                bridge.stopDelegation()
+
+        thread = threading.Thread(target=solve, name='solver')
+        thread.start()
+        for msg in bridge_plan_stub(bridge):
+            pass
+        thread.join()
+        self.assertEqual(results, [0, 1, 2])
+
+        with tempfile.TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, 'trace.json')
+            tracer.dump(filename)
+            with open(filename) as fp:
+                trace = json.load(fp)
+
+        events = trace['traceEvents']
+        spans = [e for e in events if e['ph'] == 'X']
+        names = [e['name'] for e in spans]
+        self.assertEqual(names.count('message'), 6)
+        self.assertEqual(names.count('result get'), 3)
+        self.assertEqual(names.count('result put'), 3)
+        # three commands and end of evaluation
+        self.assertEqual(names.count('enqueue'), 4)
+        self.assertEqual(names.count('dequeue'), 4)
+        self.assertEqual(names.count('bridge_plan_stub'), 1)
+
+        threads = {e['args']['name']: e['tid']
+                   for e in events if e['ph'] == 'M'}
+        solver_spans = {e['name'] for e in spans
+                        if e['tid'] == threads['solver']}
+        self.assertEqual(solver_spans, {'submit', 'enqueue', 'result get'})
+        main_tid = threads[threading.main_thread().name]
+        self.assertIn('message', {e['name'] for e in spans
+                                  if e['tid'] == main_tid})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,25 @@
+'''Helpers shared by the tests
+'''
+
+
+def consume(plan, reply=None):
+    '''Consume the plan as the run engine would
+
+    Args:
+        plan:  the plan (generator)
+        reply: called with the list of the messages received so far.
+               Its return value is sent back to the plan. If not
+               given None is sent
+
+    Returns:
+        tuple (value returned by the plan, list of the messages)
+    '''
+    messages = []
+    ret = None
+    try:
+        while True:
+            messages.append(plan.send(ret))
+            if reply is not None:
+                ret = reply(messages)
+    except StopIteration as si:
+        return si.value, messages
@@ -0,0 +1,167 @@
+from bcib.threaded_bridge import setup_bridge
+from bcib.watchdog import Watchdog
+from bcib import PeerLost
+import functools
+import threading
+import time
+import unittest
+
+
+def cmd(val):
+    yield val
+    return val
+
+
+class TestWatchdog(unittest.TestCase):
+    def test00_iterator_gone(self):
+        '''Submitter informed if the consumer abandons the iteration
+        '''
+        bridge = setup_bridge(cmd_exec_timeout=5, watchdog=0.02)
+
+        def abort():
+            # e.g. run engine aborting the plan on the first message
+            it = iter(bridge)
+            next(it)
+            it.close()
+
+        thread = threading.Thread(target=abort)
+        thread.start()
+        t0 = time.perf_counter()
+        with self.assertRaises(PeerLost):
+            bridge.submit(functools.partial(cmd, 1))
+        dt = time.perf_counter() - t0
+        thread.join()
+        bridge.watchdog.stop()
+
+        self.assertLess(dt, 1)
+        self.assertTrue(bridge.state.is_failed)
+        report, = bridge.watchdog.reports
+        self.assertIn('gone', report['reason'])
+        self.assertIsNotNone(report['submitter_stack'])
+
+    def test01_iterator_gone_pipelined(self):
+        '''Outstanding futures failed if the consumer abandons iteration
+        '''
+        bridge = setup_bridge(cmd_exec_timeout=5, pipeline_depth=2,
+                              watchdog=0.02)
+        started = threading.Event()
+
+        def abort():
+            it = iter(bridge)
+            next(it)
+            started.set()
+            it.close()
+
+        thread = threading.Thread(target=abort)
+        thread.start()
+        futures = [bridge.submit_nowait(functools.partial(cmd, i))
+                   for i in range(2)]
+        self.assertTrue(started.wait(5))
+        thread.join()
+        for future in futures:
+            with self.assertRaises(PeerLost):
+                future.result(timeout=1)
+        bridge.watchdog.stop()
+        self.assertTrue(bridge.state.is_failed)
+        self.assertEqual(bridge._outstanding, set())
+
+    def test02_submitter_died(self):
+        '''Iterator informed if the solver thread died
+        '''
+        bridge = setup_bridge(next_cmd_timeout=5)
+
+        def solve():
+            bridge.submit(functools.partial(cmd, 1))
+            # dies without stopping the delegation
+
+        thread = threading.Thread(target=solve, name='solver')
+        thread.start()
+        messages = []
+        t0 = time.perf_counter()
+        with Watchdog(bridge, interval=0.02) as watchdog:
+            with self.assertRaises(PeerLost):
+                for msg in bridge:
+                    messages.append(msg)
+        dt = time.perf_counter() - t0
+        thread.join()
+
+        self.assertLess(dt, 1)
+        self.assertEqual(messages, [1])
+        report, = watchdog.reports
+        self.assertEqual(report['submitter_thread'], 'solver')
+        self.assertIsNone(report['submitter_stack'])
+        self.assertIsNotNone(report['iterator_stack'])
+
+    def test03_stall(self):
+        '''Stall reported, bridge not failed
+        '''
+        bridge = setup_bridge()
+
+        def consume():
+            for msg in bridge:
+                if msg == 'slow':
+                    time.sleep(0.3)
+
+        thread = threading.Thread(target=consume)
+        thread.start()
+        with Watchdog(bridge, interval=0.02, stall_time=0.1) as watchdog:
+            try:
+                r = bridge.submit(functools.partial(cmd, 'slow'))
+                r = bridge.submit(functools.partial(cmd, 'fast'))
+            finally:
+                bridge.stopDelegation()
+        thread.join()
+
+        self.assertEqual(r, 'fast')
+        self.assertEqual(len(watchdog.reports), 1)
+        self.assertIn('no message', watchdog.reports[0]['reason'])
+        self.assertTrue(bridge.state.is_stopped)
+
+    def test04_normal_operation(self):
+        '''No false alarms when the solver finishes normally
+        '''
+        bridge = setup_bridge(watchdog=0.01)
+
+        def solve():
+            try:
+                for i in range(20):
+                    bridge.submit(functools.partial(cmd, i))
+                    time.sleep(0.005)
+            finally:
+                bridge.stopDelegation()
+
+        for run in range(2):
+            thread = threading.Thread(target=solve)
+            thread.start()
+            messages = list(bridge)
+            thread.join()
+            time.sleep(0.05)
+            self.assertEqual(messages, list(range(20)))
+        bridge.watchdog.stop()
+        self.assertEqual(bridge.watchdog.reports, [])
+
+    def test05_reuse(self):
+        '''Finished solver of the last round is not taken as died
+        '''
+        bridge = setup_bridge(watchdog=0.01)
+
+        def solve(delay):
+            time.sleep(delay)
+            try:
+                bridge.submit(functools.partial(cmd, delay))
+            finally:
+                bridge.stopDelegation()
+
+        for delay in [0, 0.1]:
+            thread = threading.Thread(target=solve, args=(delay,),
+                                      name='solver')
+            thread.start()
+            messages = list(bridge)
+            thread.join()
+            self.assertEqual(messages, [delay])
+        bridge.watchdog.stop()
+        self.assertEqual(bridge.watchdog.reports, [])
+
+
+if __name__ == '__main__':
+    unittest.main()